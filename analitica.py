@@ -0,0 +1,256 @@
+"""
+Estadísticas fuera de línea sobre columnas de ninjas, misiones y asignaciones.
+
+Las columnas se cargan como arreglos de NumPy desde los archivos de
+exportacion.py (parquet, arrow o csv.gz) o directamente de la base de datos
+en bloques, y todo el cálculo es vectorizado: las asignaciones se unen con su
+ninja y su misión por búsqueda binaria sobre los ids ordenados, y los totales
+por grupo salen de np.bincount sobre los códigos de cada categoría, sin
+recorrer filas en Python.
+
+Resultados:
+- aldeas y rangos_ninja: ninjas, misiones asignadas y completadas, tasa de
+  completado, recompensa cobrada y distribución del poder (ataque + defensa
+  + chakra)
+- rangos_mision: misiones, asignaciones, tasa de completado, recompensa
+  ofrecida y cobrada y distribución de la recompensa
+
+NumPy es necesario para este módulo (no para el servidor); pyarrow solo para
+leer parquet o arrow.
+"""
+import csv
+import gzip
+import os
+
+from exportacion import EXTENSIONES, ExportacionColumnar
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: solo lo necesita este módulo
+    np = None
+
+COLUMNAS = {
+    'ninjas': ('id', 'rango', 'aldea', 'ataque', 'defensa', 'chakra'),
+    'misiones': ('id', 'rango', 'recompensa'),
+    'asignaciones_misiones': ('ninja_id', 'mision_id', 'completada'),
+}
+TEXTO = {'rango', 'aldea'}
+
+PERCENTILES = (25, 50, 75, 90)
+
+
+def _requerir_numpy():
+    if np is None:
+        raise ImportError('analitica necesita NumPy: pip install numpy')
+
+
+def _arreglo(nombre, valores):
+    """Arreglo de una columna: texto de ancho fijo (se ordena sin comparar objetos), el resto enteros con los nulos en 0"""
+    if nombre in TEXTO:
+        return np.array(['' if valor is None else valor for valor in valores], dtype=str)
+    return np.array([valor or 0 for valor in valores], dtype=np.int64)
+
+
+def cargar_base(tamano_bloque=None):
+    """Columnas leídas de la base de datos en bloques (requiere un contexto de aplicación)"""
+    _requerir_numpy()
+    columnas = {}
+    for tabla, nombres in COLUMNAS.items():
+        opciones = {'tamano_bloque': tamano_bloque} if tamano_bloque else {}
+        exportacion = ExportacionColumnar(tabla, 'csv', nombres, **opciones)
+        partes = {nombre: [] for nombre in nombres}
+        for bloque in exportacion.bloques():
+            for nombre in nombres:
+                partes[nombre].append(_arreglo(nombre, bloque[nombre]))
+        columnas[tabla] = {
+            nombre: np.concatenate(arreglos) if arreglos else _arreglo(nombre, [])
+            for nombre, arreglos in partes.items()
+        }
+    return columnas
+
+
+def cargar_archivos(directorio):
+    """Columnas leídas de los archivos exportados; por tabla se usa parquet, arrow o csv.gz, el primero que exista"""
+    _requerir_numpy()
+    columnas = {}
+    for tabla, nombres in COLUMNAS.items():
+        for formato, extension in EXTENSIONES.items():
+            ruta = os.path.join(directorio, tabla + extension)
+            if os.path.exists(ruta):
+                columnas[tabla] = _LECTORES[formato](ruta, nombres)
+                break
+        else:
+            raise FileNotFoundError(f'No hay exportación de {tabla} en {directorio}')
+    return columnas
+
+
+def _columnas_arrow(tabla, nombres):
+    columnas = {}
+    for nombre in nombres:
+        columna = tabla.column(nombre)
+        if nombre in TEXTO:
+            columnas[nombre] = columna.fill_null('').to_numpy(zero_copy_only=False).astype(str)
+        else:
+            columnas[nombre] = columna.cast('int64').fill_null(0).to_numpy(zero_copy_only=False)
+    return columnas
+
+
+def _leer_parquet(ruta, nombres):
+    import pyarrow.parquet
+    return _columnas_arrow(pyarrow.parquet.read_table(ruta, columns=list(nombres)), nombres)
+
+
+def _leer_arrow(ruta, nombres):
+    import pyarrow.ipc
+    with pyarrow.ipc.open_stream(ruta) as lector:
+        return _columnas_arrow(lector.read_all().select(list(nombres)), nombres)
+
+
+def _leer_csv(ruta, nombres):
+    with gzip.open(ruta, 'rt', encoding='utf-8', newline='') as archivo:
+        lector = csv.reader(archivo)
+        encabezado = next(lector)
+        indices = [encabezado.index(nombre) for nombre in nombres]
+        valores = [[] for _ in nombres]
+        for fila in lector:
+            for destino, indice in zip(valores, indices):
+                destino.append(fila[indice])
+    columnas = {}
+    for nombre, lista in zip(nombres, valores):
+        texto = np.array(lista, dtype=str)
+        columnas[nombre] = texto if nombre in TEXTO else np.where(texto == '', '0', texto).astype(np.int64)
+    return columnas
+
+
+_LECTORES = {'parquet': _leer_parquet, 'arrow': _leer_arrow, 'csv': _leer_csv}
+
+
+def _indices(ids, buscados):
+    """Posición de cada id buscado en ids, y máscara de los que existen"""
+    if not len(ids):
+        return np.zeros(len(buscados), dtype=np.int64), np.zeros(len(buscados), dtype=bool)
+    maximo = int(max(ids.max(), buscados.max(initial=0)))
+    if maximo <= 4 * len(ids) + 1024:
+        # Ids autoincrementales casi contiguos: tabla directa id -> posición
+        posiciones = np.full(maximo + 1, -1, dtype=np.int64)
+        posiciones[ids] = np.arange(len(ids))
+        indices = posiciones[np.maximum(buscados, 0)]
+        return np.maximum(indices, 0), indices >= 0
+    orden = np.argsort(ids, kind='stable')
+    indices = orden[np.minimum(np.searchsorted(ids[orden], buscados), len(ids) - 1)]
+    return indices, ids[indices] == buscados
+
+
+def _distribucion(valores, codigos, grupos):
+    """Mínimo, percentiles, máximo, media y desviación de valores por grupo, sin recorrer los grupos"""
+    cantidad = np.bincount(codigos, minlength=grupos)
+    ordenados = valores[np.lexsort((valores, codigos))].astype(np.float64)
+    inicio = np.concatenate(([0], np.cumsum(cantidad)[:-1]))
+    hay = cantidad > 0
+    ultimo = np.maximum(cantidad - 1, 0)
+
+    def en_posicion(fraccion):
+        # Interpolación lineal, igual que np.percentile
+        posicion = inicio + fraccion * ultimo
+        abajo = np.floor(posicion).astype(np.int64)
+        arriba = np.ceil(posicion).astype(np.int64)
+        if not len(ordenados):
+            return np.zeros(grupos)
+        abajo, arriba = np.minimum(abajo, len(ordenados) - 1), np.minimum(arriba, len(ordenados) - 1)
+        return np.where(hay, ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo), 0)
+
+    suma = np.bincount(codigos, weights=valores, minlength=grupos)
+    cuadrados = np.bincount(codigos, weights=valores.astype(np.float64) ** 2, minlength=grupos)
+    divisor = np.maximum(cantidad, 1)
+    media = suma / divisor
+    desviacion = np.sqrt(np.maximum(cuadrados / divisor - media ** 2, 0))
+
+    resultado = {'minimo': en_posicion(0), **{f'p{p}': en_posicion(p / 100) for p in PERCENTILES},
+                 'maximo': en_posicion(1), 'media': media, 'desviacion': desviacion}
+    return [
+        {clave: round(float(arreglo[grupo]), 2) for clave, arreglo in resultado.items()}
+        for grupo in range(grupos)
+    ]
+
+
+def _tasa(completadas, asignadas):
+    return np.round(np.where(asignadas > 0, completadas / np.maximum(asignadas, 1) * 100, 0), 2)
+
+
+def _por_ninja(etiquetas, clave, poder, asignacion_ninja, completada, recompensa_cobrada):
+    """Filas por categoría de ninja (aldea o rango)"""
+    categorias, codigos = np.unique(etiquetas, return_inverse=True)
+    grupos = len(categorias)
+    codigos_asignacion = codigos[asignacion_ninja]
+    ninjas = np.bincount(codigos, minlength=grupos)
+    asignadas = np.bincount(codigos_asignacion, minlength=grupos)
+    completadas = np.bincount(codigos_asignacion, weights=completada, minlength=grupos).astype(np.int64)
+    recompensa = np.bincount(codigos_asignacion, weights=recompensa_cobrada, minlength=grupos).astype(np.int64)
+    tasa = _tasa(completadas, asignadas)
+    poderes = _distribucion(poder, codigos, grupos)
+    return [
+        {
+            clave: str(categorias[i]),
+            'ninjas': int(ninjas[i]),
+            'misiones_asignadas': int(asignadas[i]),
+            'misiones_completadas': int(completadas[i]),
+            'tasa_completado': float(tasa[i]),
+            'recompensa_total': int(recompensa[i]),
+            'poder': poderes[i],
+        }
+        for i in range(grupos)
+    ]
+
+
+def calcular(columnas):
+    """Estadísticas por aldea, por rango de ninja y por rango de misión a partir de las columnas cargadas"""
+    _requerir_numpy()
+    ninjas, misiones, asignaciones = (columnas[tabla] for tabla in COLUMNAS)
+    poder = ninjas['ataque'] + ninjas['defensa'] + ninjas['chakra']
+
+    # Las asignaciones cuyo ninja o misión no están en la exportación (borrados entre tablas) se descartan
+    asignacion_ninja, con_ninja = _indices(ninjas['id'], asignaciones['ninja_id'])
+    asignacion_mision, con_mision = _indices(misiones['id'], asignaciones['mision_id'])
+    validas = con_ninja & con_mision
+    asignacion_ninja, asignacion_mision = asignacion_ninja[validas], asignacion_mision[validas]
+    completada = asignaciones['completada'][validas].astype(bool)
+    recompensa_cobrada = np.where(completada, misiones['recompensa'][asignacion_mision], 0)
+
+    categorias, codigos = np.unique(misiones['rango'], return_inverse=True)
+    grupos = len(categorias)
+    codigos_asignacion = codigos[asignacion_mision]
+    cantidad = np.bincount(codigos, minlength=grupos)
+    asignadas = np.bincount(codigos_asignacion, minlength=grupos)
+    completadas = np.bincount(codigos_asignacion, weights=completada, minlength=grupos).astype(np.int64)
+    ofrecida = np.bincount(codigos, weights=misiones['recompensa'], minlength=grupos).astype(np.int64)
+    cobrada = np.bincount(codigos_asignacion, weights=recompensa_cobrada, minlength=grupos).astype(np.int64)
+    tasa = _tasa(completadas, asignadas)
+    recompensas = _distribucion(misiones['recompensa'], codigos, grupos)
+    rangos_mision = [
+        {
+            'rango': str(categorias[i]),
+            'misiones': int(cantidad[i]),
+            'asignaciones': int(asignadas[i]),
+            'asignaciones_completadas': int(completadas[i]),
+            'tasa_completado': float(tasa[i]),
+            'recompensa_ofrecida': int(ofrecida[i]),
+            'recompensa_cobrada': int(cobrada[i]),
+            'recompensa': recompensas[i],
+        }
+        for i in range(grupos)
+    ]
+
+    argumentos = (poder, asignacion_ninja, completada, recompensa_cobrada)
+    return {
+        'totales': {
+            'ninjas': len(ninjas['id']),
+            'misiones': len(misiones['id']),
+            'asignaciones': int(validas.sum()),
+            'asignaciones_completadas': int(completada.sum()),
+            'tasa_completado': float(_tasa(completada.sum(), validas.sum())),
+            'recompensa_cobrada': int(recompensa_cobrada.sum()),
+        },
+        'aldeas': _por_ninja(ninjas['aldea'], 'aldea', *argumentos),
+        'rangos_ninja': _por_ninja(ninjas['rango'], 'rango', *argumentos),
+        'rangos_mision': rangos_mision,
+    }
@@ -1,8 +1,37 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import (
+    Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context, make_response,
+    has_request_context, current_app
+)
 from flask_cors import CORS
-from models import db, Ninja, Mision, AsignacionMision
-from datetime import datetime
+from models import db, Ninja, Mision, AsignacionMision, VersionTabla, Jutsu, NinjaJutsu, EstadisticaNinja
+from despachador import DespachadorMisiones, NinjaDisponible, MisionAbierta
+from ranking import RankingPoder, ESTADISTICAS
+from asincrono import BucleAsync, url_async
+from serializacion import ProveedorJSON
+from instrumentacion import Instrumentacion
+from tareas import ColaTareas, EN_CURSO, ERROR
+from eventos import BusEventos, BusPostgres, SinEventos, evento, CREADO, ACTUALIZADO, ELIMINADO, RECARGAR, MIMETYPE_SSE
+from exportacion import ExportacionColumnar
+from cache import CacheLectura, CacheMemoria, CacheRedis, SinCache
+from sqlalchemy import func, case, select, insert, update, delete, bindparam, tuple_, or_, Integer, String
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import make_url
+from datetime import datetime, timezone
+from collections import Counter
+from functools import wraps
+import asyncio
+import hashlib
 import os
+import threading
+
+
+MIMETYPE_NDJSON = 'application/x-ndjson'
+
+CLAVE_REPORTE_NINJAS = 'reporte:ninjas'
+CLAVE_REPORTE_MISIONES = 'reporte:misiones'
+# Tablas de las que depende cada reporte: su versión forma parte del ETag y de la clave de caché
+TABLAS_REPORTE_NINJAS = ('ninjas', 'asignaciones_misiones')
+TABLAS_REPORTE_MISIONES = ('misiones', 'asignaciones_misiones', 'ninjas')
 
 
 class ConfiguracionApp:
@@ -17,6 +46,73 @@ class ConfiguracionApp:
         self.DEBUG = True
         self.HOST = '0.0.0.0'
         self.PORT = 5000
+        
+        # Caché de lectura: 'memoria', 'redis' o 'ninguna'
+        self.CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memoria')
+        self.CACHE_TTL = int(os.getenv('CACHE_TTL', '30'))
+        self.CACHE_MAXIMO = int(os.getenv('CACHE_MAXIMO', '1024'))
+        self.REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        
+        # Pool de conexiones del engine, por proceso: con varios workers el total es
+        # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW), que debe caber en max_connections
+        self.DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+        self.DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+        self.DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+        self.DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'si')
+        self.DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+        self.DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '0'))
+        
+        # Listados y reportes por un engine asíncrono (asyncpg / aiosqlite); el hilo WSGI sigue
+        # esperando cada petición, solo ganan los reportes con consultas en paralelo
+        self.LECTURA_ASYNC = os.getenv('LECTURA_ASYNC', 'false').lower() in ('1', 'true', 'si')
+        
+        # Instrumentación: log de peticiones lentas (con su SQL) y cabecera X-Query-Count
+        self.UMBRAL_LENTO_MS = float(os.getenv('UMBRAL_LENTO_MS', '500'))
+        self.UMBRAL_CONSULTAS = int(os.getenv('UMBRAL_CONSULTAS', '50'))
+        # Sin la variable, solo con app.debug o app.testing (nunca bajo gunicorn): expone tiempos internos
+        cabecera = os.getenv('CABECERA_CONSULTAS')
+        self.CABECERA_CONSULTAS = None if cabecera is None else cabecera.lower() in ('1', 'true', 'si')
+        
+        # Máximo de misiones activas (sin completar) por ninja; 0 = sin límite
+        self.LIMITE_MISIONES_ACTIVAS = int(os.getenv('LIMITE_MISIONES_ACTIVAS', '0'))
+        
+        # Tareas en segundo plano: hilos por proceso, vida del resultado y tiempo máximo (segundos)
+        self.TAREAS_TRABAJADORES = int(os.getenv('TAREAS_TRABAJADORES', '2'))
+        self.TAREAS_TTL = int(os.getenv('TAREAS_TTL', '3600'))
+        self.TAREAS_TIEMPO_MAXIMO = int(os.getenv('TAREAS_TIEMPO_MAXIMO', '600'))
+        
+        # Eventos de cambio por SSE: 'memoria' (por proceso), 'postgres' (LISTEN/NOTIFY) o 'ninguno'.
+        # Cada conexión abierta ocupa un hilo del worker (WEB_THREADS, el mismo valor que lee
+        # gunicorn.conf.py): por defecto se permite la mitad y nunca todos, para que la API siga
+        # respondiendo. DURACION_MAXIMA (segundos) las cierra para que el navegador reconecte
+        self.EVENTOS_BACKEND = os.getenv('EVENTOS_BACKEND', 'memoria')
+        hilos = int(os.getenv('WEB_THREADS', '4'))
+        self.EVENTOS_MAXIMO_CONEXIONES = max(1, min(
+            int(os.getenv('EVENTOS_MAXIMO_CONEXIONES', hilos // 2)), hilos - 1
+        ))
+        self.EVENTOS_DURACION_MAXIMA = int(os.getenv('EVENTOS_DURACION_MAXIMA', '300'))
+        self.EVENTOS_LATIDO = int(os.getenv('EVENTOS_LATIDO', '15'))
+    
+    def opciones_engine(self, asincrono=False):
+        """Opciones de create_engine: pool y tiempo máximo por sentencia (PostgreSQL)"""
+        backend = make_url(self.DATABASE_URL).get_backend_name()
+        if backend == 'sqlite':
+            # SQLite usa su propio pool de un solo archivo; las opciones de QueuePool no aplican
+            return {}
+        
+        opciones = {
+            'pool_size': self.DB_POOL_SIZE,
+            'max_overflow': self.DB_MAX_OVERFLOW,
+            'pool_timeout': self.DB_POOL_TIMEOUT,
+            'pool_pre_ping': self.DB_POOL_PRE_PING,
+            'pool_recycle': self.DB_POOL_RECYCLE,
+        }
+        if backend == 'postgresql' and self.DB_STATEMENT_TIMEOUT_MS > 0:
+            if asincrono:
+                opciones['connect_args'] = {'server_settings': {'statement_timeout': str(self.DB_STATEMENT_TIMEOUT_MS)}}
+            else:
+                opciones['connect_args'] = {'options': f'-c statement_timeout={self.DB_STATEMENT_TIMEOUT_MS}'}
+        return opciones
 
 
 class ValidadorRangos:
@@ -44,27 +140,900 @@ class ValidadorRangos:
         jerarquia_n = cls.JERARQUIA_NINJA.get(rango_ninja, 0)
         jerarquia_m = cls.JERARQUIA_MISION.get(rango_mision, 0)
         return jerarquia_n >= jerarquia_m
+    
+    @classmethod
+    def matriz_compatibilidad(cls):
+        """Matriz rango_ninja x rango_mision -> bool construida desde las jerarquías"""
+        return {
+            rango_ninja: {
+                rango_mision: cls.JERARQUIA_NINJA[rango_ninja] >= cls.JERARQUIA_MISION[rango_mision]
+                for rango_mision in cls.RANGOS_MISION
+            }
+            for rango_ninja in cls.RANGOS_NINJA
+        }
+
+
+class ProyeccionListado:
+    """Listados con paginación por cursor (keyset) y proyección de columnas en SQL"""
+    
+    LIMITE_MAXIMO = 1000
+    
+    def __init__(self, columna_id, campos):
+        # campos: {nombre: (expresion SQL, conversor o None, (entidad, condicion) o None)}
+        self.columna_id = columna_id
+        self.campos = campos
+    
+    def _resolver_campos(self, campos):
+        """Valida los campos pedidos; sin campos se devuelven todos"""
+        if not campos:
+            return list(self.campos)
+        invalidos = [c for c in campos if c not in self.campos]
+        if invalidos:
+            raise ValueError(f'Campos inválidos: {invalidos}. Disponibles: {list(self.campos)}')
+        return list(dict.fromkeys(campos))
+    
+    def consulta(self, after_id=None, campos=None, filtros=()):
+        """Construye el SELECT ordenado por id con solo las columnas pedidas"""
+        nombres = self._resolver_campos(campos)
+        consulta = select(
+            self.columna_id.label('_cursor'),
+            *[self.campos[nombre][0].label(nombre) for nombre in nombres]
+        )
+        
+        uniones = []
+        for nombre in nombres:
+            union = self.campos[nombre][2]
+            if union is not None and union not in uniones:
+                uniones.append(union)
+                consulta = consulta.outerjoin(*union)
+        
+        if after_id is not None:
+            consulta = consulta.where(self.columna_id > after_id)
+        for filtro in filtros:
+            consulta = consulta.where(filtro)
+        return consulta.order_by(self.columna_id), nombres
+    
+    def serializador(self, nombres):
+        """Función que convierte una fila de consulta() (tupla de columnas) en el diccionario de respuesta"""
+        # Las filas empiezan por _cursor; las columnas extra que se añadan al final se ignoran
+        claves = ('_cursor', *nombres)
+        conversiones = [(nombre, self.campos[nombre][1]) for nombre in nombres if self.campos[nombre][1]]
+        
+        def serializar(fila):
+            resultado = dict(zip(claves, fila))
+            del resultado['_cursor']
+            for nombre, conversor in conversiones:
+                resultado[nombre] = conversor(resultado[nombre])
+            return resultado
+        return serializar
+    
+    def obtener(self, valor_id, campos=None):
+        """Un registro por id con la misma forma que en el listado, o None si no existe"""
+        consulta, nombres = self.consulta(campos=campos, filtros=[self.columna_id == valor_id])
+        fila = db.session.execute(consulta).first()
+        return self.serializador(nombres)(fila) if fila is not None else None
+    
+    def obtener_varios(self, ids, campos=None):
+        """Registros por id con la misma forma que en el listado, ordenados por id"""
+        registros = []
+        for lote in OperacionLote.en_lotes(list(ids)):
+            consulta, nombres = self.consulta(campos=campos, filtros=[self.columna_id.in_(lote)])
+            registros.extend(map(self.serializador(nombres), db.session.execute(consulta)))
+        return registros
+    
+    def iterar(self, after_id=None, limite=None, campos=None, filtros=(), tamano_lote=1000):
+        """Recorre el listado con un cursor del servidor, serializando fila a fila"""
+        consulta, nombres = self.consulta(after_id, campos, filtros)
+        if limite is not None:
+            consulta = consulta.limit(limite)
+        
+        serializar = self.serializador(nombres)
+        for fila in db.session.execute(consulta.execution_options(yield_per=tamano_lote)):
+            yield serializar(fila)
+    
+    def consulta_pagina(self, after_id=None, limite=None, campos=None, filtros=()):
+        """Construye el SELECT de una página: pide una fila extra para saber si existe otra"""
+        consulta, nombres = self.consulta(after_id, campos, filtros)
+        
+        if limite is not None:
+            if limite < 1 or limite > self.LIMITE_MAXIMO:
+                raise ValueError(f'limit debe estar entre 1 y {self.LIMITE_MAXIMO}')
+            consulta = consulta.limit(limite + 1)
+        return consulta, nombres
+    
+    def pagina(self, filas, nombres, limite=None):
+        """Serializa las filas de consulta_pagina y devuelve (filas, siguiente_cursor)"""
+        siguiente_cursor = None
+        if limite is not None and len(filas) > limite:
+            filas = filas[:limite]
+            siguiente_cursor = filas[-1]._cursor
+        
+        return list(map(self.serializador(nombres), filas)), siguiente_cursor
+    
+    def listar(self, after_id=None, limite=None, campos=None, filtros=()):
+        """Devuelve (filas, siguiente_cursor); el cursor es None en la última página"""
+        consulta, nombres = self.consulta_pagina(after_id, limite, campos, filtros)
+        return self.pagina(db.session.execute(consulta).all(), nombres, limite)
+
+
+def _isoformat(fecha):
+    return fecha.isoformat() if fecha else None
+
+
+def _lista_jutsus(jutsus):
+    return jutsus.split(',') if jutsus else []
+
+
+def _publicar_filas(eventos, entidad, operacion, proyeccion, ids, campos_por_id=None):
+    """Un evento por fila con el registro (o solo los campos que cambiaron); con muchas filas, un recargar
+
+    Sin nadie escuchando tampoco se consulta nada: el recargar queda en el historial
+    para quien se reconecte.
+    """
+    if not ids:
+        return
+    if not eventos.activo or len(ids) > eventos.LIMITE_DETALLE:
+        eventos.publicar(evento(entidad, RECARGAR))
+        return
+    eventos.publicar(*[
+        evento(entidad, operacion, fila['id'],
+               fila if campos_por_id is None else {campo: fila[campo] for campo in campos_por_id[fila['id']]})
+        for fila in proyeccion.obtener_varios(ids)
+    ])
+
+
+# Proyecciones compartidas por listados, consultas por id y reportes
+PROYECCION_NINJAS = ProyeccionListado(Ninja.id, {
+    'id': (Ninja.id, None, None),
+    'nombre': (Ninja.nombre, None, None),
+    'rango': (Ninja.rango, None, None),
+    'ataque': (Ninja.ataque, None, None),
+    'defensa': (Ninja.defensa, None, None),
+    'chakra': (Ninja.chakra, None, None),
+    'aldea': (Ninja.aldea, None, None),
+    'jutsus': (Ninja.jutsus, _lista_jutsus, None),
+    'fecha_registro': (Ninja.fecha_registro, _isoformat, None),
+})
+
+PROYECCION_MISIONES = ProyeccionListado(Mision.id, {
+    'id': (Mision.id, None, None),
+    'nombre': (Mision.nombre, None, None),
+    'rango': (Mision.rango, None, None),
+    'recompensa': (Mision.recompensa, None, None),
+    'descripcion': (Mision.descripcion, None, None),
+    'fecha_creacion': (Mision.fecha_creacion, _isoformat, None),
+    'capacidad': (Mision.capacidad, None, None),
+})
+
+_UNION_NINJA = (Ninja, Ninja.id == AsignacionMision.ninja_id)
+_UNION_MISION = (Mision, Mision.id == AsignacionMision.mision_id)
+PROYECCION_ASIGNACIONES = ProyeccionListado(AsignacionMision.id, {
+    'id': (AsignacionMision.id, None, None),
+    'ninja_id': (AsignacionMision.ninja_id, None, None),
+    'ninja_nombre': (Ninja.nombre, None, _UNION_NINJA),
+    'mision_id': (AsignacionMision.mision_id, None, None),
+    'mision_nombre': (Mision.nombre, None, _UNION_MISION),
+    'fecha_asignacion': (AsignacionMision.fecha_asignacion, _isoformat, None),
+    'fecha_completado': (AsignacionMision.fecha_completado, _isoformat, None),
+    'completada': (AsignacionMision.completada, None, None),
+})
+
+
+class OperacionLote:
+    """Utilidades para operaciones masivas dentro de una sola transacción"""
+    
+    TAMANO_LOTE = 1000
+    ENTERO_MAXIMO = 2 ** 31 - 1
+    
+    @classmethod
+    def error_columnas(cls, modelo, fila):
+        """Primer error de la fila contra las restricciones de sus columnas (nulos, tipos y longitudes)
+        
+        Se comprueba antes de escribir: un error de la base deshace el lote entero y pierde
+        el resultado por elemento.
+        """
+        for campo, valor in fila.items():
+            columna = modelo.__table__.columns[campo]
+            if valor is None:
+                if not columna.nullable:
+                    return f'{campo} es obligatorio'
+            elif isinstance(columna.type, Integer):
+                if isinstance(valor, bool) or not isinstance(valor, int):
+                    return f'{campo} debe ser un entero'
+                if not -cls.ENTERO_MAXIMO - 1 <= valor <= cls.ENTERO_MAXIMO:
+                    return f'{campo} está fuera de rango'
+            elif isinstance(columna.type, String):
+                if not isinstance(valor, str):
+                    return f'{campo} debe ser texto'
+                if columna.type.length is not None and len(valor) > columna.type.length:
+                    return f'{campo} admite como máximo {columna.type.length} caracteres'
+        return None
+    
+    @classmethod
+    def en_lotes(cls, valores):
+        """Divide una lista en trozos de TAMANO_LOTE"""
+        for inicio in range(0, len(valores), cls.TAMANO_LOTE):
+            yield valores[inicio:inicio + cls.TAMANO_LOTE]
+    
+    @classmethod
+    def insertar(cls, modelo, filas):
+        """Inserta las filas con executemany y devuelve sus ids en el mismo orden"""
+        # PostgreSQL lo envía como INSERT ... VALUES multi-fila; SQLite no garantiza el
+        # orden de RETURNING y SQLAlchemy lo degrada a una sentencia por fila
+        ids = []
+        for lote in cls.en_lotes(filas):
+            resultado = db.session.execute(
+                insert(modelo).returning(modelo.id, sort_by_parameter_order=True), lote
+            )
+            ids.extend(resultado.scalars())
+        return ids
+    
+    @staticmethod
+    def insert_sin_conflictos(tabla, columnas_unicas):
+        """INSERT ... ON CONFLICT (columnas_unicas) DO NOTHING, o None si el motor no lo admite"""
+        dialecto = db.session.get_bind().dialect.name
+        if dialecto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as insert_dialecto
+        elif dialecto == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as insert_dialecto
+        else:
+            return None
+        return insert_dialecto(tabla).on_conflict_do_nothing(index_elements=columnas_unicas)
+    
+    @classmethod
+    def cargar_por_ids(cls, columnas, columna_id, ids):
+        """Carga {id: fila} con consultas IN de a TAMANO_LOTE ids"""
+        filas = {}
+        for lote in cls.en_lotes(list(set(ids))):
+            for fila in db.session.execute(select(columna_id, *columnas).where(columna_id.in_(lote))):
+                filas[fila[0]] = fila
+        return filas
+    
+    @staticmethod
+    def resumen(resultados):
+        """Resume el resultado por elemento de una operación masiva"""
+        exitosos = sum(1 for r in resultados if r['success'])
+        return {
+            'total': len(resultados),
+            'exitosos': exitosos,
+            'fallidos': len(resultados) - exitosos,
+            'resultados': resultados
+        }
+
+
+class VersionesTablas:
+    """Contadores de versión por tabla, incrementados en cada escritura, para ETag y Last-Modified"""
+    
+    NINJAS = 'ninjas'
+    MISIONES = 'misiones'
+    ASIGNACIONES = 'asignaciones_misiones'
+    # Solo cambia con las columnas del top-K (altas, bajas, rango, aldea y estadísticas)
+    RANKING = 'ninjas_ranking'
+    TODAS = [NINJAS, MISIONES, ASIGNACIONES, RANKING]
+    
+    @staticmethod
+    def _ahora():
+        return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    
+    @classmethod
+    def inicializar(cls):
+        """Crea las filas de contador que falten"""
+        existentes = set(db.session.execute(select(VersionTabla.tabla)).scalars())
+        for tabla in cls.TODAS:
+            if tabla not in existentes:
+                db.session.add(VersionTabla(tabla=tabla, version=0, actualizado=cls._ahora()))
+        db.session.commit()
+    
+    @classmethod
+    def incrementar(cls, *tablas):
+        """Incrementa la versión dentro de la transacción de la escritura (antes del commit)"""
+        db.session.execute(
+            update(VersionTabla)
+            .where(VersionTabla.tabla.in_(tablas))
+            .values(version=VersionTabla.version + 1, actualizado=cls._ahora())
+            .execution_options(synchronize_session=False)
+        )
+    
+    @classmethod
+    def confirmar(cls, *tablas):
+        """Confirma la escritura y después incrementa las versiones en una transacción propia y corta
+
+        Para las escrituras concurrentes de asignaciones: dentro de su transacción, el UPDATE
+        de versiones_tablas bloquearía la misma fila hasta el commit y todas se esperarían
+        entre sí. Como las versiones se leen antes que los datos, incrementarlas después del
+        commit solo puede servir por un instante el ETag anterior, nunca guardar en caché
+        datos viejos bajo la versión nueva.
+        """
+        db.session.commit()
+        cls.incrementar(*tablas)
+        db.session.commit()
+    
+    @classmethod
+    def clave(cls, clave, tablas):
+        """Clave de caché que incluye la versión de las tablas de las que depende el valor
+
+        Cada proceso puede tener su propia caché en memoria: sin la versión en la clave, un
+        worker que no atendió la escritura serviría el cuerpo anterior bajo el ETag nuevo. En
+        una petición se reutilizan las versiones ya leídas por _condicional para el ETag.
+        """
+        versiones = getattr(request, 'versiones_tablas', None) if has_request_context() else None
+        if versiones is None or not versiones.keys() >= set(tablas):
+            versiones = {tabla: version for tabla, version, _ in cls.obtener(tablas)}
+        return clave + '@' + ','.join(f'{tabla}:{versiones.get(tabla, 0)}' for tabla in sorted(tablas))
+    
+    @classmethod
+    def obtener(cls, tablas):
+        """Devuelve [(tabla, version, actualizado)] en una sola consulta"""
+        return db.session.execute(
+            select(VersionTabla.tabla, VersionTabla.version, VersionTabla.actualizado)
+            .where(VersionTabla.tabla.in_(tablas))
+            .order_by(VersionTabla.tabla)
+        ).all()
+
+
+class IndiceJutsus:
+    """Mantiene la tabla normalizada ninjas_jutsus a partir de la columna de texto de cada ninja"""
+    
+    OPERADORES = ('and', 'or')
+    
+    @staticmethod
+    def separar(texto):
+        """Devuelve {clave: nombre} de los jutsus de un texto separado por comas, en orden"""
+        jutsus = {}
+        for nombre in (texto or '').split(','):
+            nombre = nombre.strip()
+            if nombre and nombre.lower() not in jutsus:
+                jutsus[nombre.lower()] = nombre
+        return jutsus
+    
+    @classmethod
+    def _ids_por_clave(cls, nombres_por_clave):
+        """Obtiene los ids de los jutsus, creando los que todavía no existen"""
+        ids = {}
+        for lote in OperacionLote.en_lotes(list(nombres_por_clave)):
+            ids.update(db.session.execute(
+                select(Jutsu.clave, Jutsu.id).where(Jutsu.clave.in_(lote))
+            ).all())
+        
+        # Otra petición puede crear el mismo jutsu a la vez: el índice único decide y luego se relee.
+        # En orden de clave para que dos lotes concurrentes no se interbloqueen
+        faltantes = [
+            {'clave': clave, 'nombre': nombre}
+            for clave, nombre in sorted(nombres_por_clave.items()) if clave not in ids
+        ]
+        sentencia = OperacionLote.insert_sin_conflictos(Jutsu.__table__, ['clave'])
+        for lote in OperacionLote.en_lotes(faltantes):
+            if sentencia is not None:
+                db.session.execute(sentencia, lote)
+            else:
+                for fila in lote:
+                    try:
+                        with db.session.begin_nested():
+                            db.session.execute(insert(Jutsu), fila)
+                    except IntegrityError:
+                        pass
+            ids.update(db.session.execute(
+                select(Jutsu.clave, Jutsu.id).where(Jutsu.clave.in_([f['clave'] for f in lote]))
+            ).all())
+        return ids
+    
+    @classmethod
+    def sincronizar(cls, textos_por_ninja):
+        """Reemplaza las filas de ninjas_jutsus de cada ninja {ninja_id: texto de jutsus}"""
+        if not textos_por_ninja:
+            return
+        jutsus_por_ninja = {ninja_id: cls.separar(texto) for ninja_id, texto in textos_por_ninja.items()}
+        nombres = {}
+        for jutsus in jutsus_por_ninja.values():
+            for clave, nombre in jutsus.items():
+                nombres.setdefault(clave, nombre)
+        ids = cls._ids_por_clave(nombres)
+        
+        for lote in OperacionLote.en_lotes(list(jutsus_por_ninja)):
+            db.session.execute(
+                delete(NinjaJutsu).where(NinjaJutsu.ninja_id.in_(lote))
+                .execution_options(synchronize_session=False)
+            )
+        filas = [
+            {'ninja_id': ninja_id, 'jutsu_id': ids[clave]}
+            for ninja_id, jutsus in jutsus_por_ninja.items() for clave in jutsus
+        ]
+        for lote in OperacionLote.en_lotes(filas):
+            db.session.execute(insert(NinjaJutsu), lote)
+    
+    @classmethod
+    def filtro(cls, nombres, operador='and'):
+        """Condición sobre Ninja.id: ninjas que conocen todos ('and') o alguno ('or') de los jutsus"""
+        if operador not in cls.OPERADORES:
+            raise ValueError(f'jutsu_op debe ser uno de: {list(cls.OPERADORES)}')
+        claves = list(dict.fromkeys(nombre.strip().lower() for nombre in nombres if nombre.strip()))
+        
+        consulta = (
+            select(NinjaJutsu.ninja_id)
+            .join(Jutsu, Jutsu.id == NinjaJutsu.jutsu_id)
+            .where(Jutsu.clave.in_(claves))
+        )
+        if operador == 'and':
+            consulta = consulta.group_by(NinjaJutsu.ninja_id).having(
+                func.count(NinjaJutsu.jutsu_id) == len(claves)
+            )
+        return Ninja.id.in_(consulta)
+
+
+class EstadisticasNinjas:
+    """Resumen por ninja (asignadas, completadas, recompensa, última completada) mantenido incrementalmente"""
+    
+    tabla = EstadisticaNinja.__table__
+    
+    @classmethod
+    def crear(cls, ninja_ids):
+        """Crea el resumen vacío de ninjas nuevos"""
+        for lote in OperacionLote.en_lotes([{'ninja_id': ninja_id} for ninja_id in ninja_ids]):
+            db.session.execute(insert(cls.tabla), lote)
+    
+    @classmethod
+    def sumar_asignadas(cls, ninja_ids):
+        """Suma una asignación por cada aparición del ninja en la lista"""
+        conteos = [{'b_ninja_id': ninja_id, 'b_n': n} for ninja_id, n in Counter(ninja_ids).items()]
+        sentencia = (
+            update(cls.tabla)
+            .where(cls.tabla.c.ninja_id == bindparam('b_ninja_id'))
+            .values(misiones_asignadas=cls.tabla.c.misiones_asignadas + bindparam('b_n'))
+        )
+        for lote in OperacionLote.en_lotes(conteos):
+            db.session.execute(sentencia, lote)
+    
+    @classmethod
+    def sumar_completadas(cls, completadas, fecha):
+        """Suma completadas y recompensa; completadas es una lista de (ninja_id, recompensa)"""
+        por_ninja = {}
+        for ninja_id, recompensa in completadas:
+            n, total = por_ninja.get(ninja_id, (0, 0))
+            por_ninja[ninja_id] = (n + 1, total + (recompensa or 0))
+        
+        sentencia = (
+            update(cls.tabla)
+            .where(cls.tabla.c.ninja_id == bindparam('b_ninja_id'))
+            .values(
+                misiones_completadas=cls.tabla.c.misiones_completadas + bindparam('b_n'),
+                recompensa_total=cls.tabla.c.recompensa_total + bindparam('b_recompensa'),
+                # Con transacciones concurrentes gana la fecha más reciente, no el último commit
+                ultima_completada=case(
+                    (or_(cls.tabla.c.ultima_completada.is_(None), cls.tabla.c.ultima_completada < fecha), fecha),
+                    else_=cls.tabla.c.ultima_completada
+                )
+            )
+        )
+        filas = [
+            {'b_ninja_id': ninja_id, 'b_n': n, 'b_recompensa': total}
+            for ninja_id, (n, total) in por_ninja.items()
+        ]
+        for lote in OperacionLote.en_lotes(filas):
+            db.session.execute(sentencia, lote)
+    
+    @classmethod
+    def restar_mision(cls, mision_id):
+        """Descuenta las asignaciones de una misión que se va a eliminar"""
+        completada = AsignacionMision.completada.is_(True)
+        filas = [
+            {'b_ninja_id': ninja_id, 'b_n': n, 'b_completadas': completadas, 'b_recompensa': recompensa or 0}
+            for ninja_id, n, completadas, recompensa in db.session.execute(
+                select(
+                    AsignacionMision.ninja_id,
+                    func.count(AsignacionMision.id),
+                    func.count(case((completada, 1))),
+                    func.sum(case((completada, Mision.recompensa), else_=0))
+                )
+                .join(Mision, Mision.id == AsignacionMision.mision_id)
+                .where(AsignacionMision.mision_id == mision_id)
+                .group_by(AsignacionMision.ninja_id)
+            )
+        ]
+        if not filas:
+            return
+        
+        # La última completada se recalcula sin las asignaciones de esta misión
+        ultima = (
+            select(func.max(AsignacionMision.fecha_completado))
+            .where(
+                AsignacionMision.ninja_id == cls.tabla.c.ninja_id,
+                AsignacionMision.completada.is_(True),
+                AsignacionMision.mision_id != mision_id
+            )
+            .scalar_subquery()
+        )
+        sentencia = (
+            update(cls.tabla)
+            .where(cls.tabla.c.ninja_id == bindparam('b_ninja_id'))
+            .values(
+                misiones_asignadas=cls.tabla.c.misiones_asignadas - bindparam('b_n'),
+                misiones_completadas=cls.tabla.c.misiones_completadas - bindparam('b_completadas'),
+                recompensa_total=cls.tabla.c.recompensa_total - bindparam('b_recompensa'),
+                ultima_completada=ultima
+            )
+        )
+        for lote in OperacionLote.en_lotes(filas):
+            db.session.execute(sentencia, lote)
+    
+    @staticmethod
+    def consulta_agregada():
+        """Resumen calculado desde cero sobre asignaciones_misiones, por ninja"""
+        completada = AsignacionMision.completada.is_(True)
+        return (
+            select(
+                Ninja.id.label('ninja_id'),
+                func.count(AsignacionMision.id).label('misiones_asignadas'),
+                func.count(case((completada, 1))).label('misiones_completadas'),
+                func.coalesce(func.sum(case((completada, Mision.recompensa), else_=0)), 0).label('recompensa_total'),
+                func.max(case((completada, AsignacionMision.fecha_completado))).label('ultima_completada')
+            )
+            .outerjoin(AsignacionMision, AsignacionMision.ninja_id == Ninja.id)
+            .outerjoin(Mision, Mision.id == AsignacionMision.mision_id)
+            .group_by(Ninja.id)
+        )
+    
+    @classmethod
+    def reconstruir(cls):
+        """Recalcula todo el resumen con un INSERT ... SELECT"""
+        db.session.execute(delete(cls.tabla))
+        consulta = cls.consulta_agregada()
+        db.session.execute(insert(cls.tabla).from_select(
+            ['ninja_id', 'misiones_asignadas', 'misiones_completadas', 'recompensa_total', 'ultima_completada'],
+            consulta
+        ))
+    
+    @classmethod
+    def verificar(cls):
+        """Compara el resumen con el agregado real y devuelve las diferencias por ninja"""
+        esperado = cls.consulta_agregada().subquery()
+        columnas = ['misiones_asignadas', 'misiones_completadas', 'recompensa_total', 'ultima_completada']
+        filas = db.session.execute(
+            select(esperado, *[cls.tabla.c[columna].label(f'actual_{columna}') for columna in columnas])
+            .outerjoin(cls.tabla, cls.tabla.c.ninja_id == esperado.c.ninja_id)
+        )
+        diferencias = []
+        for fila in filas:
+            distintas = {
+                columna: {'esperado': getattr(fila, columna), 'actual': getattr(fila, f'actual_{columna}')}
+                for columna in columnas
+                if getattr(fila, columna) != getattr(fila, f'actual_{columna}')
+            }
+            if distintas:
+                diferencias.append({'ninja_id': fila.ninja_id, 'diferencias': distintas})
+        return diferencias
+
+
+class CuposAsignacion:
+    """Alta concurrente de asignaciones sin duplicados ni sobrecupo y sin un bloqueo global
+
+    El cupo de cada misión (Mision.capacidad) y el de misiones activas de cada ninja se
+    reservan con UPDATE condicionales: comprobar e incrementar es una sola sentencia que
+    bloquea únicamente esa fila hasta el commit, así que las altas sobre otras misiones y
+    ninjas no se esperan entre sí. El índice único (ninja_id, mision_id) con INSERT ...
+    ON CONFLICT DO NOTHING impide la misma asignación dos veces. Las filas se bloquean
+    siempre en el mismo orden (misiones, ninjas, inserción; cada grupo por id) para que
+    los lotes concurrentes no se interbloqueen.
+    """
+
+    misiones = Mision.__table__
+    estadisticas = EstadisticaNinja.__table__
+    asignaciones = AsignacionMision.__table__
+
+    ERROR_DUPLICADA = 'El ninja ya tiene asignada esta misión'
+
+    @classmethod
+    def asignar(cls, parejas, limite_activas=None, fecha=None):
+        """Inserta las parejas (ninja_id, mision_id) que caben en los cupos
+
+        Ninjas y misiones ya deben existir con rangos compatibles. Devuelve
+        ({pareja: id de asignación}, {pareja: error}); las repetidas cuentan una vez.
+        """
+        parejas = list(dict.fromkeys(parejas))
+        errores = {}
+        for pareja in cls._existentes(parejas):
+            errores[pareja] = cls.ERROR_DUPLICADA
+        parejas = [pareja for pareja in parejas if pareja not in errores]
+
+        # Cupo de las misiones: las de capacidad ilimitada solo suman al contador
+        capacidades = OperacionLote.cargar_por_ids([Mision.capacidad], Mision.id, [m for _, m in parejas])
+        for pareja in parejas:
+            if pareja[1] not in capacidades:
+                errores[pareja] = 'Misión no encontrada'
+        parejas = [pareja for pareja in parejas if pareja not in errores]
+        por_mision = Counter(m for _, m in parejas)
+        concedidas = {
+            mision_id: pedidas for mision_id, pedidas in por_mision.items()
+            if capacidades[mision_id].capacidad is None
+        }
+        concedidas.update(cls._reservar(
+            cls.misiones.c.id, cls.misiones.c.ninjas_asignados,
+            lambda n: (cls.misiones.c.ninjas_asignados + n) <= cls.misiones.c.capacidad,
+            {mision_id: pedidas for mision_id, pedidas in por_mision.items() if mision_id not in concedidas}
+        ))
+        cls._sumar(cls.misiones.c.id, cls.misiones.c.ninjas_asignados, {
+            mision_id: pedidas for mision_id, pedidas in por_mision.items()
+            if capacidades[mision_id].capacidad is None
+        })
+        aceptadas = []
+        for ninja_id, mision_id in parejas:
+            if concedidas.get(mision_id, 0) > 0:
+                concedidas[mision_id] -= 1
+                aceptadas.append((ninja_id, mision_id))
+            else:
+                errores[(ninja_id, mision_id)] = (
+                    f'La misión {mision_id} no tiene cupo (capacidad {capacidades[mision_id].capacidad})'
+                )
+
+        # Cupo de los ninjas: misiones activas (asignadas y no completadas) según el resumen por ninja
+        por_ninja = Counter(n for n, _ in aceptadas)
+        if limite_activas is None:
+            cls._sumar(cls.estadisticas.c.ninja_id, cls.estadisticas.c.misiones_asignadas, por_ninja)
+            concedidas = dict(por_ninja)
+        else:
+            activas = cls.estadisticas.c.misiones_asignadas - cls.estadisticas.c.misiones_completadas
+            concedidas = cls._reservar(
+                cls.estadisticas.c.ninja_id, cls.estadisticas.c.misiones_asignadas,
+                lambda n: (activas + n) <= limite_activas, por_ninja
+            )
+        parejas, rechazadas = [], []
+        for ninja_id, mision_id in aceptadas:
+            if concedidas.get(ninja_id, 0) > 0:
+                concedidas[ninja_id] -= 1
+                parejas.append((ninja_id, mision_id))
+            else:
+                errores[(ninja_id, mision_id)] = f'El ninja {ninja_id} ya tiene {limite_activas} misiones activas'
+                rechazadas.append(mision_id)
+        cls._sumar(cls.misiones.c.id, cls.misiones.c.ninjas_asignados, Counter(rechazadas), signo=-1)
+
+        # La asignación misma; si otra transacción insertó la pareja antes se devuelven los cupos
+        ids = cls._insertar(parejas, fecha or datetime.now())
+        duplicadas = [pareja for pareja in parejas if pareja not in ids]
+        for pareja in duplicadas:
+            errores[pareja] = cls.ERROR_DUPLICADA
+        cls._sumar(cls.misiones.c.id, cls.misiones.c.ninjas_asignados, Counter(m for _, m in duplicadas), signo=-1)
+        cls._sumar(cls.estadisticas.c.ninja_id, cls.estadisticas.c.misiones_asignadas,
+                   Counter(n for n, _ in duplicadas), signo=-1)
+        return ids, errores
+
+    @classmethod
+    def _existentes(cls, parejas):
+        """Parejas que ya están asignadas (lectura sin bloqueo; el índice único tiene la última palabra)"""
+        existentes = set()
+        columnas = tuple_(AsignacionMision.ninja_id, AsignacionMision.mision_id)
+        for lote in OperacionLote.en_lotes(parejas):
+            existentes.update(
+                tuple(fila) for fila in db.session.execute(
+                    select(AsignacionMision.ninja_id, AsignacionMision.mision_id).where(columnas.in_(lote))
+                )
+            )
+        return existentes
+
+    @staticmethod
+    def _reservar(columna_id, contador, cabe, pedidas):
+        """{id: concedidas} con UPDATE condicionales, por id ascendente
+
+        Se intenta reservar todo lo pedido en una sentencia; si no cabe, de a uno hasta
+        llenar el cupo. Cada UPDATE comprueba y suma de forma atómica.
+        """
+        tabla = columna_id.table
+        concedidas = {}
+        for fila_id in sorted(pedidas):
+            n = pedidas[fila_id]
+            reservar = lambda k: db.session.execute(  # noqa: E731
+                update(tabla).where(columna_id == fila_id, cabe(k)).values({contador.key: contador + k})
+            ).rowcount
+            if reservar(n):
+                concedidas[fila_id] = n
+                continue
+            concedidas[fila_id] = 0
+            while n > 1 and concedidas[fila_id] < n and reservar(1):
+                concedidas[fila_id] += 1
+        return concedidas
+
+    @staticmethod
+    def _sumar(columna_id, contador, conteos, signo=1):
+        """Suma (o resta) a cada contador sin condición, con executemany en orden de id"""
+        filas = [{'b_id': fila_id, 'b_n': signo * n} for fila_id, n in sorted(conteos.items()) if n]
+        sentencia = (
+            update(columna_id.table)
+            .where(columna_id == bindparam('b_id'))
+            .values({contador.key: contador + bindparam('b_n')})
+        )
+        for lote in OperacionLote.en_lotes(filas):
+            db.session.execute(sentencia, lote)
+
+    @classmethod
+    def _insertar(cls, parejas, fecha):
+        """INSERT ... ON CONFLICT DO NOTHING; devuelve {pareja: id} de las filas insertadas"""
+        if not parejas:
+            return {}
+        sentencia = OperacionLote.insert_sin_conflictos(cls.asignaciones, ['ninja_id', 'mision_id'])
+        if sentencia is None:
+            return cls._insertar_con_savepoints(parejas, fecha)
+
+        sentencia = sentencia.returning(
+            cls.asignaciones.c.id, cls.asignaciones.c.ninja_id, cls.asignaciones.c.mision_id
+        )
+        filas = [
+            {'ninja_id': ninja_id, 'mision_id': mision_id, 'fecha_asignacion': fecha, 'completada': False}
+            for ninja_id, mision_id in sorted(parejas)
+        ]
+        ids = {}
+        for lote in OperacionLote.en_lotes(filas):
+            for asignacion_id, ninja_id, mision_id in db.session.execute(sentencia, lote):
+                ids[(ninja_id, mision_id)] = asignacion_id
+        return ids
+
+    @classmethod
+    def _insertar_con_savepoints(cls, parejas, fecha):
+        """Alternativa para motores sin ON CONFLICT: una inserción por pareja dentro de un SAVEPOINT"""
+        ids = {}
+        for ninja_id, mision_id in sorted(parejas):
+            try:
+                with db.session.begin_nested():
+                    ids[(ninja_id, mision_id)] = db.session.execute(
+                        insert(cls.asignaciones).returning(cls.asignaciones.c.id),
+                        {'ninja_id': ninja_id, 'mision_id': mision_id, 'fecha_asignacion': fecha, 'completada': False}
+                    ).scalar_one()
+            except IntegrityError:
+                pass
+        return ids
+
+    @classmethod
+    def restar_ninja(cls, ninja_id):
+        """Libera el cupo de las misiones de un ninja que se va a eliminar"""
+        db.session.execute(
+            update(cls.misiones)
+            .where(cls.misiones.c.id.in_(
+                select(AsignacionMision.mision_id).where(AsignacionMision.ninja_id == ninja_id)
+            ))
+            .values(ninjas_asignados=cls.misiones.c.ninjas_asignados - 1)
+        )
+
+    @staticmethod
+    def _conteo_real():
+        return (
+            select(func.count(AsignacionMision.id))
+            .where(AsignacionMision.mision_id == Mision.id)
+            .scalar_subquery()
+        )
+
+    @classmethod
+    def reconstruir(cls):
+        """Recalcula ninjas_asignados de todas las misiones desde las asignaciones"""
+        db.session.execute(update(cls.misiones).values(ninjas_asignados=cls._conteo_real()))
+
+    @classmethod
+    def verificar(cls):
+        """Misiones cuyo contador o cupo no coincide con las asignaciones reales"""
+        real = cls._conteo_real().label('real')
+        filas = db.session.execute(select(Mision.id, Mision.capacidad, Mision.ninjas_asignados, real))
+        return [
+            {'mision_id': fila.id, 'capacidad': fila.capacidad, 'contador': fila.ninjas_asignados, 'real': fila.real}
+            for fila in filas
+            if fila.ninjas_asignados != fila.real or (fila.capacidad is not None and fila.real > fila.capacidad)
+        ]
 
 
 class NinjaController:
     """Controlador para gestionar operaciones de Ninjas"""
     
-    def __init__(self):
+    def __init__(self, cache=None, eventos=None):
         self.validador = ValidadorRangos()
+        self.cache = cache or CacheLectura()
+        self.eventos = eventos or BusEventos()
+        self.listado = PROYECCION_NINJAS
+        # Índice en memoria del top-K, reconstruido en segundo plano cuando cambia su versión
+        self._ranking = None
+        self._version_ranking = None
+        self._hilo_ranking = None
+        self._lock_ranking = threading.Lock()
+    
+    def _filtros(self, jutsus, jutsu_op):
+        """Condiciones de búsqueda por jutsu"""
+        return [IndiceJutsus.filtro(jutsus, jutsu_op)] if jutsus else []
+    
+    def iterar_todos(self, after_id=None, limite=None, campos=None, jutsus=None, jutsu_op='and'):
+        """Recorre los ninjas sin cargarlos todos en memoria"""
+        return self.listado.iterar(after_id, limite, campos, self._filtros(jutsus, jutsu_op))
     
-    def listar_todos(self):
-        """Obtiene todos los ninjas"""
+    def listar_todos(self, after_id=None, limite=None, campos=None, jutsus=None, jutsu_op='and'):
+        """Obtiene los ninjas, opcionalmente paginados, filtrados por jutsu y con campos seleccionados"""
         try:
-            ninjas = Ninja.query.all()
-            return {'success': True, 'data': [ninja.to_dict() for ninja in ninjas]}
+            data, siguiente_cursor = self.listado.listar(after_id, limite, campos, self._filtros(jutsus, jutsu_op))
+            return {'success': True, 'data': data, 'siguiente_cursor': siguiente_cursor}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    COLUMNAS_RANKING = {'rango', 'aldea', *ESTADISTICAS}
+    
+    def _ranking_actual(self):
+        """Devuelve (índice top-K, si está al día con la versión del ranking)
+        
+        Si cambiaron las columnas del ranking se reconstruye en un hilo aparte y, mientras
+        tanto, se sigue respondiendo con el índice anterior. Solo la primera carga espera.
+        """
+        (_, version, _), = VersionesTablas.obtener([VersionesTablas.RANKING])
+        with self._lock_ranking:
+            if self._ranking is None:
+                self._ranking, self._version_ranking = self._construir_ranking(), version
+            elif self._version_ranking != version and self._hilo_ranking is None:
+                self._hilo_ranking = threading.Thread(
+                    target=self._reconstruir_ranking, args=(current_app._get_current_object(), version),
+                    name='ranking', daemon=True
+                )
+                self._hilo_ranking.start()
+            return self._ranking, self._version_ranking == version
+    
+    @staticmethod
+    def _construir_ranking():
+        # La versión se lee antes que las filas: el índice nunca es más antiguo que su versión
+        filas = db.session.execute(
+            select(Ninja.id, Ninja.rango, Ninja.aldea, Ninja.ataque, Ninja.defensa, Ninja.chakra)
+            .execution_options(yield_per=OperacionLote.TAMANO_LOTE)
+        )
+        return RankingPoder(filas)
+    
+    def _reconstruir_ranking(self, app, version):
+        """Corre en su propio hilo, con su propio contexto de aplicación y su propia sesión"""
+        ranking = None
+        try:
+            with app.app_context():
+                ranking = self._construir_ranking()
+        finally:
+            with self._lock_ranking:
+                if ranking is not None:
+                    self._ranking, self._version_ranking = ranking, version
+                self._hilo_ranking = None
+    
+    def sincronizar_ranking(self):
+        """Deja el índice al día y espera a que termine su reconstrucción (benchmarks y mantenimiento)"""
+        self._ranking_actual()
+        with self._lock_ranking:
+            hilo = self._hilo_ranking
+        if hilo is not None:
+            hilo.join()
+    
+    def top(self, limite=10, rango=None, aldea=None, pesos=(1, 1, 1)):
+        """Los ninjas de mayor puntaje ponderado de ataque, defensa y chakra"""
+        try:
+            if rango is not None and not self.validador.validar_rango_ninja(rango):
+                return {'success': False, 'error': f'Rango inválido. Debe ser uno de: {ValidadorRangos.RANGOS_NINJA}'}
+            if limite < 1 or limite > ProyeccionListado.LIMITE_MAXIMO:
+                return {'success': False, 'error': f'limit debe estar entre 1 y {ProyeccionListado.LIMITE_MAXIMO}'}
+            if any(peso < 0 for peso in pesos) or not any(peso > 0 for peso in pesos):
+                return {'success': False, 'error': 'Los pesos deben ser no negativos y al menos uno mayor que cero'}
+            
+            ranking, al_dia = self._ranking_actual()
+            mejores = ranking.top(limite, pesos, rango, aldea)
+            consulta, nombres = self.listado.consulta(filtros=[Ninja.id.in_([ninja_id for _, ninja_id in mejores])])
+            serializar = self.listado.serializador(nombres)
+            ninjas = {fila._cursor: serializar(fila) for fila in db.session.execute(consulta)}
+            # Con el índice anterior pueden aparecer ninjas ya eliminados: se omiten
+            top = [
+                {'posicion': posicion, 'puntaje': puntaje, 'ninja': ninjas[ninja_id]}
+                for posicion, (puntaje, ninja_id) in enumerate(
+                    ((puntaje, ninja_id) for puntaje, ninja_id in mejores if ninja_id in ninjas), start=1
+                )
+            ]
+            # provisional: calculado con el índice anterior, no debe cachearse bajo el ETag actual
+            return {'success': True, 'data': top, 'provisional': not al_dia}
+            
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def obtener_por_id(self, ninja_id):
         """Obtiene un ninja por su ID"""
+        clave = VersionesTablas.clave(f'ninja:{ninja_id}', [VersionesTablas.NINJAS])
+        return self.cache.obtener(clave, lambda: self._cargar_por_id(ninja_id))
+    
+    def _cargar_por_id(self, ninja_id):
+        """Obtiene un ninja por su ID desde la base de datos"""
         try:
-            ninja = Ninja.query.get_or_404(ninja_id)
-            return {'success': True, 'data': ninja.to_dict()}
+            ninja = self.listado.obtener(ninja_id)
+            if ninja is None:
+                return {'success': False, 'error': 'Ninja no encontrado'}
+            return {'success': True, 'data': ninja}
         except Exception as e:
             return {'success': False, 'error': 'Ninja no encontrado'}
     
@@ -89,9 +1058,15 @@ class NinjaController:
             )
             
             db.session.add(ninja)
+            db.session.flush()
+            IndiceJutsus.sincronizar({ninja.id: ninja.jutsus})
+            EstadisticasNinjas.crear([ninja.id])
+            VersionesTablas.incrementar(VersionesTablas.NINJAS, VersionesTablas.RANKING)
             db.session.commit()
+            datos_ninja = ninja.to_dict()
+            self.eventos.publicar(evento('ninja', CREADO, ninja.id, datos_ninja))
             
-            return {'success': True, 'data': ninja.to_dict(), 'message': 'Ninja creado correctamente'}
+            return {'success': True, 'data': datos_ninja, 'message': 'Ninja creado correctamente'}
             
         except Exception as e:
             db.session.rollback()
@@ -101,6 +1076,7 @@ class NinjaController:
         """Actualiza un ninja existente"""
         try:
             ninja = Ninja.query.get_or_404(ninja_id)
+            antes = ninja.to_dict()
             
             if 'nombre' in datos:
                 ninja.nombre = datos['nombre']
@@ -117,9 +1093,101 @@ class NinjaController:
                 ninja.aldea = datos['aldea']
             if 'jutsus' in datos:
                 ninja.jutsus = datos['jutsus']
+                IndiceJutsus.sincronizar({ninja.id: ninja.jutsus})
             
+            despues = ninja.to_dict()
+            cambios = {campo: valor for campo, valor in despues.items() if antes[campo] != valor}
+            tablas = [VersionesTablas.NINJAS]
+            if self.COLUMNAS_RANKING & cambios.keys():
+                tablas.append(VersionesTablas.RANKING)
+            VersionesTablas.incrementar(*tablas)
             db.session.commit()
-            return {'success': True, 'data': ninja.to_dict(), 'message': 'Ninja actualizado'}
+            if cambios:
+                self.eventos.publicar(evento('ninja', ACTUALIZADO, ninja.id, cambios))
+            return {'success': True, 'data': despues, 'message': 'Ninja actualizado'}
+            
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
+    
+    CAMPOS_ACTUALIZABLES = ['nombre', 'rango', 'ataque', 'defensa', 'chakra', 'aldea', 'jutsus']
+    
+    def crear_lote(self, items):
+        """Crea o actualiza (si traen id) varios ninjas en una sola transacción"""
+        try:
+            if not isinstance(items, list):
+                return {'success': False, 'error': 'Se esperaba una lista de ninjas'}
+            
+            resultados = [None] * len(items)
+            nuevos, indices_nuevos, cambios, indices_cambios = [], [], [], []
+            
+            for indice, datos in enumerate(items):
+                if not isinstance(datos, dict):
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': 'Elemento inválido'}
+                elif 'rango' in datos and not self.validador.validar_rango_ninja(datos['rango']):
+                    resultados[indice] = {
+                        'indice': indice, 'success': False,
+                        'error': f'Rango inválido. Debe ser uno de: {ValidadorRangos.RANGOS_NINJA}'
+                    }
+                elif 'id' in datos:
+                    cambio = {'id': datos['id'], **{
+                        campo: datos[campo] for campo in self.CAMPOS_ACTUALIZABLES if campo in datos
+                    }}
+                    error = OperacionLote.error_columnas(Ninja, cambio)
+                    if error:
+                        resultados[indice] = {'indice': indice, 'success': False, 'error': error}
+                    else:
+                        cambios.append(cambio)
+                        indices_cambios.append(indice)
+                elif 'rango' not in datos or not datos.get('nombre'):
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': 'nombre y rango son obligatorios'}
+                else:
+                    nuevo = {
+                        'nombre': datos['nombre'],
+                        'rango': datos['rango'],
+                        'ataque': datos.get('ataque', 50),
+                        'defensa': datos.get('defensa', 50),
+                        'chakra': datos.get('chakra', 100),
+                        'aldea': datos.get('aldea', 'Konohagakure'),
+                        'jutsus': datos.get('jutsus', '')
+                    }
+                    error = OperacionLote.error_columnas(Ninja, nuevo)
+                    if error:
+                        resultados[indice] = {'indice': indice, 'success': False, 'error': error}
+                    else:
+                        nuevos.append(nuevo)
+                        indices_nuevos.append(indice)
+            
+            existentes = OperacionLote.cargar_por_ids([], Ninja.id, [c['id'] for c in cambios])
+            actualizables = []
+            for cambio, indice in zip(cambios, indices_cambios):
+                if cambio['id'] in existentes:
+                    actualizables.append(cambio)
+                    resultados[indice] = {'indice': indice, 'success': True, 'id': cambio['id'], 'operacion': 'actualizado'}
+                else:
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': 'Ninja no encontrado'}
+            
+            textos_jutsus = {cambio['id']: cambio['jutsus'] for cambio in actualizables if 'jutsus' in cambio}
+            ids_nuevos = OperacionLote.insertar(Ninja, nuevos)
+            for ninja_id, indice, nuevo in zip(ids_nuevos, indices_nuevos, nuevos):
+                resultados[indice] = {'indice': indice, 'success': True, 'id': ninja_id, 'operacion': 'creado'}
+                textos_jutsus[ninja_id] = nuevo['jutsus']
+            EstadisticasNinjas.crear(ids_nuevos)
+            for lote in OperacionLote.en_lotes(actualizables):
+                db.session.execute(update(Ninja), lote)
+            IndiceJutsus.sincronizar(textos_jutsus)
+            
+            tablas = [VersionesTablas.NINJAS]
+            if ids_nuevos or any(self.COLUMNAS_RANKING & cambio.keys() for cambio in actualizables):
+                tablas.append(VersionesTablas.RANKING)
+            VersionesTablas.incrementar(*tablas)
+            db.session.commit()
+            _publicar_filas(self.eventos, 'ninja', CREADO, self.listado, ids_nuevos)
+            campos_cambiados = {}
+            for cambio in actualizables:
+                campos_cambiados.setdefault(cambio['id'], set()).update(campo for campo in cambio if campo != 'id')
+            _publicar_filas(self.eventos, 'ninja', ACTUALIZADO, self.listado, list(campos_cambiados), campos_cambiados)
+            return {'success': True, 'data': OperacionLote.resumen(resultados)}
             
         except Exception as e:
             db.session.rollback()
@@ -129,8 +1197,12 @@ class NinjaController:
         """Elimina un ninja"""
         try:
             ninja = Ninja.query.get_or_404(ninja_id)
+            CuposAsignacion.restar_ninja(ninja.id)
             db.session.delete(ninja)
+            VersionesTablas.incrementar(VersionesTablas.NINJAS, VersionesTablas.ASIGNACIONES, VersionesTablas.RANKING)
             db.session.commit()
+            # El cliente quita también las asignaciones del ninja, borradas en cascada
+            self.eventos.publicar(evento('ninja', ELIMINADO, ninja_id))
             return {'success': True, 'message': 'Ninja eliminado correctamente'}
         except Exception as e:
             db.session.rollback()
@@ -140,22 +1212,36 @@ class NinjaController:
 class MisionController:
     """Controlador para gestionar operaciones de Misiones"""
     
-    def __init__(self):
+    def __init__(self, cache=None, eventos=None):
         self.validador = ValidadorRangos()
+        self.cache = cache or CacheLectura()
+        self.eventos = eventos or BusEventos()
+        self.listado = PROYECCION_MISIONES
     
-    def listar_todas(self):
-        """Obtiene todas las misiones"""
+    def iterar_todas(self, after_id=None, limite=None, campos=None):
+        """Recorre las misiones sin cargarlas todas en memoria"""
+        return self.listado.iterar(after_id, limite, campos)
+    
+    def listar_todas(self, after_id=None, limite=None, campos=None):
+        """Obtiene las misiones, opcionalmente paginadas por cursor y con campos seleccionados"""
         try:
-            misiones = Mision.query.all()
-            return {'success': True, 'data': [mision.to_dict() for mision in misiones]}
+            data, siguiente_cursor = self.listado.listar(after_id, limite, campos)
+            return {'success': True, 'data': data, 'siguiente_cursor': siguiente_cursor}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def obtener_por_id(self, mision_id):
         """Obtiene una misión por su ID"""
+        clave = VersionesTablas.clave(f'mision:{mision_id}', [VersionesTablas.MISIONES])
+        return self.cache.obtener(clave, lambda: self._cargar_por_id(mision_id))
+    
+    def _cargar_por_id(self, mision_id):
+        """Obtiene una misión por su ID desde la base de datos"""
         try:
-            mision = Mision.query.get_or_404(mision_id)
-            return {'success': True, 'data': mision.to_dict()}
+            mision = self.listado.obtener(mision_id)
+            if mision is None:
+                return {'success': False, 'error': 'Misión no encontrada'}
+            return {'success': True, 'data': mision}
         except Exception as e:
             return {'success': False, 'error': 'Misión no encontrada'}
     
@@ -169,28 +1255,98 @@ class MisionController:
                     'error': f'Rango inválido. Debe ser uno de: {ValidadorRangos.RANGOS_MISION}'
                 }
             
+            error = self.validar_capacidad(datos.get('capacidad'))
+            if error:
+                return {'success': False, 'error': error}
+            
             mision = Mision(
                 nombre=datos['nombre'],
                 rango=datos['rango'],
                 recompensa=datos.get('recompensa', 0),
-                descripcion=datos.get('descripcion', '')
+                descripcion=datos.get('descripcion', ''),
+                capacidad=datos.get('capacidad')
             )
             
             db.session.add(mision)
+            VersionesTablas.incrementar(VersionesTablas.MISIONES)
             db.session.commit()
+            datos_mision = mision.to_dict()
+            self.eventos.publicar(evento('mision', CREADO, mision.id, datos_mision))
+            
+            return {'success': True, 'data': datos_mision, 'message': 'Misión creada correctamente'}
+            
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
+    
+    def crear_lote(self, items):
+        """Crea varias misiones en una sola transacción"""
+        try:
+            if not isinstance(items, list):
+                return {'success': False, 'error': 'Se esperaba una lista de misiones'}
+            
+            resultados = [None] * len(items)
+            nuevas, indices_nuevas = [], []
+            
+            for indice, datos in enumerate(items):
+                if not isinstance(datos, dict):
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': 'Elemento inválido'}
+                elif not self.validador.validar_rango_mision(datos.get('rango')):
+                    resultados[indice] = {
+                        'indice': indice, 'success': False,
+                        'error': f'Rango inválido. Debe ser uno de: {ValidadorRangos.RANGOS_MISION}'
+                    }
+                elif not datos.get('nombre'):
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': 'nombre es obligatorio'}
+                elif self.validar_capacidad(datos.get('capacidad')):
+                    resultados[indice] = {
+                        'indice': indice, 'success': False, 'error': self.validar_capacidad(datos.get('capacidad'))
+                    }
+                else:
+                    nueva = {
+                        'nombre': datos['nombre'],
+                        'rango': datos['rango'],
+                        'recompensa': datos.get('recompensa', 0),
+                        'descripcion': datos.get('descripcion', ''),
+                        'capacidad': datos.get('capacidad')
+                    }
+                    error = OperacionLote.error_columnas(Mision, nueva)
+                    if error:
+                        resultados[indice] = {'indice': indice, 'success': False, 'error': error}
+                    else:
+                        nuevas.append(nueva)
+                        indices_nuevas.append(indice)
+            
+            ids_nuevas = OperacionLote.insertar(Mision, nuevas)
+            for mision_id, indice in zip(ids_nuevas, indices_nuevas):
+                resultados[indice] = {'indice': indice, 'success': True, 'id': mision_id, 'operacion': 'creada'}
             
-            return {'success': True, 'data': mision.to_dict(), 'message': 'Misión creada correctamente'}
+            VersionesTablas.incrementar(VersionesTablas.MISIONES)
+            db.session.commit()
+            _publicar_filas(self.eventos, 'mision', CREADO, self.listado, ids_nuevas)
+            return {'success': True, 'data': OperacionLote.resumen(resultados)}
             
         except Exception as e:
             db.session.rollback()
             return {'success': False, 'error': str(e)}
     
+    @staticmethod
+    def validar_capacidad(capacidad):
+        """Mensaje de error si la capacidad no es None ni un entero positivo"""
+        if capacidad is None or (isinstance(capacidad, int) and not isinstance(capacidad, bool) and capacidad > 0):
+            return None
+        return 'capacidad debe ser un entero mayor que 0 (u omitirse para no limitar)'
+    
     def eliminar(self, mision_id):
         """Elimina una misión"""
         try:
-            mision = Mision.query.get_or_404(mision_id)
+            # La misión se bloquea antes que el resumen por ninja, en el mismo orden que CuposAsignacion
+            mision = Mision.query.with_for_update().get_or_404(mision_id)
+            EstadisticasNinjas.restar_mision(mision.id)
             db.session.delete(mision)
+            VersionesTablas.incrementar(VersionesTablas.MISIONES, VersionesTablas.ASIGNACIONES)
             db.session.commit()
+            self.eventos.publicar(evento('mision', ELIMINADO, mision_id))
             return {'success': True, 'message': 'Misión eliminada correctamente'}
         except Exception as e:
             db.session.rollback()
@@ -200,14 +1356,63 @@ class MisionController:
 class AsignacionController:
     """Controlador para gestionar asignaciones de misiones"""
     
-    def __init__(self):
+    def __init__(self, cache=None, limite_misiones_activas=None, eventos=None):
         self.validador = ValidadorRangos()
+        self.cache = cache or CacheLectura()
+        self.eventos = eventos or BusEventos()
+        self.listado = PROYECCION_ASIGNACIONES
+        # Máximo de misiones sin completar por ninja (None = sin límite)
+        self.limite_misiones_activas = limite_misiones_activas
+    
+    def _filtros(self, ninja_id=None, mision_id=None, completada=None, desde=None, hasta=None):
+        """Condiciones de filtrado, escritas para que usen los índices de asignaciones_misiones"""
+        filtros = []
+        if ninja_id is not None:
+            filtros.append(AsignacionMision.ninja_id == self._entero('ninja_id', ninja_id))
+        if mision_id is not None:
+            filtros.append(AsignacionMision.mision_id == self._entero('mision_id', mision_id))
+        if completada is not None:
+            if str(completada).lower() not in ('true', 'false', '1', '0'):
+                raise ValueError('completada debe ser true o false')
+            # '=' y no IS para que PostgreSQL pueda usar el índice
+            filtros.append(AsignacionMision.completada == (str(completada).lower() in ('true', '1')))
+        if desde is not None or hasta is not None:
+            if completada is None:
+                # Fija la primera columna de (completada, fecha_asignacion) para recorrer el rango por índice
+                filtros.append(AsignacionMision.completada.in_([False, True]))
+            if desde is not None:
+                filtros.append(AsignacionMision.fecha_asignacion >= self._fecha('desde', desde))
+            if hasta is not None:
+                filtros.append(AsignacionMision.fecha_asignacion <= self._fecha('hasta', hasta))
+        return filtros
     
-    def listar_todas(self):
-        """Obtiene todas las asignaciones"""
+    @staticmethod
+    def _entero(nombre, valor):
+        """Entero de un filtro; el error nombra el parámetro en lugar de repetir el de int()"""
         try:
-            asignaciones = AsignacionMision.query.all()
-            return {'success': True, 'data': [asig.to_dict() for asig in asignaciones]}
+            return int(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f'{nombre} debe ser un entero (recibido: {valor!r})') from None
+    
+    @staticmethod
+    def _fecha(nombre, valor):
+        """Fecha de un filtro en ISO 8601"""
+        try:
+            return datetime.fromisoformat(valor)
+        except (TypeError, ValueError):
+            raise ValueError(
+                f'{nombre} debe ser una fecha ISO 8601, p. ej. 2024-01-31 o 2024-01-31T12:00:00 (recibido: {valor!r})'
+            ) from None
+    
+    def iterar_todas(self, after_id=None, limite=None, campos=None, **filtros):
+        """Recorre las asignaciones sin cargarlas todas en memoria"""
+        return self.listado.iterar(after_id, limite, campos, self._filtros(**filtros))
+    
+    def listar_todas(self, after_id=None, limite=None, campos=None, **filtros):
+        """Obtiene las asignaciones, opcionalmente filtradas, paginadas por cursor y con campos seleccionados"""
+        try:
+            data, siguiente_cursor = self.listado.listar(after_id, limite, campos, self._filtros(**filtros))
+            return {'success': True, 'data': data, 'siguiente_cursor': siguiente_cursor}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
@@ -224,17 +1429,18 @@ class AsignacionController:
                     'error': f'{ninja.nombre} (rango {ninja.rango}) no tiene el rango suficiente para la misión {mision.rango}'
                 }
             
-            asignacion = AsignacionMision(
-                ninja_id=ninja.id,
-                mision_id=mision.id,
-                fecha_asignacion=datetime.now(),
-                completada=False
-            )
+            # Sin duplicados ni sobrecupo aunque otras peticiones asignen a la vez
+            ids, errores = CuposAsignacion.asignar([(ninja.id, mision.id)], self.limite_misiones_activas)
+            if errores:
+                db.session.rollback()
+                return {'success': False, 'error': errores[(ninja.id, mision.id)]}
             
-            db.session.add(asignacion)
-            db.session.commit()
+            VersionesTablas.confirmar(VersionesTablas.ASIGNACIONES)
             
-            return {'success': True, 'data': asignacion.to_dict(), 'message': 'Misión asignada correctamente'}
+            # Una consulta con los nombres por join, sin cargas perezosas de ninja y misión
+            asignacion = self.listado.obtener(ids[(ninja.id, mision.id)])
+            self.eventos.publicar(evento('asignacion', CREADO, asignacion['id'], asignacion))
+            return {'success': True, 'data': asignacion, 'message': 'Misión asignada correctamente'}
             
         except Exception as e:
             db.session.rollback()
@@ -244,11 +1450,278 @@ class AsignacionController:
         """Marca una asignación como completada"""
         try:
             asignacion = AsignacionMision.query.get_or_404(asignacion_id)
-            asignacion.completada = True
-            asignacion.fecha_completado = datetime.now()
-            db.session.commit()
+            completadas, _ = self._marcar_completadas([asignacion.id])
+            VersionesTablas.confirmar(VersionesTablas.ASIGNACIONES)
+            
+            datos = self.listado.obtener(asignacion_id)
+            if completadas:
+                self.eventos.publicar(evento('asignacion', ACTUALIZADO, asignacion_id, {
+                    'completada': datos['completada'], 'fecha_completado': datos['fecha_completado']
+                }))
+            return {'success': True, 'data': datos, 'message': 'Misión completada'}
             
-            return {'success': True, 'data': asignacion.to_dict(), 'message': 'Misión completada'}
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
+    
+    def crear_lote(self, items):
+        """Asigna varias misiones validando rangos en memoria y cupos en la base, en una sola transacción"""
+        try:
+            if not isinstance(items, list):
+                return {'success': False, 'error': 'Se esperaba una lista de asignaciones'}
+            
+            validos = [
+                datos for datos in items
+                if isinstance(datos, dict) and 'ninja_id' in datos and 'mision_id' in datos
+            ]
+            ninjas = OperacionLote.cargar_por_ids(
+                [Ninja.nombre, Ninja.rango], Ninja.id, [d['ninja_id'] for d in validos]
+            )
+            misiones = OperacionLote.cargar_por_ids(
+                [Mision.rango], Mision.id, [d['mision_id'] for d in validos]
+            )
+            
+            resultados = [None] * len(items)
+            nuevas, indices_nuevas = [], []
+            
+            for indice, datos in enumerate(items):
+                if not isinstance(datos, dict) or 'ninja_id' not in datos or 'mision_id' not in datos:
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': 'ninja_id y mision_id son obligatorios'}
+                    continue
+                ninja = ninjas.get(datos['ninja_id'])
+                mision = misiones.get(datos['mision_id'])
+                if ninja is None:
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': 'Ninja no encontrado'}
+                elif mision is None:
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': 'Misión no encontrada'}
+                elif not self.validador.puede_realizar_mision(ninja.rango, mision.rango):
+                    resultados[indice] = {
+                        'indice': indice, 'success': False,
+                        'error': f'{ninja.nombre} (rango {ninja.rango}) no tiene el rango suficiente para la misión {mision.rango}'
+                    }
+                else:
+                    nuevas.append((datos['ninja_id'], datos['mision_id']))
+                    indices_nuevas.append(indice)
+            
+            ids, errores = CuposAsignacion.asignar(nuevas, self.limite_misiones_activas)
+            vistas = set()
+            for pareja, indice in zip(nuevas, indices_nuevas):
+                if pareja in vistas:
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': 'Asignación repetida en el lote'}
+                elif pareja in ids:
+                    resultados[indice] = {'indice': indice, 'success': True, 'id': ids[pareja], 'operacion': 'asignada'}
+                else:
+                    resultados[indice] = {'indice': indice, 'success': False, 'error': errores[pareja]}
+                vistas.add(pareja)
+            
+            VersionesTablas.confirmar(VersionesTablas.ASIGNACIONES)
+            _publicar_filas(self.eventos, 'asignacion', CREADO, self.listado, sorted(ids.values()))
+            return {'success': True, 'data': OperacionLote.resumen(resultados)}
+            
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
+    
+    LIMITE_PAREJAS = 100000
+    
+    def planificar(self, datos):
+        """Calcula (y opcionalmente guarda) todas las parejas ninja-misión compatibles por rango"""
+        try:
+            ninja_ids = list(dict.fromkeys(datos.get('ninja_ids', [])))
+            mision_ids = list(dict.fromkeys(datos.get('mision_ids', [])))
+            
+            # Dos consultas IN en lugar de dos get_or_404 por pareja
+            ninjas = OperacionLote.cargar_por_ids([Ninja.rango], Ninja.id, ninja_ids)
+            misiones = OperacionLote.cargar_por_ids([Mision.rango], Mision.id, mision_ids)
+            
+            # Misiones agrupadas por rango y, con la matriz, las compatibles con cada rango de ninja
+            misiones_por_rango = {rango: [] for rango in ValidadorRangos.RANGOS_MISION}
+            for mision_id in mision_ids:
+                if mision_id in misiones and misiones[mision_id].rango in misiones_por_rango:
+                    misiones_por_rango[misiones[mision_id].rango].append(mision_id)
+            
+            compatibles = {
+                rango_ninja: [
+                    mision_id
+                    for rango_mision, puede in fila.items() if puede
+                    for mision_id in misiones_por_rango[rango_mision]
+                ]
+                for rango_ninja, fila in self.validador.matriz_compatibilidad().items()
+            }
+            
+            ninjas_validos = [n for n in ninja_ids if n in ninjas]
+            total = sum(len(compatibles.get(ninjas[n].rango, [])) for n in ninjas_validos)
+            if total > self.LIMITE_PAREJAS:
+                return {
+                    'success': False,
+                    'error': f'El plan genera {total} parejas; el máximo es {self.LIMITE_PAREJAS}'
+                }
+            
+            parejas = [
+                {'ninja_id': ninja_id, 'mision_id': mision_id}
+                for ninja_id in ninjas_validos
+                for mision_id in compatibles.get(ninjas[ninja_id].rango, [])
+            ]
+            
+            if datos.get('persistir'):
+                self._persistir(parejas)
+            
+            return {'success': True, 'data': {
+                'total': len(parejas),
+                'parejas': parejas,
+                'ninjas_no_encontrados': [n for n in ninja_ids if n not in ninjas],
+                'misiones_no_encontradas': [m for m in mision_ids if m not in misiones],
+                'persistido': bool(datos.get('persistir'))
+            }}
+            
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
+    
+    LIMITE_CARGA = 1
+    # Ninjas que el despachador asigna a una misión sin capacidad: no se la trata como infinita
+    CUPOS_SIN_CAPACIDAD = 1
+    
+    def despachar(self, datos):
+        """Asigna automáticamente misiones abiertas a ninjas disponibles maximizando el puntaje"""
+        try:
+            datos = datos or {}
+            limite_carga = int(datos.get('limite_carga', self.LIMITE_CARGA))
+            if self.limite_misiones_activas is not None:
+                limite_carga = min(limite_carga, self.limite_misiones_activas)
+            # Pesos negativos: ValueError y 400 (el voraz dejaría de ser óptimo)
+            despachador = DespachadorMisiones(
+                set(ValidadorRangos.JERARQUIA_NINJA.values()) | set(ValidadorRangos.JERARQUIA_MISION.values()),
+                datos.get('peso_poder'), datos.get('peso_recompensa')
+            )
+            
+            # Carga actual (asignaciones sin completar) leída del resumen por ninja
+            carga = dict(db.session.execute(select(
+                EstadisticaNinja.ninja_id,
+                EstadisticaNinja.misiones_asignadas - EstadisticaNinja.misiones_completadas
+            )).all())
+            
+            consulta_ninjas = select(Ninja.id, Ninja.rango, Ninja.ataque, Ninja.defensa, Ninja.chakra)
+            if datos.get('ninja_ids'):
+                consulta_ninjas = consulta_ninjas.where(Ninja.id.in_(datos['ninja_ids']))
+            ninjas = [
+                NinjaDisponible(
+                    fila.id,
+                    ValidadorRangos.JERARQUIA_NINJA.get(fila.rango, 0),
+                    (fila.ataque or 0) + (fila.defensa or 0) + (fila.chakra or 0),
+                    limite_carga - carga.get(fila.id, 0)
+                )
+                for fila in db.session.execute(consulta_ninjas)
+            ]
+            
+            # Misiones abiertas: no completadas y con cupo libre (un ninja nuevo por misión en cada despacho)
+            consulta_misiones = select(Mision.id, Mision.rango, Mision.recompensa, Mision.ninjas_asignados).where(
+                Mision.ninjas_asignados < func.coalesce(Mision.capacidad, self.CUPOS_SIN_CAPACIDAD),
+                ~select(AsignacionMision.id).where(
+                    AsignacionMision.mision_id == Mision.id, AsignacionMision.completada.is_(True)
+                ).exists()
+            )
+            if datos.get('mision_ids'):
+                consulta_misiones = consulta_misiones.where(Mision.id.in_(datos['mision_ids']))
+            misiones, con_ninjas = [], []
+            for fila in db.session.execute(consulta_misiones):
+                misiones.append(MisionAbierta(
+                    fila.id, ValidadorRangos.JERARQUIA_MISION.get(fila.rango, 0), fila.recompensa or 0
+                ))
+                if fila.ninjas_asignados:
+                    con_ninjas.append(fila.id)
+            
+            # Los ninjas que ya tienen la misión quedan fuera antes de optimizar
+            excluidas = set()
+            for lote in OperacionLote.en_lotes(con_ninjas):
+                excluidas.update(tuple(fila) for fila in db.session.execute(
+                    select(AsignacionMision.ninja_id, AsignacionMision.mision_id)
+                    .where(AsignacionMision.mision_id.in_(lote))
+                ))
+            parejas = [
+                {'ninja_id': ninja.id, 'mision_id': mision.id, 'puntaje': despachador.puntaje(ninja, mision)}
+                for ninja, mision in despachador.despachar(ninjas, misiones, excluidas)
+            ]
+            
+            if datos.get('persistir'):
+                self._persistir(parejas)
+            
+            return {'success': True, 'data': {
+                'total': len(parejas),
+                'puntaje_total': sum(p['puntaje'] for p in parejas),
+                'parejas': parejas,
+                'persistido': bool(datos.get('persistir'))
+            }}
+            
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
+    
+    def _persistir(self, parejas):
+        """Guarda las parejas de un plan o despacho respetando los cupos; anota 'id' o 'error' en cada una"""
+        ids, errores = CuposAsignacion.asignar(
+            [(pareja['ninja_id'], pareja['mision_id']) for pareja in parejas], self.limite_misiones_activas
+        )
+        for pareja in parejas:
+            clave = (pareja['ninja_id'], pareja['mision_id'])
+            if clave in ids:
+                pareja['id'] = ids[clave]
+            else:
+                pareja['error'] = errores[clave]
+        VersionesTablas.confirmar(VersionesTablas.ASIGNACIONES)
+        _publicar_filas(self.eventos, 'asignacion', CREADO, self.listado, sorted(ids.values()))
+    
+    def _marcar_completadas(self, ids):
+        """Completa las asignaciones pendientes de la lista y suma sus recompensas al resumen
+
+        Devuelve (ids que estaban pendientes, fecha de completado).
+        """
+        ahora = datetime.now()
+        completadas = []
+        for lote in OperacionLote.en_lotes(ids):
+            # Solo las que no estaban completadas, para no contarlas dos veces
+            completadas.extend(db.session.execute(
+                update(AsignacionMision)
+                .where(AsignacionMision.id.in_(lote), AsignacionMision.completada.is_not(True))
+                .values(completada=True, fecha_completado=ahora)
+                .returning(AsignacionMision.ninja_id, AsignacionMision.mision_id, AsignacionMision.id)
+                .execution_options(synchronize_session=False)
+            ).all())
+        
+        recompensas = OperacionLote.cargar_por_ids(
+            [Mision.recompensa], Mision.id, [mision_id for _, mision_id, _ in completadas]
+        )
+        EstadisticasNinjas.sumar_completadas(
+            [(ninja_id, recompensas[mision_id].recompensa) for ninja_id, mision_id, _ in completadas], ahora
+        )
+        return [asignacion_id for _, _, asignacion_id in completadas], ahora
+    
+    def completar_lote(self, ids):
+        """Marca varias asignaciones como completadas con UPDATE ... WHERE id IN"""
+        try:
+            if not isinstance(ids, list):
+                return {'success': False, 'error': 'Se esperaba una lista de ids de asignación'}
+            
+            existentes = OperacionLote.cargar_por_ids([], AsignacionMision.id, ids)
+            completadas, fecha = self._marcar_completadas(list(existentes))
+            
+            resultados = [
+                {'indice': indice, 'success': True, 'id': asignacion_id, 'operacion': 'completada'}
+                if asignacion_id in existentes else
+                {'indice': indice, 'success': False, 'error': 'Asignación no encontrada'}
+                for indice, asignacion_id in enumerate(ids)
+            ]
+            
+            VersionesTablas.confirmar(VersionesTablas.ASIGNACIONES)
+            # Los campos que cambian se conocen sin volver a consultar
+            if len(completadas) > self.eventos.LIMITE_DETALLE:
+                self.eventos.publicar(evento('asignacion', RECARGAR))
+            else:
+                cambios = {'completada': True, 'fecha_completado': _isoformat(fecha)}
+                self.eventos.publicar(*[
+                    evento('asignacion', ACTUALIZADO, asignacion_id, cambios) for asignacion_id in sorted(completadas)
+                ])
+            return {'success': True, 'data': OperacionLote.resumen(resultados)}
             
         except Exception as e:
             db.session.rollback()
@@ -258,85 +1731,353 @@ class AsignacionController:
 class ReporteController:
     """Controlador para generar reportes y estadísticas"""
     
+    def __init__(self, cache=None):
+        self.cache = cache or CacheLectura()
+    
+    def iterar_reporte_ninjas(self, tamano_lote=1000):
+        """Genera el reporte de ninjas fila a fila desde un cursor del servidor"""
+        # Lee el resumen por ninja en lugar de agregar toda la tabla de asignaciones
+        consulta, nombres = PROYECCION_NINJAS.consulta()
+        consulta = consulta.add_columns(
+            func.coalesce(EstadisticaNinja.misiones_asignadas, 0).label('misiones_asignadas'),
+            func.coalesce(EstadisticaNinja.misiones_completadas, 0).label('misiones_completadas')
+        ).outerjoin(EstadisticaNinja, EstadisticaNinja.ninja_id == Ninja.id)
+        
+        serializar = PROYECCION_NINJAS.serializador(nombres)
+        for fila in db.session.execute(consulta.execution_options(yield_per=tamano_lote)):
+            yield self.fila_reporte_ninja(serializar(fila), fila.misiones_asignadas, fila.misiones_completadas)
+    
+    @staticmethod
+    def fila_reporte_ninja(ninja, misiones_asignadas, misiones_completadas):
+        """Elemento del reporte de ninjas a partir del ninja ya serializado"""
+        return {
+            'ninja': ninja,
+            'misiones_asignadas': misiones_asignadas,
+            'misiones_completadas': misiones_completadas,
+            'tasa_completado': round(
+                (misiones_completadas / misiones_asignadas * 100) if misiones_asignadas > 0 else 0,
+                2
+            )
+        }
+    
     def generar_reporte_ninjas(self):
         """Genera reporte detallado de ninjas"""
+        return self.cache.obtener(
+            VersionesTablas.clave(CLAVE_REPORTE_NINJAS, TABLAS_REPORTE_NINJAS), self._calcular_reporte_ninjas
+        )
+    
+    def _calcular_reporte_ninjas(self):
+        """Calcula el reporte de ninjas sin pasar por la caché"""
         try:
-            ninjas = Ninja.query.all()
-            reporte = []
+            return {'success': True, 'data': list(self.iterar_reporte_ninjas())}
             
-            for ninja in ninjas:
-                misiones_asignadas = AsignacionMision.query.filter_by(ninja_id=ninja.id).count()
-                misiones_completadas = AsignacionMision.query.filter_by(
-                    ninja_id=ninja.id, 
-                    completada=True
-                ).count()
-                
-                reporte.append({
-                    'ninja': ninja.to_dict(),
-                    'misiones_asignadas': misiones_asignadas,
-                    'misiones_completadas': misiones_completadas,
-                    'tasa_completado': round(
-                        (misiones_completadas / misiones_asignadas * 100) if misiones_asignadas > 0 else 0,
-                        2
-                    )
-                })
-            
-            return {'success': True, 'data': reporte}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    ORDENES_RANKING = {
+        'completadas': EstadisticaNinja.misiones_completadas,
+        'recompensa': EstadisticaNinja.recompensa_total,
+        'asignadas': EstadisticaNinja.misiones_asignadas,
+    }
+    
+    def consulta_ranking(self, orden, limite):
+        """SELECT del ranking: orden por una columna indexada del resumen y LIMIT"""
+        if orden not in self.ORDENES_RANKING:
+            raise ValueError(f'orden debe ser uno de: {list(self.ORDENES_RANKING)}')
+        if limite < 1 or limite > ProyeccionListado.LIMITE_MAXIMO:
+            raise ValueError(f'limit debe estar entre 1 y {ProyeccionListado.LIMITE_MAXIMO}')
+        
+        consulta, nombres = PROYECCION_NINJAS.consulta()
+        return (
+            consulta.add_columns(*EstadisticaNinja.__table__.columns)
+            .join(EstadisticaNinja, EstadisticaNinja.ninja_id == Ninja.id)
+            .order_by(None)
+            .order_by(self.ORDENES_RANKING[orden].desc(), EstadisticaNinja.ninja_id)
+            .limit(limite)
+        ), nombres
+    
+    @staticmethod
+    def filas_ranking(filas, nombres):
+        """Elementos del ranking a partir de las filas de consulta_ranking"""
+        serializar = PROYECCION_NINJAS.serializador(nombres)
+        return [
+            {
+                'posicion': posicion,
+                'ninja': serializar(fila),
+                'ninja_id': fila.ninja_id,
+                'misiones_asignadas': fila.misiones_asignadas,
+                'misiones_completadas': fila.misiones_completadas,
+                'recompensa_total': fila.recompensa_total,
+                'ultima_completada': _isoformat(fila.ultima_completada)
+            }
+            for posicion, fila in enumerate(filas, start=1)
+        ]
+    
+    def generar_ranking(self, orden='completadas', limite=10):
+        """Ranking de ninjas según el resumen, leyendo solo las filas devueltas"""
+        try:
+            consulta, nombres = self.consulta_ranking(orden, limite)
+            return {'success': True, 'data': self.filas_ranking(db.session.execute(consulta), nombres)}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    # Asignaciones con el nombre del ninja, ordenadas igual que las misiones
+    CONSULTA_ASIGNACIONES_MISIONES = (
+        select(AsignacionMision.mision_id, AsignacionMision.completada, Ninja.nombre)
+        .join(Ninja, Ninja.id == AsignacionMision.ninja_id)
+        .order_by(AsignacionMision.mision_id, AsignacionMision.id)
+    )
+    
+    def iterar_reporte_misiones(self, tamano_lote=1000):
+        """Genera el reporte de misiones fila a fila con un número constante de consultas"""
+        asignaciones = db.session.execute(
+            self.CONSULTA_ASIGNACIONES_MISIONES.execution_options(yield_per=tamano_lote)
+        )
+        consulta, nombres = PROYECCION_MISIONES.consulta()
+        misiones = db.session.execute(consulta.execution_options(yield_per=tamano_lote))
+        return self.combinar_misiones(map(PROYECCION_MISIONES.serializador(nombres), misiones), asignaciones)
+    
+    @staticmethod
+    def combinar_misiones(misiones, asignaciones):
+        """Recorre a la vez misiones ya serializadas y asignaciones, ambas ordenadas por misión"""
+        asignaciones = iter(asignaciones)
+        pendiente = next(asignaciones, None)
+        
+        for mision in misiones:
+            ninjas_asignados = []
+            completada = False
+            
+            while pendiente is not None and pendiente.mision_id == mision['id']:
+                ninjas_asignados.append(pendiente.nombre)
+                completada = completada or pendiente.completada
+                pendiente = next(asignaciones, None)
+            
+            yield {
+                'mision': mision,
+                'ninjas_asignados': ninjas_asignados,
+                'total_asignaciones': len(ninjas_asignados),
+                'completada': completada
+            }
+    
     def generar_reporte_misiones(self):
         """Genera reporte detallado de misiones"""
+        return self.cache.obtener(
+            VersionesTablas.clave(CLAVE_REPORTE_MISIONES, TABLAS_REPORTE_MISIONES), self._calcular_reporte_misiones
+        )
+    
+    def _calcular_reporte_misiones(self):
+        """Calcula el reporte de misiones sin pasar por la caché"""
         try:
-            misiones = Mision.query.all()
-            reporte = []
-            
-            for mision in misiones:
-                asignaciones = AsignacionMision.query.filter_by(mision_id=mision.id).all()
-                ninjas_asignados = [asig.ninja.nombre for asig in asignaciones]
-                completada = any(asig.completada for asig in asignaciones)
-                
-                reporte.append({
-                    'mision': mision.to_dict(),
-                    'ninjas_asignados': ninjas_asignados,
-                    'total_asignaciones': len(asignaciones),
-                    'completada': completada
-                })
-            
-            return {'success': True, 'data': reporte}
+            return {'success': True, 'data': list(self.iterar_reporte_misiones())}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
 
+class LecturaAsync:
+    """Listados y reportes por un engine asíncrono, con las mismas respuestas que los controladores"""
+    
+    def __init__(self, config, cache, ninja_controller, mision_controller, asignacion_controller, reporte_controller):
+        self.config = config
+        self.cache = cache
+        self.ninjas = ninja_controller
+        self.misiones = mision_controller
+        self.asignaciones = asignacion_controller
+        self.reportes = reporte_controller
+        self.bucle = BucleAsync('lectura-async')
+        self._sesiones = None
+    
+    def _sesion(self):
+        """Nueva sesión asíncrona; el engine se crea en el primer uso, ya dentro del bucle"""
+        if self._sesiones is None:
+            # Import diferido: greenlet y el driver asíncrono solo se necesitan con LECTURA_ASYNC
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+            engine = create_async_engine(
+                url_async(self.config.DATABASE_URL), **self.config.opciones_engine(asincrono=True)
+            )
+            self._sesiones = async_sessionmaker(engine, expire_on_commit=False)
+        return self._sesiones()
+    
+    async def _filas(self, consulta):
+        async with self._sesion() as sesion:
+            return (await sesion.execute(consulta)).all()
+    
+    def _pagina(self, listado, after_id, limite, campos, filtros):
+        consulta, nombres = listado.consulta_pagina(after_id, limite, campos, filtros)
+        data, siguiente_cursor = listado.pagina(self.bucle.ejecutar(self._filas(consulta)), nombres, limite)
+        return {'success': True, 'data': data, 'siguiente_cursor': siguiente_cursor}
+    
+    def listar_ninjas(self, after_id=None, limite=None, campos=None, jutsus=None, jutsu_op='and'):
+        """Como NinjaController.listar_todos"""
+        try:
+            return self._pagina(self.ninjas.listado, after_id, limite, campos, self.ninjas._filtros(jutsus, jutsu_op))
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def listar_misiones(self, after_id=None, limite=None, campos=None):
+        """Como MisionController.listar_todas"""
+        try:
+            return self._pagina(self.misiones.listado, after_id, limite, campos, ())
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def listar_asignaciones(self, after_id=None, limite=None, campos=None, **filtros):
+        """Como AsignacionController.listar_todas"""
+        try:
+            return self._pagina(
+                self.asignaciones.listado, after_id, limite, campos, self.asignaciones._filtros(**filtros)
+            )
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def generar_reporte_ninjas(self):
+        """Como ReporteController.generar_reporte_ninjas, con la misma entrada de caché"""
+        return self.cache.obtener(
+            VersionesTablas.clave(CLAVE_REPORTE_NINJAS, TABLAS_REPORTE_NINJAS), self._calcular_reporte_ninjas
+        )
+    
+    def _calcular_reporte_ninjas(self):
+        try:
+            return {'success': True, 'data': self.bucle.ejecutar(self._reporte_ninjas())}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    async def _reporte_ninjas(self):
+        """Ninjas y resumen por ninja en dos consultas simultáneas, combinadas por id"""
+        consulta, nombres = PROYECCION_NINJAS.consulta()
+        ninjas, estadisticas = await asyncio.gather(
+            self._filas(consulta),
+            self._filas(
+                select(
+                    EstadisticaNinja.ninja_id,
+                    EstadisticaNinja.misiones_asignadas,
+                    EstadisticaNinja.misiones_completadas
+                ).order_by(EstadisticaNinja.ninja_id)
+            )
+        )
+        
+        reporte = []
+        serializar = PROYECCION_NINJAS.serializador(nombres)
+        estadisticas = iter(estadisticas)
+        pendiente = next(estadisticas, None)
+        for fila in ninjas:
+            while pendiente is not None and pendiente.ninja_id < fila._cursor:
+                pendiente = next(estadisticas, None)
+            if pendiente is not None and pendiente.ninja_id == fila._cursor:
+                reporte.append(self.reportes.fila_reporte_ninja(
+                    serializar(fila), pendiente.misiones_asignadas, pendiente.misiones_completadas
+                ))
+            else:
+                reporte.append(self.reportes.fila_reporte_ninja(serializar(fila), 0, 0))
+        return reporte
+    
+    def generar_reporte_misiones(self):
+        """Como ReporteController.generar_reporte_misiones, con la misma entrada de caché"""
+        return self.cache.obtener(
+            VersionesTablas.clave(CLAVE_REPORTE_MISIONES, TABLAS_REPORTE_MISIONES), self._calcular_reporte_misiones
+        )
+    
+    def _calcular_reporte_misiones(self):
+        try:
+            return {'success': True, 'data': self.bucle.ejecutar(self._reporte_misiones())}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    async def _reporte_misiones(self):
+        """Misiones y asignaciones en dos consultas simultáneas, combinadas por misión"""
+        consulta, nombres = PROYECCION_MISIONES.consulta()
+        misiones, asignaciones = await asyncio.gather(
+            self._filas(consulta),
+            self._filas(ReporteController.CONSULTA_ASIGNACIONES_MISIONES)
+        )
+        serializar = PROYECCION_MISIONES.serializador(nombres)
+        return list(self.reportes.combinar_misiones(map(serializar, misiones), asignaciones))
+    
+    def generar_ranking(self, orden='completadas', limite=10):
+        """Como ReporteController.generar_ranking"""
+        try:
+            consulta, nombres = self.reportes.consulta_ranking(orden, limite)
+            filas = self.bucle.ejecutar(self._filas(consulta))
+            return {'success': True, 'data': self.reportes.filas_ranking(filas, nombres)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+
 class AplicacionNaruto:
     """Clase principal de la aplicación - Arquitectura Monolítica Orientada a Objetos"""
     
     def __init__(self):
         self.app = Flask(__name__)
         self.config = ConfiguracionApp()
-        self.ninja_controller = NinjaController()
-        self.mision_controller = MisionController()
-        self.asignacion_controller = AsignacionController()
-        self.reporte_controller = ReporteController()
+        self.cache = self._crear_cache()
+        self.eventos = self._crear_eventos()
+        self.ninja_controller = NinjaController(self.cache, self.eventos)
+        self.mision_controller = MisionController(self.cache, self.eventos)
+        self.asignacion_controller = AsignacionController(
+            self.cache, self.config.LIMITE_MISIONES_ACTIVAS or None, self.eventos
+        )
+        self.reporte_controller = ReporteController(self.cache)
+        self.lectura_async = LecturaAsync(
+            self.config, self.cache, self.ninja_controller, self.mision_controller,
+            self.asignacion_controller, self.reporte_controller
+        ) if self.config.LECTURA_ASYNC else None
+        self.instrumentacion = Instrumentacion(
+            self.config.UMBRAL_LENTO_MS, self.config.UMBRAL_CONSULTAS, self.config.CABECERA_CONSULTAS
+        )
+        self.tareas = ColaTareas(
+            self.app, self.config.TAREAS_TRABAJADORES, self.config.TAREAS_TTL, self.config.TAREAS_TIEMPO_MAXIMO
+        )
+        # Los reportes pesados también se pueden pedir como tarea; pasan igual por la caché de lectura
+        self.tareas.registrar('reporte_ninjas', self.reporte_controller.generar_reporte_ninjas)
+        self.tareas.registrar('reporte_misiones', self.reporte_controller.generar_reporte_misiones)
+        # Los bulk con ?async=1 reciben la lista como argumento de la tarea
+        self.tareas.registrar('lote_ninjas', self.ninja_controller.crear_lote)
+        self.tareas.registrar('lote_misiones', self.mision_controller.crear_lote)
+        self.tareas.registrar('lote_asignaciones', self.asignacion_controller.crear_lote)
         
         self._configurar_app()
         self._configurar_base_datos()
         self._registrar_rutas()
     
+    def _crear_cache(self):
+        """Crea la caché de lectura con el backend configurado"""
+        if self.config.CACHE_BACKEND == 'redis':
+            backend = CacheRedis.desde_url(self.config.REDIS_URL)
+        elif self.config.CACHE_BACKEND == 'memoria':
+            backend = CacheMemoria(self.config.CACHE_MAXIMO)
+        else:
+            backend = SinCache()
+        return CacheLectura(backend, self.config.CACHE_TTL)
+    
+    def _crear_eventos(self):
+        """Crea el bus de eventos de cambio con el backend configurado"""
+        opciones = {'maximo_suscriptores': self.config.EVENTOS_MAXIMO_CONEXIONES or None}
+        if self.config.EVENTOS_BACKEND == 'postgres':
+            return BusPostgres(self.config.DATABASE_URL, **opciones)
+        if self.config.EVENTOS_BACKEND == 'memoria':
+            return BusEventos(**opciones)
+        return SinEventos()
+    
     def _configurar_app(self):
         """Configura la aplicación Flask"""
         self.app.config['SQLALCHEMY_DATABASE_URI'] = self.config.DATABASE_URL
         self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = self.config.SQLALCHEMY_TRACK_MODIFICATIONS
-        CORS(self.app)
+        self.app.config['SQLALCHEMY_ENGINE_OPTIONS'] = self.config.opciones_engine()
+        self.app.json = ProveedorJSON(self.app)
+        self.instrumentacion.init_app(self.app)
+        self.app.extensions['tareas'] = self.tareas
+        CORS(self.app, expose_headers=['X-Next-Cursor', 'ETag', 'Last-Modified', 'X-Query-Count', 'X-DB-Time-Ms', 'Location'])
     
     def _configurar_base_datos(self):
-        """Inicializa la base de datos"""
+        """Registra la base de datos; no abre conexiones hasta la primera petición"""
         db.init_app(self.app)
-        
+    
+    def inicializar_esquema(self):
+        """Crea las tablas que falten y los contadores de versión (una vez por despliegue, no por proceso)"""
         with self.app.app_context():
             db.create_all()
+            VersionesTablas.inicializar()
     
     def _registrar_rutas(self):
         """Registra todas las rutas de la aplicación"""
@@ -353,13 +2094,38 @@ class AplicacionNaruto:
         
         # === RUTAS NINJAS ===
         @self.app.route('/api/ninjas', methods=['GET'])
+        @self._condicional(VersionesTablas.NINJAS)
         def listar_ninjas():
-            resultado = self.ninja_controller.listar_todos()
+            try:
+                parametros = {**self._parametros_listado(), **self._parametros_jutsus()}
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if self._modo_stream():
+                return self._respuesta_stream(self.ninja_controller.iterar_todos(**parametros))
+            if self.lectura_async:
+                resultado = self.lectura_async.listar_ninjas(**parametros)
+            else:
+                resultado = self.ninja_controller.listar_todos(**parametros)
+            if resultado['success']:
+                return self._respuesta_pagina(resultado)
+            return jsonify({'error': resultado['error']}), 400
+        
+        @self.app.route('/api/ninjas/top', methods=['GET'])
+        @self._condicional(VersionesTablas.NINJAS, VersionesTablas.RANKING)
+        def top_ninjas():
+            resultado = self.ninja_controller.top(
+                request.args.get('limit', 10, type=int),
+                request.args.get('rango'),
+                request.args.get('aldea'),
+                tuple(request.args.get(f'peso_{estadistica}', 1.0, type=float) for estadistica in ESTADISTICAS)
+            )
             if resultado['success']:
+                request.respuesta_provisional = resultado['provisional']
                 return jsonify(resultado['data']), 200
             return jsonify({'error': resultado['error']}), 400
         
         @self.app.route('/api/ninjas/<int:id>', methods=['GET'])
+        @self._condicional(VersionesTablas.NINJAS)
         def consultar_ninja(id):
             resultado = self.ninja_controller.obtener_por_id(id)
             if resultado['success']:
@@ -373,6 +2139,15 @@ class AplicacionNaruto:
                 return jsonify(resultado['data']), 201
             return jsonify({'error': resultado['error']}), 400
         
+        @self.app.route('/api/ninjas/bulk', methods=['POST'])
+        def registrar_ninjas_lote():
+            if self._modo_async():
+                return self._encolar('lote_ninjas', request.json)
+            resultado = self.ninja_controller.crear_lote(request.json)
+            if resultado['success']:
+                return jsonify(resultado['data']), 200
+            return jsonify({'error': resultado['error']}), 400
+        
         @self.app.route('/api/ninjas/<int:id>', methods=['PUT'])
         def actualizar_ninja(id):
             resultado = self.ninja_controller.actualizar(id, request.json)
@@ -389,13 +2164,24 @@ class AplicacionNaruto:
         
         # === RUTAS MISIONES ===
         @self.app.route('/api/misiones', methods=['GET'])
+        @self._condicional(VersionesTablas.MISIONES)
         def listar_misiones():
-            resultado = self.mision_controller.listar_todas()
+            try:
+                parametros = self._parametros_listado()
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if self._modo_stream():
+                return self._respuesta_stream(self.mision_controller.iterar_todas(**parametros))
+            if self.lectura_async:
+                resultado = self.lectura_async.listar_misiones(**parametros)
+            else:
+                resultado = self.mision_controller.listar_todas(**parametros)
             if resultado['success']:
-                return jsonify(resultado['data']), 200
+                return self._respuesta_pagina(resultado)
             return jsonify({'error': resultado['error']}), 400
         
         @self.app.route('/api/misiones/<int:id>', methods=['GET'])
+        @self._condicional(VersionesTablas.MISIONES)
         def consultar_mision(id):
             resultado = self.mision_controller.obtener_por_id(id)
             if resultado['success']:
@@ -409,6 +2195,15 @@ class AplicacionNaruto:
                 return jsonify(resultado['data']), 201
             return jsonify({'error': resultado['error']}), 400
         
+        @self.app.route('/api/misiones/bulk', methods=['POST'])
+        def registrar_misiones_lote():
+            if self._modo_async():
+                return self._encolar('lote_misiones', request.json)
+            resultado = self.mision_controller.crear_lote(request.json)
+            if resultado['success']:
+                return jsonify(resultado['data']), 200
+            return jsonify({'error': resultado['error']}), 400
+        
         @self.app.route('/api/misiones/<int:id>', methods=['DELETE'])
         def eliminar_mision(id):
             resultado = self.mision_controller.eliminar(id)
@@ -418,10 +2213,24 @@ class AplicacionNaruto:
         
         # === RUTAS ASIGNACIONES ===
         @self.app.route('/api/asignaciones', methods=['GET'])
+        @self._condicional(VersionesTablas.ASIGNACIONES, VersionesTablas.NINJAS, VersionesTablas.MISIONES)
         def listar_asignaciones():
-            resultado = self.asignacion_controller.listar_todas()
+            try:
+                parametros = {**self._parametros_listado(), **self._parametros_asignaciones()}
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if self._modo_stream():
+                try:
+                    filas = self.asignacion_controller.iterar_todas(**parametros)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                return self._respuesta_stream(filas)
+            if self.lectura_async:
+                resultado = self.lectura_async.listar_asignaciones(**parametros)
+            else:
+                resultado = self.asignacion_controller.listar_todas(**parametros)
             if resultado['success']:
-                return jsonify(resultado['data']), 200
+                return self._respuesta_pagina(resultado)
             return jsonify({'error': resultado['error']}), 400
         
         @self.app.route('/api/asignaciones', methods=['POST'])
@@ -431,6 +2240,36 @@ class AplicacionNaruto:
                 return jsonify(resultado['data']), 201
             return jsonify({'error': resultado['error']}), 400
         
+        @self.app.route('/api/asignaciones/bulk', methods=['POST'])
+        def asignar_misiones_lote():
+            if self._modo_async():
+                return self._encolar('lote_asignaciones', request.json)
+            resultado = self.asignacion_controller.crear_lote(request.json)
+            if resultado['success']:
+                return jsonify(resultado['data']), 200
+            return jsonify({'error': resultado['error']}), 400
+        
+        @self.app.route('/api/asignaciones/planificar', methods=['POST'])
+        def planificar_asignaciones():
+            resultado = self.asignacion_controller.planificar(request.json)
+            if resultado['success']:
+                return jsonify(resultado['data']), 200
+            return jsonify({'error': resultado['error']}), 400
+        
+        @self.app.route('/api/asignaciones/despachar', methods=['POST'])
+        def despachar_misiones():
+            resultado = self.asignacion_controller.despachar(request.get_json(silent=True))
+            if resultado['success']:
+                return jsonify(resultado['data']), 200
+            return jsonify({'error': resultado['error']}), 400
+        
+        @self.app.route('/api/asignaciones/completar', methods=['PUT'])
+        def completar_misiones_lote():
+            resultado = self.asignacion_controller.completar_lote(request.json)
+            if resultado['success']:
+                return jsonify(resultado['data']), 200
+            return jsonify({'error': resultado['error']}), 400
+        
         @self.app.route('/api/asignaciones/<int:id>/completar', methods=['PUT'])
         def completar_mision(id):
             resultado = self.asignacion_controller.completar(id)
@@ -440,18 +2279,261 @@ class AplicacionNaruto:
         
         # === RUTAS REPORTES ===
         @self.app.route('/api/reportes/ninjas', methods=['GET'])
+        @self._condicional(*TABLAS_REPORTE_NINJAS)
         def reporte_ninjas():
-            resultado = self.reporte_controller.generar_reporte_ninjas()
+            if self._modo_stream():
+                return self._respuesta_stream(self.reporte_controller.iterar_reporte_ninjas())
+            resultado = (self.lectura_async or self.reporte_controller).generar_reporte_ninjas()
             if resultado['success']:
                 return jsonify(resultado['data']), 200
             return jsonify({'error': resultado['error']}), 400
         
         @self.app.route('/api/reportes/misiones', methods=['GET'])
+        @self._condicional(*TABLAS_REPORTE_MISIONES)
         def reporte_misiones():
-            resultado = self.reporte_controller.generar_reporte_misiones()
+            if self._modo_stream():
+                return self._respuesta_stream(self.reporte_controller.iterar_reporte_misiones())
+            resultado = (self.lectura_async or self.reporte_controller).generar_reporte_misiones()
+            if resultado['success']:
+                return jsonify(resultado['data']), 200
+            return jsonify({'error': resultado['error']}), 400
+        
+        @self.app.route('/api/reportes/ranking', methods=['GET'])
+        @self._condicional(VersionesTablas.NINJAS, VersionesTablas.ASIGNACIONES)
+        def reporte_ranking():
+            resultado = (self.lectura_async or self.reporte_controller).generar_ranking(
+                request.args.get('orden', 'completadas'),
+                request.args.get('limit', 10, type=int)
+            )
             if resultado['success']:
                 return jsonify(resultado['data']), 200
             return jsonify({'error': resultado['error']}), 400
+        
+        @self.app.route('/api/reportes/ninjas', methods=['POST'])
+        def encolar_reporte_ninjas():
+            return self._encolar('reporte_ninjas')
+        
+        @self.app.route('/api/reportes/misiones', methods=['POST'])
+        def encolar_reporte_misiones():
+            return self._encolar('reporte_misiones')
+        
+        # === RUTAS TAREAS ===
+        @self.app.route('/api/tareas/<tarea_id>', methods=['GET'])
+        def estado_tarea(tarea_id):
+            tarea = self.tareas.obtener(tarea_id)
+            if tarea is None:
+                return jsonify({'error': 'Tarea no encontrada'}), 404
+            return jsonify(self._con_enlaces(tarea)), 200
+        
+        @self.app.route('/api/tareas/<tarea_id>/resultado', methods=['GET'])
+        def resultado_tarea(tarea_id):
+            estado, resultado = self.tareas.resultado(tarea_id)
+            if estado is None:
+                return jsonify({'error': 'Tarea no encontrada'}), 404
+            if estado in EN_CURSO:
+                return jsonify({'error': 'La tarea aún no terminó', 'estado': estado}), 409
+            if estado == ERROR:
+                return jsonify({'error': resultado}), 400
+            # El resultado ya está codificado: se envía sin volver a serializar
+            return Response(resultado, status=200, mimetype='application/json')
+        
+        # === EXPORTACIÓN ===
+        @self.app.route('/api/exportar/<tabla>', methods=['GET'])
+        @self._condicional(VersionesTablas.NINJAS, VersionesTablas.MISIONES, VersionesTablas.ASIGNACIONES)
+        def exportar_tabla(tabla):
+            campos = request.args.get('fields')
+            try:
+                exportacion = ExportacionColumnar(
+                    tabla, request.args.get('formato'),
+                    [c.strip() for c in campos.split(',') if c.strip()] if campos else None
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            # Se envía bloque a bloque mientras el cursor del servidor avanza
+            return Response(
+                stream_with_context(exportacion.fragmentos()), mimetype=exportacion.mimetype,
+                headers={'Content-Disposition': f'attachment; filename={exportacion.nombre_archivo}'}
+            )
+        
+        # === EVENTOS ===
+        @self.app.route('/api/eventos', methods=['GET'])
+        def flujo_eventos():
+            if isinstance(self.eventos, SinEventos):
+                return jsonify({'error': 'Eventos desactivados'}), 404
+            suscripcion = self.eventos.suscribir(request.headers.get('Last-Event-ID'))
+            if suscripcion is None:
+                respuesta = jsonify({'error': 'Demasiadas conexiones de eventos'})
+                respuesta.headers['Retry-After'] = '30'
+                return respuesta, 503
+            return Response(
+                suscripcion.sse(self.config.EVENTOS_LATIDO, self.config.EVENTOS_DURACION_MAXIMA),
+                mimetype=MIMETYPE_SSE,
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        # === RUTAS CACHÉ ===
+        @self.app.route('/api/cache/estadisticas', methods=['GET'])
+        def estadisticas_cache():
+            return jsonify(self.cache.estadisticas()), 200
+        
+        # === MÉTRICAS ===
+        @self.app.route('/metrics', methods=['GET'])
+        def metricas():
+            return Response(self.instrumentacion.metricas.exportar(), mimetype='text/plain; version=0.0.4')
+    
+    def _condicional(self, *tablas):
+        """Decorador de GET: ETag/Last-Modified según las versiones de las tablas y 304 sin consultar datos"""
+        def decorador(vista):
+            @wraps(vista)
+            def envoltura(*args, **kwargs):
+                try:
+                    versiones = VersionesTablas.obtener(tablas)
+                except Exception:
+                    db.session.rollback()
+                    return vista(*args, **kwargs)
+                # Las claves de caché de la vista usan estas mismas versiones (VersionesTablas.clave)
+                request.versiones_tablas = {tabla: version for tabla, version, _ in versiones}
+                
+                # La representación depende de las versiones, la URL y el formato pedido
+                firma = '|'.join(f'{tabla}:{version}' for tabla, version, _ in versiones)
+                firma += f'|{request.full_path}|{self._modo_stream()}'
+                etag = hashlib.sha1(firma.encode('utf-8')).hexdigest()
+                ultima_modificacion = max(
+                    (actualizado for _, _, actualizado in versiones), default=None
+                )
+                if ultima_modificacion is not None:
+                    ultima_modificacion = ultima_modificacion.replace(tzinfo=timezone.utc)
+                
+                if request.if_none_match:
+                    no_modificado = request.if_none_match.contains(etag)
+                else:
+                    no_modificado = (
+                        ultima_modificacion is not None and request.if_modified_since is not None
+                        and ultima_modificacion <= request.if_modified_since
+                    )
+                
+                if no_modificado:
+                    respuesta = Response(status=304)
+                else:
+                    respuesta = make_response(vista(*args, **kwargs))
+                    if respuesta.status_code != 200:
+                        return respuesta
+                    if getattr(request, 'respuesta_provisional', False):
+                        # El cuerpo todavía no corresponde a estas versiones: sin validadores ni caché
+                        respuesta.headers['Cache-Control'] = 'no-store'
+                        return respuesta
+                
+                respuesta.set_etag(etag)
+                if ultima_modificacion is not None:
+                    respuesta.last_modified = ultima_modificacion
+                respuesta.headers['Cache-Control'] = 'no-cache'
+                return respuesta
+            return envoltura
+        return decorador
+    
+    def _parametros_listado(self):
+        """Lee after_id, limit y fields de la query string de un listado"""
+        campos = request.args.get('fields')
+        return {
+            'after_id': self._entero_query('after_id', 0),
+            'limite': self._entero_query('limit', 1, ProyeccionListado.LIMITE_MAXIMO),
+            'campos': [c.strip() for c in campos.split(',') if c.strip()] if campos else None
+        }
+    
+    @staticmethod
+    def _entero_query(nombre, minimo, maximo=None):
+        """Entero opcional de la query string; ValueError si no es entero o está fuera de rango"""
+        valor = request.args.get(nombre)
+        if valor is None:
+            return None
+        try:
+            entero = int(valor)
+        except ValueError:
+            raise ValueError(f'{nombre} debe ser un entero (recibido: {valor!r})') from None
+        if maximo is not None and not minimo <= entero <= maximo:
+            raise ValueError(f'{nombre} debe estar entre {minimo} y {maximo}')
+        if entero < minimo:
+            raise ValueError(f'{nombre} debe ser mayor o igual que {minimo}')
+        return entero
+    
+    def _parametros_jutsus(self):
+        """Lee la búsqueda por jutsu: ?jutsu=A,B (o repetido) y ?jutsu_op=and|or"""
+        jutsus = [j for valor in request.args.getlist('jutsu') for j in valor.split(',') if j.strip()]
+        return {'jutsus': jutsus or None, 'jutsu_op': request.args.get('jutsu_op', 'and').lower()}
+    
+    def _parametros_asignaciones(self):
+        """Lee los filtros de asignaciones: ninja_id, mision_id, completada, desde y hasta"""
+        return {
+            clave: request.args[clave]
+            for clave in ('ninja_id', 'mision_id', 'completada', 'desde', 'hasta')
+            if clave in request.args
+        }
+    
+    def _respuesta_pagina(self, resultado):
+        """Responde la página como arreglo JSON e indica el siguiente cursor en cabecera"""
+        respuesta = jsonify(resultado['data'])
+        if resultado['siguiente_cursor'] is not None:
+            respuesta.headers['X-Next-Cursor'] = str(resultado['siguiente_cursor'])
+        return respuesta, 200
+    
+    def _modo_async(self):
+        """Si la operación masiva se pidió como tarea en segundo plano (?async=1)"""
+        return request.args.get('async') in ('1', 'true')
+    
+    def _encolar(self, tipo, *argumentos):
+        """Envía una tarea y responde 202 con su estado y la URL para consultarla"""
+        try:
+            tarea = self._con_enlaces(self.tareas.enviar(tipo, *argumentos))
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        respuesta = jsonify(tarea)
+        respuesta.headers['Location'] = tarea['url']
+        return respuesta, 202
+    
+    @staticmethod
+    def _con_enlaces(tarea):
+        return {**tarea, 'url': f"/api/tareas/{tarea['id']}", 'resultado_url': f"/api/tareas/{tarea['id']}/resultado"}
+    
+    def _modo_stream(self):
+        """Formato de streaming pedido: 'ndjson' (Accept), 'json' (?stream=1) o None"""
+        if request.accept_mimetypes.best_match(['application/json', MIMETYPE_NDJSON]) == MIMETYPE_NDJSON:
+            return 'ndjson'
+        if request.args.get('stream') in ('1', 'true'):
+            return 'json'
+        return None
+    
+    def _respuesta_stream(self, filas):
+        """Envía las filas a medida que se serializan, como NDJSON o como arreglo JSON"""
+        filas = iter(filas)
+        try:
+            # La primera fila se obtiene aquí para poder responder 400 si la consulta falla
+            primera = next(filas, None)
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        
+        dumps = self.app.json.dumps
+        
+        def generar_ndjson():
+            if primera is None:
+                return
+            yield dumps(primera) + '\n'
+            for fila in filas:
+                yield dumps(fila) + '\n'
+        
+        def generar_json():
+            if primera is None:
+                yield '[]'
+                return
+            yield '[' + dumps(primera)
+            for fila in filas:
+                yield ',' + dumps(fila)
+            yield ']'
+        
+        if self._modo_stream() == 'ndjson':
+            return Response(stream_with_context(generar_ndjson()), status=200, mimetype=MIMETYPE_NDJSON)
+        return Response(stream_with_context(generar_json()), status=200, mimetype='application/json')
     
     def ejecutar(self):
         """Inicia la aplicación"""
@@ -462,7 +2544,13 @@ class AplicacionNaruto:
         )
 
 
-# Punto de entrada de la aplicación
+def crear_app():
+    """App factory para servidores WSGI (gunicorn); el esquema se prepara con migraciones.py"""
+    return AplicacionNaruto().app
+
+
+# Punto de entrada de la aplicación (servidor de desarrollo)
 if __name__ == '__main__':
     aplicacion = AplicacionNaruto()
+    aplicacion.inicializar_esquema()
     aplicacion.ejecutar()
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Soporte para ejecutar corrutinas desde código síncrono.
+
+Las vistas de Flask son síncronas. BucleAsync mantiene un único bucle
+asyncio en un hilo de fondo: cada petición envía su corrutina al bucle y
+espera el resultado, de modo que las consultas de todas las peticiones del
+proceso comparten un mismo pool de conexiones asíncronas (que queda ligado a
+ese bucle) y las consultas independientes pueden ejecutarse a la vez. Las
+corrutinas ven las variables de contexto (contextvars) del hilo que las envía.
+
+El hilo de la petición queda bloqueado hasta que la corrutina termina: esto no
+libera workers ni hilos de gunicorn, solo permite consultas en paralelo dentro
+de una misma petición.
+"""
+import asyncio
+import contextvars
+import threading
+
+from sqlalchemy.engine import make_url
+
+
+# Driver asíncrono para cada backend síncrono
+DRIVERS_ASYNC = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def url_async(url):
+    """Convierte la URL de la base de datos a su driver asíncrono"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in DRIVERS_ASYNC:
+        raise ValueError(f'Sin driver asíncrono para {backend}; disponibles: {list(DRIVERS_ASYNC)}')
+    if backend == 'sqlite' and url.database in (None, '', ':memory:'):
+        raise ValueError('SQLite en memoria no se comparte entre engines; usar una base en archivo')
+    return url.set(drivername=DRIVERS_ASYNC[backend])
+
+
+class BucleAsync:
+    """Bucle asyncio en un hilo de fondo, creado en el primer uso (después del fork de los workers)"""
+
+    def __init__(self, nombre='bucle-async'):
+        self.nombre = nombre
+        self._bucle = None
+        self._lock = threading.Lock()
+
+    def _obtener_bucle(self):
+        with self._lock:
+            if self._bucle is None:
+                self._bucle = asyncio.new_event_loop()
+                threading.Thread(target=self._bucle.run_forever, name=self.nombre, daemon=True).start()
+            return self._bucle
+
+    def ejecutar(self, corrutina, timeout=None):
+        """Ejecuta la corrutina en el bucle y espera su resultado (o su excepción)"""
+        contexto = contextvars.copy_context()
+        return asyncio.run_coroutine_threadsafe(
+            self._en_contexto(corrutina, contexto), self._obtener_bucle()
+        ).result(timeout)
+
+    @staticmethod
+    async def _en_contexto(corrutina, contexto):
+        # La tarea tiene su propia copia del contexto: los valores no se filtran a otras tareas
+        for variable, valor in contexto.items():
+            variable.set(valor)
+        return await corrutina
+
@@ -0,0 +1,180 @@
+"""
+Benchmark de las estadísticas fuera de línea: las mismas cifras por aldea,
+rango de ninja y rango de misión calculadas con
+
+- orm:       recorriendo objetos Ninja, Mision y AsignacionMision en Python
+- columnas:  analitica.cargar_base (columnas en bloques) + cálculo con NumPy
+- <formato>: exportación a archivo, y carga + cálculo desde ese archivo, por
+             cada formato disponible (parquet y arrow si pyarrow está instalado)
+
+Comprueba que todas las variantes den el mismo resultado.
+
+Uso:
+    python benchmarks/benchmark_analitica.py
+    python benchmarks/benchmark_analitica.py --ninjas 200000 --misiones 20000 --asignaciones 1000000
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from comun import ContadorConsultas, medir
+
+from app import AplicacionNaruto
+from datos_sinteticos import generar
+from models import db, Ninja, Mision, AsignacionMision
+from exportacion import TABLAS, ExportacionColumnar, formatos_disponibles
+import analitica
+
+
+def _percentil(ordenados, fraccion):
+    posicion = fraccion * (len(ordenados) - 1)
+    abajo = int(posicion)
+    arriba = min(abajo + 1, len(ordenados) - 1)
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def _distribucion(valores):
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    media = sum(ordenados) / n
+    resultado = {'minimo': ordenados[0]}
+    resultado.update({f'p{p}': _percentil(ordenados, p / 100) for p in analitica.PERCENTILES})
+    resultado.update({
+        'maximo': ordenados[-1], 'media': media,
+        'desviacion': (sum((v - media) ** 2 for v in ordenados) / n) ** 0.5,
+    })
+    return {clave: round(float(valor), 2) for clave, valor in resultado.items()}
+
+
+def _tasa(completadas, asignadas):
+    return round(completadas / asignadas * 100, 2) if asignadas else 0.0
+
+
+def estadisticas_orm():
+    """Implementación directa con objetos ORM, fila a fila"""
+    ninjas = {ninja.id: ninja for ninja in Ninja.query}
+    misiones = {mision.id: mision for mision in Mision.query}
+    por_ninja = defaultdict(lambda: [0, 0, 0])
+    por_mision = defaultdict(lambda: [0, 0, 0])
+    for asignacion in AsignacionMision.query:
+        mision = misiones[asignacion.mision_id]
+        cobrada = (mision.recompensa or 0) if asignacion.completada else 0
+        for acumulado, clave in ((por_ninja, asignacion.ninja_id), (por_mision, asignacion.mision_id)):
+            acumulado[clave][0] += 1
+            acumulado[clave][1] += int(bool(asignacion.completada))
+            acumulado[clave][2] += cobrada
+
+    def agrupar_ninjas(atributo):
+        grupos = defaultdict(list)
+        for ninja in ninjas.values():
+            grupos[getattr(ninja, atributo) or ''].append(ninja)
+        filas = []
+        for clave in sorted(grupos):
+            asignadas, completadas, recompensa = (sum(por_ninja[n.id][i] for n in grupos[clave]) for i in range(3))
+            filas.append({
+                atributo: clave, 'ninjas': len(grupos[clave]),
+                'misiones_asignadas': asignadas, 'misiones_completadas': completadas,
+                'tasa_completado': _tasa(completadas, asignadas), 'recompensa_total': recompensa,
+                'poder': _distribucion([(n.ataque or 0) + (n.defensa or 0) + (n.chakra or 0) for n in grupos[clave]]),
+            })
+        return filas
+
+    grupos = defaultdict(list)
+    for mision in misiones.values():
+        grupos[mision.rango].append(mision)
+    rangos_mision = []
+    for rango in sorted(grupos):
+        asignadas, completadas, cobrada = (sum(por_mision[m.id][i] for m in grupos[rango]) for i in range(3))
+        rangos_mision.append({
+            'rango': rango, 'misiones': len(grupos[rango]),
+            'asignaciones': asignadas, 'asignaciones_completadas': completadas,
+            'tasa_completado': _tasa(completadas, asignadas),
+            'recompensa_ofrecida': sum(m.recompensa or 0 for m in grupos[rango]),
+            'recompensa_cobrada': cobrada,
+            'recompensa': _distribucion([m.recompensa or 0 for m in grupos[rango]]),
+        })
+
+    asignadas = sum(v[0] for v in por_mision.values())
+    completadas = sum(v[1] for v in por_mision.values())
+    return {
+        'totales': {
+            'ninjas': len(ninjas), 'misiones': len(misiones), 'asignaciones': asignadas,
+            'asignaciones_completadas': completadas, 'tasa_completado': _tasa(completadas, asignadas),
+            'recompensa_cobrada': sum(v[2] for v in por_mision.values()),
+        },
+        'aldeas': agrupar_ninjas('aldea'),
+        'rangos_ninja': agrupar_ninjas('rango'),
+        'rangos_mision': rangos_mision,
+    }
+
+
+def diferencias(esperado, obtenido, ruta=''):
+    """Rutas donde los resultados no coinciden (las cifras decimales con tolerancia de redondeo)"""
+    if isinstance(esperado, dict):
+        return [d for clave in esperado for d in diferencias(esperado[clave], obtenido.get(clave), f'{ruta}.{clave}')]
+    if isinstance(esperado, list):
+        if len(esperado) != len(obtenido or ()):
+            return [f'{ruta}: {len(esperado)} grupos frente a {len(obtenido or ())}']
+        return [d for i, (a, b) in enumerate(zip(esperado, obtenido)) for d in diferencias(a, b, f'{ruta}[{i}]')]
+    if isinstance(esperado, float):
+        return [] if obtenido is not None and abs(esperado - obtenido) <= 0.011 else [f'{ruta}: {esperado} != {obtenido}']
+    return [] if esperado == obtenido else [f'{ruta}: {esperado} != {obtenido}']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ninjas', type=int, default=50000)
+    parser.add_argument('--misiones', type=int, default=5000)
+    parser.add_argument('--asignaciones', type=int, default=200000)
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    aplicacion = AplicacionNaruto()
+    directorio = tempfile.mkdtemp()
+    problemas = []
+    try:
+        with aplicacion.app.app_context():
+            generar(args.ninjas, args.misiones, args.asignaciones, args.semilla, reiniciar=True, informar=lambda *a: None)
+            contador = ContadorConsultas(db.engine)
+            print(f'{args.ninjas} ninjas, {args.misiones} misiones, {args.asignaciones} asignaciones')
+            print(f"{'variante':<28} | {'segundos':>9} | {'consultas':>9} | {'vs orm':>8}")
+            print('-' * 64)
+
+            base, consultas, esperado = medir(estadisticas_orm, contador)
+            print(f"{'orm':<28} | {base:>9.3f} | {consultas:>9} | {'1.0x':>8}")
+
+            def informar(nombre, segundos, consultas, resultado=None):
+                print(f'{nombre:<28} | {segundos:>9.3f} | {consultas:>9} | {base / segundos:>7.1f}x')
+                if resultado is not None:
+                    problemas.extend(f'{nombre}: {d}' for d in diferencias(esperado, resultado))
+
+            informar('columnas (base + NumPy)',
+                     *medir(lambda: analitica.calcular(analitica.cargar_base()), contador))
+            for formato in formatos_disponibles():
+                destino = f'{directorio}/{formato}'
+                segundos, consultas, _ = medir(
+                    lambda: [ExportacionColumnar(tabla, formato).guardar(destino) for tabla in TABLAS], contador
+                )
+                informar(f'exportar {formato}', segundos, consultas)
+                inicio = time.perf_counter()
+                columnas = analitica.cargar_archivos(destino)
+                carga = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                resultado = analitica.calcular(columnas)
+                calculo = time.perf_counter() - inicio
+                informar(f'{formato}: cargar + calcular', carga + calculo, 0, resultado)
+                informar(f'{formato}: solo calcular', calculo, 0)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    for problema in problemas:
+        print(f'DIFERENCIA: {problema}')
+    print('Resultados iguales en todas las variantes' if not problemas else f'{len(problemas)} diferencias')
+    sys.exit(1 if problemas else 0)
+
+
+if __name__ == '__main__':
+    main()
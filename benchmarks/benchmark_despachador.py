@@ -0,0 +1,119 @@
+"""
+Benchmark del despachador automático de misiones.
+
+Mide el tiempo de DespachadorMisiones.despachar con N ninjas y N misiones
+aleatorios, sin exclusiones y con una fracción de parejas ya existentes
+(--excluidas), y con --verificar compara el puntaje contra una búsqueda
+exhaustiva en instancias pequeñas, también con parejas excluidas.
+
+Uso:
+    python benchmarks/benchmark_despachador.py
+    python benchmarks/benchmark_despachador.py --tamanos 1000 10000 --verificar 200
+"""
+import argparse
+import random
+import time
+
+import comun  # noqa: F401  (ajusta sys.path)
+
+from app import ValidadorRangos
+from despachador import DespachadorMisiones, NinjaDisponible, MisionAbierta
+
+
+def generar(n_ninjas, n_misiones, aleatorio, cupos_maximos=2):
+    """Ninjas y misiones aleatorios con niveles tomados de ValidadorRangos"""
+    ninjas = [
+        NinjaDisponible(
+            i,
+            ValidadorRangos.JERARQUIA_NINJA[aleatorio.choice(ValidadorRangos.RANGOS_NINJA)],
+            aleatorio.randint(30, 300),
+            aleatorio.randint(0, cupos_maximos)
+        )
+        for i in range(n_ninjas)
+    ]
+    misiones = [
+        MisionAbierta(
+            i,
+            ValidadorRangos.JERARQUIA_MISION[aleatorio.choice(ValidadorRangos.RANGOS_MISION)],
+            aleatorio.randint(0, 100) * 100
+        )
+        for i in range(n_misiones)
+    ]
+    return ninjas, misiones
+
+
+def excluir(ninjas, misiones, fraccion, aleatorio):
+    """Parejas compatibles ya existentes: en promedio fraccion por misión"""
+    if not ninjas or not misiones:
+        return set()
+    cantidad = int(fraccion * len(misiones))
+    if fraccion and not cantidad:
+        cantidad = aleatorio.randint(0, 3)
+    return {(aleatorio.choice(ninjas).id, aleatorio.choice(misiones).id) for _ in range(cantidad)}
+
+
+def optimo_exhaustivo(despachador, ninjas, misiones, excluidas=()):
+    """Mejor puntaje probando todas las asignaciones posibles (solo instancias pequeñas)"""
+    cupos = [n.cupos for n in ninjas]
+
+    def buscar(indice):
+        if indice == len(misiones):
+            return 0
+        mision = misiones[indice]
+        mejor = buscar(indice + 1)
+        for posicion, ninja in enumerate(ninjas):
+            if cupos[posicion] > 0 and ninja.nivel >= mision.nivel and (ninja.id, mision.id) not in excluidas:
+                cupos[posicion] -= 1
+                mejor = max(mejor, despachador.puntaje(ninja, mision) + buscar(indice + 1))
+                cupos[posicion] += 1
+        return mejor
+
+    return buscar(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--verificar', type=int, default=0,
+                        help='Número de instancias pequeñas a comparar con la búsqueda exhaustiva')
+    parser.add_argument('--excluidas', type=float, default=1.0,
+                        help='Parejas ya existentes por misión, en promedio, para la segunda medición')
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    aleatorio = random.Random(args.semilla)
+    despachador = DespachadorMisiones(ValidadorRangos.JERARQUIA_NINJA.values())
+
+    print(f"{'ninjas x misiones':>20} | {'excluidas':>9} | {'parejas':>8} | {'segundos':>9}")
+    print('-' * 56)
+    for n in args.tamanos:
+        ninjas, misiones = generar(n, n, aleatorio)
+        for excluidas in (set(), excluir(ninjas, misiones, args.excluidas, aleatorio)):
+            inicio = time.perf_counter()
+            parejas = despachador.despachar(ninjas, misiones, excluidas)
+            segundos = time.perf_counter() - inicio
+            if any((ninja.id, mision.id) in excluidas for ninja, mision in parejas):
+                raise SystemExit('El despacho repitió una pareja excluida')
+            print(f'{f"{n} x {n}":>20} | {len(excluidas):>9} | {len(parejas):>8} | {segundos:>9.3f}')
+
+    for _ in range(args.verificar):
+        ninjas, misiones = generar(aleatorio.randint(1, 5), aleatorio.randint(1, 6), aleatorio)
+        excluidas = excluir(ninjas, misiones, aleatorio.choice([0, 0.5, 1.5]), aleatorio)
+        parejas = despachador.despachar(ninjas, misiones, excluidas)
+        usados = {}
+        for ninja, mision in parejas:
+            usados[ninja.id] = usados.get(ninja.id, 0) + 1
+            if (ninja.id, mision.id) in excluidas or ninja.nivel < mision.nivel or usados[ninja.id] > ninja.cupos:
+                raise SystemExit(f'Pareja inválida {ninja} {mision}: {ninjas} {misiones} {excluidas}')
+        if len({mision.id for _, mision in parejas}) != len(parejas):
+            raise SystemExit(f'Misión repetida: {ninjas} {misiones} {excluidas}')
+        obtenido = sum(despachador.puntaje(n, m) for n, m in parejas)
+        esperado = optimo_exhaustivo(despachador, ninjas, misiones, excluidas)
+        if abs(obtenido - esperado) > 1e-6:
+            raise SystemExit(f'Puntaje {obtenido} distinto del óptimo {esperado}: {ninjas} {misiones} {excluidas}')
+    if args.verificar:
+        print(f'{args.verificar} instancias pequeñas coinciden con la búsqueda exhaustiva')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark del planificador de asignaciones: un plan por lote con la matriz de
+rangos frente a llamar AsignacionController.crear pareja por pareja.
+
+Uso:
+    python benchmarks/benchmark_planificador.py
+    python benchmarks/benchmark_planificador.py --tamanos 50 100 200
+"""
+import argparse
+from datetime import datetime
+
+from comun import ContadorConsultas, medir
+
+from sqlalchemy import insert
+
+from app import AplicacionNaruto, ValidadorRangos
+from models import db, Ninja, Mision
+
+
+def poblar(n):
+    """Inserta n ninjas y n misiones repartidos entre todos los rangos"""
+    db.drop_all()
+    db.create_all()
+    ahora = datetime.now()
+    rangos_ninja = ValidadorRangos.RANGOS_NINJA
+    rangos_mision = ValidadorRangos.RANGOS_MISION
+    db.session.execute(insert(Ninja), [
+        {'nombre': f'Ninja {i}', 'rango': rangos_ninja[i % len(rangos_ninja)], 'fecha_registro': ahora}
+        for i in range(n)
+    ])
+    db.session.execute(insert(Mision), [
+        {'nombre': f'Misión {i}', 'rango': rangos_mision[i % len(rangos_mision)], 'fecha_creacion': ahora}
+        for i in range(n)
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[20, 50, 100],
+                        help='Número de ninjas y de misiones (se prueban n x n parejas)')
+    args = parser.parse_args()
+
+    aplicacion = AplicacionNaruto()
+    aplicacion.inicializar_esquema()
+    controller = aplicacion.asignacion_controller
+    with aplicacion.app.app_context():
+        contador = ContadorConsultas(db.engine)
+        print(f"{'parejas':>8} | {'variante':<12} | {'válidas':>8} | {'consultas':>9} | {'segundos':>9}")
+        print('-' * 60)
+        for n in args.tamanos:
+            ids = list(range(1, n + 1))
+
+            poblar(n)
+            segundos, consultas, resultado = medir(
+                lambda: controller.planificar({'ninja_ids': ids, 'mision_ids': ids, 'persistir': True}),
+                contador
+            )
+            if not resultado['success']:
+                raise SystemExit(resultado['error'])
+            print(f'{n * n:>8} | {"planificador":<12} | {resultado["data"]["total"]:>8} | '
+                  f'{consultas:>9} | {segundos:>9.3f}')
+
+            poblar(n)
+            segundos, consultas, validas = medir(
+                lambda: sum(
+                    controller.crear({'ninja_id': ninja_id, 'mision_id': mision_id})['success']
+                    for ninja_id in ids for mision_id in ids
+                ),
+                contador
+            )
+            print(f'{n * n:>8} | {"uno a uno":<12} | {validas:>8} | {consultas:>9} | {segundos:>9.3f}')
+
+
+if __name__ == '__main__':
+    main()
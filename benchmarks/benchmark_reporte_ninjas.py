@@ -0,0 +1,88 @@
+"""
+Benchmark del reporte de ninjas: consultas y latencia de la lectura del resumen
+por ninja frente a la implementación anterior (2 conteos por ninja).
+
+Uso:
+    python benchmarks/benchmark_reporte_ninjas.py
+    python benchmarks/benchmark_reporte_ninjas.py --tamanos 1000 10000 100000 --sin-anterior
+"""
+import argparse
+from datetime import datetime
+
+from comun import ContadorConsultas, medir
+
+from sqlalchemy import insert
+
+from app import AplicacionNaruto, EstadisticasNinjas
+from models import db, Ninja, Mision, AsignacionMision
+
+
+def reporte_anterior():
+    """Implementación previa del reporte (N+1), conservada como referencia"""
+    reporte = []
+    for ninja in Ninja.query.all():
+        asignadas = AsignacionMision.query.filter_by(ninja_id=ninja.id).count()
+        completadas = AsignacionMision.query.filter_by(ninja_id=ninja.id, completada=True).count()
+        reporte.append({
+            'ninja': ninja.to_dict(),
+            'misiones_asignadas': asignadas,
+            'misiones_completadas': completadas,
+            'tasa_completado': round((completadas / asignadas * 100) if asignadas > 0 else 0, 2)
+        })
+    return reporte
+
+
+def poblar(n_ninjas, asignaciones_por_ninja=3):
+    """Inserta n ninjas, una misión por rango y algunas asignaciones por ninja"""
+    db.drop_all()
+    db.create_all()
+    ahora = datetime.now()
+    db.session.execute(insert(Mision), [
+        {'nombre': f'Misión {r}', 'rango': r, 'recompensa': 1000, 'descripcion': '', 'fecha_creacion': ahora}
+        for r in ['D', 'C', 'B', 'A', 'S']
+    ])
+    db.session.execute(insert(Ninja), [
+        {'nombre': f'Ninja {i}', 'rango': 'Jōnin', 'ataque': 50, 'defensa': 50, 'chakra': 100,
+         'aldea': 'Konohagakure', 'jutsus': 'Rasengan', 'fecha_registro': ahora}
+        for i in range(n_ninjas)
+    ])
+    db.session.execute(insert(AsignacionMision), [
+        {'ninja_id': i + 1, 'mision_id': (i + j) % 5 + 1, 'fecha_asignacion': ahora,
+         'completada': (i + j) % 2 == 0}
+        for i in range(n_ninjas) for j in range(i % (asignaciones_por_ninja + 1))
+    ])
+    # Las inserciones directas no pasan por los controladores: se recalcula el resumen por ninja
+    EstadisticasNinjas.reconstruir()
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--sin-anterior', action='store_true',
+                        help='No ejecutar la implementación N+1 (muy lenta con 100k ninjas)')
+    args = parser.parse_args()
+
+    aplicacion = AplicacionNaruto()
+    with aplicacion.app.app_context():
+        contador = ContadorConsultas(db.engine)
+        print(f"{'ninjas':>8} | {'variante':<10} | {'consultas':>9} | {'segundos':>9}")
+        print('-' * 46)
+        for n in args.tamanos:
+            poblar(n)
+            segundos, consultas, resultado = medir(
+                aplicacion.reporte_controller.generar_reporte_ninjas, contador
+            )
+            if not resultado['success']:
+                raise SystemExit(resultado['error'])
+            print(f'{n:>8} | {"resumen":<10} | {consultas:>9} | {segundos:>9.3f}')
+
+            if not args.sin_anterior:
+                segundos, consultas, anterior = medir(reporte_anterior, contador)
+                print(f'{n:>8} | {"anterior":<10} | {consultas:>9} | {segundos:>9.3f}')
+                if anterior != resultado['data']:
+                    raise SystemExit('El reporte desde el resumen no coincide con la implementación anterior')
+
+
+if __name__ == '__main__':
+    main()
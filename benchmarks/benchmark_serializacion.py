@@ -0,0 +1,115 @@
+"""
+Micro-benchmark de serialización: filas por segundo al convertir N ninjas y
+N asignaciones en JSON con
+
+- orm:      objetos ORM + to_dict() + json estándar (implementación anterior)
+- tuplas:   select() de columnas + ProyeccionListado.serializador + json estándar
+- orjson:   lo mismo codificado con ProveedorJSON sobre orjson (si está instalado)
+
+Cada variante incluye la consulta, la construcción de diccionarios y la
+codificación, y se mide también la parte de codificación por separado.
+
+Uso:
+    python benchmarks/benchmark_serializacion.py
+    python benchmarks/benchmark_serializacion.py --filas 100000
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+from comun import ContadorConsultas
+
+from sqlalchemy import insert
+
+from app import AplicacionNaruto, PROYECCION_NINJAS, PROYECCION_ASIGNACIONES
+from models import db, Ninja, Mision, AsignacionMision
+import serializacion
+
+
+def poblar(n):
+    """n ninjas, 100 misiones y n asignaciones"""
+    db.drop_all()
+    db.create_all()
+    ahora = datetime.now()
+    db.session.execute(insert(Ninja), [
+        {'nombre': f'Ninja {i}', 'rango': 'Jōnin', 'ataque': i % 100, 'defensa': 50, 'chakra': 100,
+         'aldea': 'Konohagakure', 'jutsus': 'Rasengan,Chidori', 'fecha_registro': ahora}
+        for i in range(n)
+    ])
+    db.session.execute(insert(Mision), [
+        {'nombre': f'Misión {i}', 'rango': 'D', 'recompensa': 100, 'descripcion': '', 'fecha_creacion': ahora}
+        for i in range(100)
+    ])
+    db.session.execute(insert(AsignacionMision), [
+        {'ninja_id': i + 1, 'mision_id': i % 100 + 1, 'fecha_asignacion': ahora, 'completada': i % 2 == 0}
+        for i in range(n)
+    ])
+    db.session.commit()
+
+
+def json_estandar(datos):
+    """Codificación equivalente a jsonify sin orjson"""
+    return json.dumps(datos, ensure_ascii=True, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def variante_orm(modelo, codificar):
+    def ejecutar():
+        datos = [objeto.to_dict() for objeto in modelo.query.order_by(modelo.id)]
+        return datos, codificar
+    return ejecutar
+
+
+def variante_tuplas(proyeccion, codificar):
+    def ejecutar():
+        consulta, nombres = proyeccion.consulta()
+        datos = list(map(proyeccion.serializador(nombres), db.session.execute(consulta)))
+        return datos, codificar
+    return ejecutar
+
+
+def medir(variante, contador):
+    """(segundos totales, segundos de codificación, consultas)"""
+    db.session.expunge_all()
+    contador.reiniciar()
+    inicio = time.perf_counter()
+    datos, codificar = variante()
+    inicio_codificacion = time.perf_counter()
+    codificar(datos)
+    fin = time.perf_counter()
+    return fin - inicio, fin - inicio_codificacion, contador.total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, default=100000)
+    args = parser.parse_args()
+
+    aplicacion = AplicacionNaruto()
+    proveedor = serializacion.ProveedorJSON(aplicacion.app)
+    with aplicacion.app.app_context():
+        poblar(args.filas)
+        contador = ContadorConsultas(db.engine)
+
+        variantes = [
+            ('ninjas', 'orm', variante_orm(Ninja, json_estandar)),
+            ('ninjas', 'tuplas', variante_tuplas(PROYECCION_NINJAS, json_estandar)),
+            ('asignaciones', 'orm', variante_orm(AsignacionMision, json_estandar)),
+            ('asignaciones', 'tuplas', variante_tuplas(PROYECCION_ASIGNACIONES, json_estandar)),
+        ]
+        if serializacion.orjson is not None:
+            variantes.insert(2, ('ninjas', 'orjson', variante_tuplas(PROYECCION_NINJAS, proveedor.dumps_bytes)))
+            variantes.append(('asignaciones', 'orjson', variante_tuplas(PROYECCION_ASIGNACIONES, proveedor.dumps_bytes)))
+        else:
+            print('orjson no está instalado: se omite esa variante')
+
+        print(f"{'tabla':<13} | {'variante':<8} | {'consultas':>9} | {'segundos':>8} | {'codificar':>9} | {'filas/s':>9}")
+        print('-' * 71)
+        for tabla, nombre, variante in variantes:
+            segundos, codificacion, consultas = medir(variante, contador)
+            print(f'{tabla:<13} | {nombre:<8} | {consultas:>9} | {segundos:>8.3f} | {codificacion:>9.3f} | '
+                  f'{args.filas / segundos:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark de GET /api/ninjas/top: tiempo de construcción del índice
+RankingPoder y latencia de consultas top-K con N ninjas aleatorios.
+
+Con --verificar compara cada consulta contra ordenar todos los ninjas.
+
+Uso:
+    python benchmarks/benchmark_top_ninjas.py
+    python benchmarks/benchmark_top_ninjas.py --tamanos 1000000 --limite 50 --verificar
+"""
+import argparse
+import random
+import time
+
+import comun  # noqa: F401  (ajusta sys.path)
+
+from app import ValidadorRangos
+from ranking import RankingPoder, ESCALA_PESOS
+
+ALDEAS = ['Konohagakure', 'Sunagakure', 'Kirigakure', 'Iwagakure', 'Kumogakure']
+
+# (pesos de ataque, defensa y chakra, rango, aldea)
+CONSULTAS = [
+    ((1, 1, 1), None, None),
+    ((1, 1, 1), 'Jōnin', 'Sunagakure'),
+    ((1, 1, 1), 'Jōnin', None),
+    ((2, 1, 0.5), None, None),
+    ((1, 1, 0.1), 'Chūnin', None),
+    ((0, 0, 1), None, 'Kirigakure'),
+    ((3, 0, 1), 'Genin', 'Konohagakure'),
+]
+
+
+def generar(n, aleatorio):
+    """Filas (id, rango, aldea, ataque, defensa, chakra) aleatorias"""
+    return [
+        (i + 1, aleatorio.choice(ValidadorRangos.RANGOS_NINJA), aleatorio.choice(ALDEAS),
+         aleatorio.randint(0, 100), aleatorio.randint(0, 100), aleatorio.randint(50, 300))
+        for i in range(n)
+    ]
+
+
+def top_ordenando(filas, limite, pesos, rango, aldea):
+    """Top-K ordenando todos los ninjas del filtro (referencia)"""
+    enteros = [round(peso * ESCALA_PESOS) for peso in pesos]
+    puntajes = [
+        (sum(peso * valor for peso, valor in zip(enteros, fila[3:])), fila[0])
+        for fila in filas
+        if (rango is None or fila[1] == rango) and (aldea is None or fila[2] == aldea)
+    ]
+    puntajes.sort(key=lambda par: (-par[0], par[1]))
+    return [(puntaje / ESCALA_PESOS, ninja_id) for puntaje, ninja_id in puntajes[:limite]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--limite', type=int, default=50)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--verificar', action='store_true', help='Compara con ordenar todos los ninjas')
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    aleatorio = random.Random(args.semilla)
+
+    for n in args.tamanos:
+        filas = generar(n, aleatorio)
+        inicio = time.perf_counter()
+        ranking = RankingPoder(filas)
+        print(f'\n{n} ninjas: índice construido en {time.perf_counter() - inicio:.2f} s')
+        print(f"{'pesos':>16} | {'rango':>7} | {'aldea':>13} | {'ms (mediana)':>12}")
+        print('-' * 60)
+
+        for pesos, rango, aldea in CONSULTAS:
+            tiempos = []
+            for _ in range(args.repeticiones):
+                inicio = time.perf_counter()
+                resultado = ranking.top(args.limite, pesos, rango, aldea)
+                tiempos.append(time.perf_counter() - inicio)
+            mediana = sorted(tiempos)[len(tiempos) // 2]
+            print(f'{str(pesos):>16} | {rango or "-":>7} | {aldea or "-":>13} | {mediana * 1000:>12.2f}')
+
+            if args.verificar and resultado != top_ordenando(filas, args.limite, pesos, rango, aldea):
+                raise SystemExit(f'El top-K no coincide con la referencia: {pesos} {rango} {aldea}')
+        if args.verificar:
+            print('Todas las consultas coinciden con la referencia')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Utilidades compartidas por los scripts de benchmark"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import event
+
+from models import db
+
+
+class ContadorConsultas:
+    """Cuenta las sentencias SQL ejecutadas sobre un engine"""
+
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+    def reiniciar(self):
+        self.total = 0
+
+
+def medir(funcion, contador):
+    """Ejecuta la función y devuelve (segundos, consultas, resultado)"""
+    db.session.expunge_all()
+    contador.reiniciar()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - inicio, contador.total, resultado
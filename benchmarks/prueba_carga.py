@@ -0,0 +1,116 @@
+"""
+Prueba de carga HTTP contra uno o varios servidores ya levantados: envía
+peticiones GET desde varios clientes concurrentes durante un tiempo fijo y
+reporta peticiones por segundo y latencias p50/p99.
+
+Sirve para comparar el servidor de desarrollo con gunicorn:
+
+    python app.py                                     # puerto 5000
+    WEB_BIND=0.0.0.0:8000 gunicorn -c gunicorn.conf.py wsgi:app
+
+    python benchmarks/prueba_carga.py \\
+        --servidor desarrollo=http://localhost:5000 \\
+        --servidor gunicorn=http://localhost:8000 \\
+        --concurrencia 32 --segundos 20
+"""
+import argparse
+import http.client
+import itertools
+import threading
+import time
+from urllib.parse import urlsplit
+
+RUTAS = [
+    '/api/ninjas?limit=50',
+    '/api/ninjas/top?limit=20',
+    '/api/misiones?limit=50',
+    '/api/asignaciones?limit=50',
+    '/api/reportes/ninjas',
+]
+
+
+class Cliente(threading.Thread):
+    """Envía peticiones por una conexión persistente hasta la fecha límite"""
+
+    def __init__(self, url, rutas, limite):
+        super().__init__(daemon=True)
+        partes = urlsplit(url)
+        self.host = partes.hostname
+        self.puerto = partes.port or 80
+        self.rutas = itertools.cycle(rutas)
+        self.limite = limite
+        self.latencias = []
+        self.errores = 0
+
+    def _conectar(self):
+        return http.client.HTTPConnection(self.host, self.puerto, timeout=30)
+
+    def run(self):
+        conexion = self._conectar()
+        while time.perf_counter() < self.limite:
+            inicio = time.perf_counter()
+            try:
+                conexion.request('GET', next(self.rutas))
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                if respuesta.status >= 400:
+                    self.errores += 1
+                else:
+                    self.latencias.append(time.perf_counter() - inicio)
+                if respuesta.will_close:
+                    conexion.close()
+                    conexion = self._conectar()
+            except (OSError, http.client.HTTPException):
+                self.errores += 1
+                conexion.close()
+                conexion = self._conectar()
+                time.sleep(0.01)
+        conexion.close()
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) de una lista ordenada"""
+    if not valores:
+        return 0.0
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def ejecutar(url, rutas, concurrencia, segundos):
+    """Lanza los clientes y devuelve (peticiones, errores, peticiones/s, p50, p99)"""
+    limite = time.perf_counter() + segundos
+    clientes = [Cliente(url, rutas[i % len(rutas):] + rutas[:i % len(rutas)], limite) for i in range(concurrencia)]
+    inicio = time.perf_counter()
+    for cliente in clientes:
+        cliente.start()
+    for cliente in clientes:
+        cliente.join()
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(latencia for cliente in clientes for latencia in cliente.latencias)
+    errores = sum(cliente.errores for cliente in clientes)
+    return len(latencias), errores, len(latencias) / duracion, percentil(latencias, 50), percentil(latencias, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servidor', action='append', required=True,
+                        help='etiqueta=url del servidor, p. ej. gunicorn=http://localhost:8000 (repetible)')
+    parser.add_argument('--ruta', action='append', help='Ruta a consultar (repetible; por defecto varias de la API)')
+    parser.add_argument('--concurrencia', type=int, default=16)
+    parser.add_argument('--segundos', type=float, default=10)
+    args = parser.parse_args()
+
+    rutas = args.ruta or RUTAS
+    print(f"{'servidor':<14} | {'peticiones':>10} | {'errores':>7} | {'pet/s':>8} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print('-' * 71)
+    for servidor in args.servidor:
+        etiqueta, separador, url = servidor.partition('=')
+        if not separador:
+            etiqueta = url = servidor
+        peticiones, errores, por_segundo, p50, p99 = ejecutar(url, rutas, args.concurrencia, args.segundos)
+        print(f'{etiqueta:<14} | {peticiones:>10} | {errores:>7} | {por_segundo:>8.1f} | '
+              f'{p50 * 1000:>8.1f} | {p99 * 1000:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,525 @@
+"""
+Suite de rendimiento: genera (o reutiliza) un dataset sintético de Konoha y
+ejecuta cada ruta registrada en la aplicación (con el cliente de pruebas de
+Flask, sin red) y cada método de los controladores directamente. Por caso
+registra latencias p50/p90/p99, consultas SQL por ejecución y memoria pico
+(tracemalloc) y guarda todo en un JSON. Con "comparar" contrasta dos JSON y
+sale con 1 si hay regresiones.
+
+Las escrituras se preparan fuera de la medición (ninjas nuevos para las
+asignaciones, asignaciones pendientes para completar, etc.) para que cada
+repetición haga el mismo trabajo. La caché de lectura se desactiva salvo con
+--con-cache.
+
+Uso:
+    python benchmarks/suite_rendimiento.py ejecutar --salida base.json
+    DATABASE_URL=sqlite:////tmp/konoha.db python benchmarks/suite_rendimiento.py ejecutar \\
+        --ninjas 100000 --misiones 20000 --asignaciones 500000 --salida base.json
+    DATABASE_URL=sqlite:////tmp/konoha.db python benchmarks/suite_rendimiento.py ejecutar \\
+        --sin-generar --salida nuevo.json
+    python benchmarks/suite_rendimiento.py comparar base.json nuevo.json --tolerancia 0.25
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from comun import ContadorConsultas
+
+from sqlalchemy import func, select
+
+from app import AplicacionNaruto
+from datos_sinteticos import generar, filas_ninjas, filas_misiones
+from models import db, Ninja, Mision, AsignacionMision
+
+
+class Caso:
+    """Operación a medir: preparar() (sin medir) devuelve los argumentos de ejecutar(), que devuelve si tuvo éxito"""
+
+    def __init__(self, nombre, ejecutar, preparar=None, repeticiones=None):
+        self.nombre = nombre
+        self.ejecutar = ejecutar
+        self.preparar = preparar or (lambda: ())
+        self.repeticiones = repeticiones
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) de una lista ordenada"""
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def _consumir(resultado):
+    """Éxito de un método de controlador; los iteradores (streaming) se recorren completos"""
+    if isinstance(resultado, dict):
+        return resultado.get('success', True)
+    for _ in resultado:
+        pass
+    return True
+
+
+class Suite:
+    """Casos de rutas y de controladores sobre una AplicacionNaruto con datos"""
+
+    def __init__(self, aplicacion, semilla=7):
+        self.aplicacion = aplicacion
+        self.cliente = aplicacion.app.test_client()
+        self.aleatorio = random.Random(semilla)
+        self.ahora = datetime.now().replace(microsecond=0)
+        self.rutas_cubiertas = set()
+        self.ids_fijos = {}
+
+    # --- datos para preparar las escrituras ---
+
+    def _ids(self, columna, condicion=None, limite=None):
+        consulta = select(columna).order_by(func.random()).limit(limite)
+        if condicion is not None:
+            consulta = consulta.where(condicion)
+        return list(db.session.execute(consulta).scalars())
+
+    def _ninjas_nuevos(self, n, rango='Jōnin'):
+        """Crea n ninjas (fuera de la medición) y devuelve sus ids"""
+        filas = [{**fila, 'rango': rango} for fila in filas_ninjas(n, self.aleatorio, self.ahora)]
+        resultado = self.aplicacion.ninja_controller.crear_lote(filas)
+        return [r['id'] for r in resultado['data']['resultados']]
+
+    def _misiones_nuevas(self, n):
+        resultado = self.aplicacion.mision_controller.crear_lote(filas_misiones(n, self.aleatorio, self.ahora))
+        return [r['id'] for r in resultado['data']['resultados']]
+
+    def _datos_ninja(self):
+        fila = filas_ninjas(1, self.aleatorio, self.ahora)[0]
+        del fila['fecha_registro']
+        return fila
+
+    def _datos_mision(self):
+        fila = filas_misiones(1, self.aleatorio, self.ahora)[0]
+        del fila['fecha_creacion']
+        return fila
+
+    def _asignacion_nueva(self):
+        return {'ninja_id': self._ninjas_nuevos(1)[0], 'mision_id': self._ids(Mision.id, limite=1)[0]}
+
+    def _asignaciones_nuevas(self, n=100):
+        mision_ids = self._ids(Mision.id, limite=n)
+        return [
+            {'ninja_id': ninja_id, 'mision_id': mision_id}
+            for ninja_id, mision_id in zip(self._ninjas_nuevos(len(mision_ids)), mision_ids)
+        ]
+
+    def _pendientes(self, n):
+        pendientes = self._ids(AsignacionMision.id, AsignacionMision.completada.is_(False), n)
+        if len(pendientes) < n:
+            resultado = self.aplicacion.asignacion_controller.crear_lote(self._asignaciones_nuevas(n))
+            pendientes = [r['id'] for r in resultado['data']['resultados'] if r['success']]
+        return pendientes
+
+    def _planificacion(self):
+        return {'ninja_ids': self._ids(Ninja.id, limite=200), 'mision_ids': self._ids(Mision.id, limite=100)}
+
+    def _tarea_terminada(self, tipo):
+        """Id de una tarea ya terminada, creada fuera de la medición"""
+        tarea = self.aplicacion.tareas.enviar(tipo)
+        self.aplicacion.tareas.esperar()
+        return tarea['id']
+
+    def _despacho(self):
+        abiertas = select(Mision.id).where(
+            ~select(AsignacionMision.id).where(AsignacionMision.mision_id == Mision.id).exists()
+        ).limit(200)
+        return {'ninja_ids': self._ids(Ninja.id, limite=500), 'mision_ids': list(db.session.scalars(abiertas))}
+
+    # --- casos ---
+
+    def _ruta(self, metodo, regla, url, cuerpo=None, esperados=(200, 201), **opciones):
+        """Caso sobre una ruta: url y cuerpo pueden depender de lo que devuelva preparar()
+
+        En una url fija, {ninja} y {mision} se reemplazan por ids existentes; el nombre del
+        caso conserva la plantilla para que sea el mismo entre ejecuciones.
+        """
+        self.rutas_cubiertas.add((regla, metodo))
+
+        def ejecutar(*preparado):
+            destino = url(*preparado) if callable(url) else url.format(**self.ids_fijos)
+            datos = cuerpo(*preparado) if callable(cuerpo) else cuerpo
+            respuesta = self.cliente.open(destino, method=metodo, json=datos)
+            respuesta.get_data()
+            respuesta.close()
+            return respuesta.status_code in esperados
+
+        nombre = f'{metodo} {url if isinstance(url, str) else regla}'
+        return Caso(opciones.pop('nombre', nombre), ejecutar, **opciones)
+
+    def _ruta_tarea(self, regla):
+        """POST que encola una tarea, medido hasta que la tarea termina"""
+        caso = self._ruta('POST', regla, regla, esperados=(202,), nombre=f'POST {regla} (hasta terminar)')
+        encolar = caso.ejecutar
+
+        def ejecutar():
+            exito = encolar()
+            return self.aplicacion.tareas.esperar() and exito
+
+        caso.ejecutar = ejecutar
+        return caso
+
+    def _ruta_flujo(self, regla):
+        """GET de un flujo continuo (SSE): se mide hasta el primer fragmento y se cierra la conexión"""
+        self.rutas_cubiertas.add((regla, 'GET'))
+
+        def ejecutar():
+            respuesta = self.cliente.get(regla, buffered=False)
+            try:
+                next(iter(respuesta.response), None)
+            finally:
+                # Cerrar el generador da de baja la suscripción
+                respuesta.close()
+            return respuesta.status_code == 200
+
+        return Caso(f'GET {regla} (primer fragmento)', ejecutar)
+
+    def _ranking_al_dia(self):
+        """preparar() de los casos del top-K: la reconstrucción en segundo plano no entra en la medición"""
+        self.aplicacion.ninja_controller.sincronizar_ranking()
+        return ()
+
+    def _controlador(self, nombre, metodo, preparar=None, repeticiones=None, **kwargs):
+        def ejecutar(*args):
+            return _consumir(metodo(*args, **kwargs))
+        return Caso(f'controlador {nombre}', ejecutar, preparar, repeticiones)
+
+    def casos_rutas(self):
+        self.ids_fijos = {'ninja': self._ids(Ninja.id, limite=1)[0], 'mision': self._ids(Mision.id, limite=1)[0]}
+        return [
+            self._ruta('GET', '/', '/'),
+            self._ruta('GET', '/pagina/<path:path>', '/pagina/index.html', esperados=(200, 404)),
+            self._ruta('GET', '/api/ninjas', '/api/ninjas?limit=50'),
+            self._ruta('GET', '/api/ninjas', '/api/ninjas?limit=50&after_id={ninja}&fields=id,nombre,rango'),
+            self._ruta('GET', '/api/ninjas', '/api/ninjas?limit=50&jutsu=Rasengan'),
+            self._ruta('GET', '/api/ninjas', '/api/ninjas?stream=1&limit=1000'),
+            self._ruta('GET', '/api/ninjas/top', '/api/ninjas/top?limit=20', preparar=self._ranking_al_dia),
+            self._ruta('GET', '/api/ninjas/top', '/api/ninjas/top?limit=20&rango=Jōnin&aldea=Sunagakure&peso_chakra=2',
+                       preparar=self._ranking_al_dia),
+            self._ruta('GET', '/api/ninjas/<int:id>', '/api/ninjas/{ninja}'),
+            self._ruta('POST', '/api/ninjas', '/api/ninjas', lambda datos: datos,
+                       preparar=lambda: (self._datos_ninja(),), nombre='POST /api/ninjas'),
+            self._ruta('POST', '/api/ninjas/bulk', '/api/ninjas/bulk', lambda datos: datos,
+                       preparar=lambda: ([self._datos_ninja() for _ in range(100)],),
+                       nombre='POST /api/ninjas/bulk (100)'),
+            self._ruta('PUT', '/api/ninjas/<int:id>', lambda i, datos: f'/api/ninjas/{i}',
+                       lambda i, datos: datos,
+                       preparar=lambda: (self._ids(Ninja.id, limite=1)[0],
+                                         {'ataque': self.aleatorio.randint(1, 100), 'jutsus': 'Rasengan,Chidori'})),
+            self._ruta('DELETE', '/api/ninjas/<int:id>', lambda i: f'/api/ninjas/{i}',
+                       preparar=lambda: (self._ninjas_nuevos(1)[0],)),
+            self._ruta('GET', '/api/misiones', '/api/misiones?limit=50'),
+            self._ruta('GET', '/api/misiones', '/api/misiones?stream=1&limit=1000'),
+            self._ruta('GET', '/api/misiones/<int:id>', '/api/misiones/{mision}'),
+            self._ruta('POST', '/api/misiones', '/api/misiones', lambda datos: datos,
+                       preparar=lambda: (self._datos_mision(),), nombre='POST /api/misiones'),
+            self._ruta('POST', '/api/misiones/bulk', '/api/misiones/bulk', lambda datos: datos,
+                       preparar=lambda: ([self._datos_mision() for _ in range(100)],),
+                       nombre='POST /api/misiones/bulk (100)'),
+            self._ruta('DELETE', '/api/misiones/<int:id>', lambda i: f'/api/misiones/{i}',
+                       preparar=lambda: (self._misiones_nuevas(1)[0],)),
+            self._ruta('GET', '/api/asignaciones', '/api/asignaciones?limit=50'),
+            self._ruta('GET', '/api/asignaciones', '/api/asignaciones?limit=50&ninja_id={ninja}'),
+            self._ruta('GET', '/api/asignaciones', '/api/asignaciones?limit=50&completada=false'),
+            self._ruta('GET', '/api/asignaciones', '/api/asignaciones?stream=1&limit=1000'),
+            self._ruta('POST', '/api/asignaciones', '/api/asignaciones', lambda datos: datos,
+                       preparar=lambda: (self._asignacion_nueva(),)),
+            self._ruta('POST', '/api/asignaciones/bulk', '/api/asignaciones/bulk', lambda datos: datos,
+                       preparar=lambda: (self._asignaciones_nuevas(),), nombre='POST /api/asignaciones/bulk (100)'),
+            self._ruta('POST', '/api/asignaciones/planificar', '/api/asignaciones/planificar', lambda datos: datos,
+                       preparar=lambda: (self._planificacion(),)),
+            self._ruta('POST', '/api/asignaciones/despachar', '/api/asignaciones/despachar', lambda datos: datos,
+                       preparar=lambda: (self._despacho(),)),
+            self._ruta('PUT', '/api/asignaciones/completar', '/api/asignaciones/completar', lambda ids: ids,
+                       preparar=lambda: (self._pendientes(100),), nombre='PUT /api/asignaciones/completar (100)'),
+            self._ruta('PUT', '/api/asignaciones/<int:id>/completar', lambda i: f'/api/asignaciones/{i}/completar',
+                       preparar=lambda: (self._pendientes(1)[0],)),
+            self._ruta('GET', '/api/reportes/ninjas', '/api/reportes/ninjas'),
+            self._ruta('GET', '/api/reportes/ninjas', '/api/reportes/ninjas?stream=1'),
+            self._ruta('GET', '/api/reportes/misiones', '/api/reportes/misiones'),
+            self._ruta('GET', '/api/reportes/ranking', '/api/reportes/ranking?orden=recompensa&limit=20'),
+            self._ruta_tarea('/api/reportes/ninjas'),
+            self._ruta_tarea('/api/reportes/misiones'),
+            self._ruta('GET', '/api/tareas/<tarea_id>', lambda i: f'/api/tareas/{i}',
+                       preparar=lambda: (self._tarea_terminada('reporte_ninjas'),)),
+            self._ruta('GET', '/api/tareas/<tarea_id>/resultado', lambda i: f'/api/tareas/{i}/resultado',
+                       preparar=lambda: (self._tarea_terminada('reporte_misiones'),)),
+            self._ruta('GET', '/api/exportar/<tabla>', '/api/exportar/ninjas'),
+            self._ruta('GET', '/api/exportar/<tabla>', '/api/exportar/asignaciones_misiones?formato=csv'),
+            self._ruta_flujo('/api/eventos'),
+            self._ruta('GET', '/api/cache/estadisticas', '/api/cache/estadisticas'),
+            self._ruta('GET', '/metrics', '/metrics'),
+        ]
+
+    def casos_controladores(self):
+        a = self.aplicacion
+        ninja_id, mision_id = self._ids(Ninja.id, limite=1)[0], self._ids(Mision.id, limite=1)[0]
+        return [
+            self._controlador('NinjaController.listar_todos', a.ninja_controller.listar_todos, limite=50),
+            self._controlador('NinjaController.iterar_todos', a.ninja_controller.iterar_todos, limite=1000),
+            self._controlador('NinjaController.top', a.ninja_controller.top, self._ranking_al_dia, limite=20),
+            self._controlador('NinjaController.obtener_por_id', a.ninja_controller.obtener_por_id,
+                              lambda: (ninja_id,)),
+            self._controlador('NinjaController.crear', a.ninja_controller.crear, lambda: (self._datos_ninja(),)),
+            self._controlador('NinjaController.crear_lote', a.ninja_controller.crear_lote,
+                              lambda: ([self._datos_ninja() for _ in range(100)],)),
+            self._controlador('NinjaController.actualizar', a.ninja_controller.actualizar,
+                              lambda: (self._ids(Ninja.id, limite=1)[0], {'defensa': self.aleatorio.randint(1, 100)})),
+            self._controlador('NinjaController.eliminar', a.ninja_controller.eliminar,
+                              lambda: (self._ninjas_nuevos(1)[0],)),
+            self._controlador('MisionController.listar_todas', a.mision_controller.listar_todas, limite=50),
+            self._controlador('MisionController.iterar_todas', a.mision_controller.iterar_todas, limite=1000),
+            self._controlador('MisionController.obtener_por_id', a.mision_controller.obtener_por_id,
+                              lambda: (mision_id,)),
+            self._controlador('MisionController.crear', a.mision_controller.crear, lambda: (self._datos_mision(),)),
+            self._controlador('MisionController.crear_lote', a.mision_controller.crear_lote,
+                              lambda: ([self._datos_mision() for _ in range(100)],)),
+            self._controlador('MisionController.eliminar', a.mision_controller.eliminar,
+                              lambda: (self._misiones_nuevas(1)[0],)),
+            self._controlador('AsignacionController.listar_todas', a.asignacion_controller.listar_todas, limite=50),
+            self._controlador('AsignacionController.iterar_todas', a.asignacion_controller.iterar_todas, limite=1000),
+            self._controlador('AsignacionController.crear', a.asignacion_controller.crear,
+                              lambda: (self._asignacion_nueva(),)),
+            self._controlador('AsignacionController.crear_lote', a.asignacion_controller.crear_lote,
+                              lambda: (self._asignaciones_nuevas(),)),
+            self._controlador('AsignacionController.planificar', a.asignacion_controller.planificar,
+                              lambda: (self._planificacion(),)),
+            self._controlador('AsignacionController.despachar', a.asignacion_controller.despachar,
+                              lambda: (self._despacho(),)),
+            self._controlador('AsignacionController.completar', a.asignacion_controller.completar,
+                              lambda: (self._pendientes(1)[0],)),
+            self._controlador('AsignacionController.completar_lote', a.asignacion_controller.completar_lote,
+                              lambda: (self._pendientes(100),)),
+            self._controlador('ReporteController.generar_reporte_ninjas', a.reporte_controller.generar_reporte_ninjas),
+            self._controlador('ReporteController.iterar_reporte_ninjas', a.reporte_controller.iterar_reporte_ninjas),
+            self._controlador('ReporteController.generar_reporte_misiones',
+                              a.reporte_controller.generar_reporte_misiones),
+            self._controlador('ReporteController.iterar_reporte_misiones',
+                              a.reporte_controller.iterar_reporte_misiones),
+            self._controlador('ReporteController.generar_ranking', a.reporte_controller.generar_ranking,
+                              orden='recompensa', limite=20),
+            self._controlador('ColaTareas.limpiar', a.tareas.limpiar),
+        ]
+
+    def rutas_sin_cubrir(self):
+        """(regla, método) registrados en la aplicación que ningún caso ejercita"""
+        return sorted(
+            (regla.rule, metodo)
+            for regla in self.aplicacion.app.url_map.iter_rules() if regla.endpoint != 'static'
+            for metodo in regla.methods - {'HEAD', 'OPTIONS'}
+            if (regla.rule, metodo) not in self.rutas_cubiertas
+        )
+
+
+def medir_caso(caso, repeticiones, contador):
+    """Latencias (ms), consultas por ejecución, memoria pico y errores de un caso"""
+    latencias, consultas, errores = [], [], 0
+    for i in range(repeticiones + 2):
+        preparado = caso.preparar()
+        db.session.expunge_all()
+        gc.collect()
+        contador.reiniciar()
+        if i == repeticiones + 1:
+            # Última ejecución con tracemalloc (aparte, porque ralentiza)
+            tracemalloc.start()
+            exito = caso.ejecutar(*preparado)
+            memoria_pico = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            inicio = time.perf_counter()
+            exito = caso.ejecutar(*preparado)
+            segundos = time.perf_counter() - inicio
+            if i > 0:  # la primera calienta cachés de SQLAlchemy y de la aplicación
+                latencias.append(segundos * 1000)
+                consultas.append(contador.total)
+        errores += not exito
+    latencias.sort()
+    return {
+        'repeticiones': repeticiones,
+        'p50_ms': round(percentil(latencias, 50), 3),
+        'p90_ms': round(percentil(latencias, 90), 3),
+        'p99_ms': round(percentil(latencias, 99), 3),
+        'media_ms': round(sum(latencias) / len(latencias), 3),
+        'consultas': max(consultas),
+        'memoria_pico_kb': round(memoria_pico / 1024, 1),
+        'errores': errores,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(args):
+    if not args.con_cache:
+        os.environ['CACHE_BACKEND'] = 'ninguna'
+    # La suite mide por su cuenta: sin el log de peticiones lentas de la instrumentación
+    logging.getLogger('naruto.peticiones').setLevel(logging.ERROR)
+    aplicacion = AplicacionNaruto()
+    # La limpieza de tareas se mide como caso propio, no dentro de los envíos
+    aplicacion.tareas.intervalo_limpieza = float('inf')
+    with aplicacion.app.app_context():
+        if args.sin_generar:
+            conteos = {
+                'ninjas': db.session.scalar(select(func.count(Ninja.id))),
+                'misiones': db.session.scalar(select(func.count(Mision.id))),
+                'asignaciones': db.session.scalar(select(func.count(AsignacionMision.id))),
+            }
+        else:
+            conteos = generar(args.ninjas, args.misiones, args.asignaciones, args.semilla, reiniciar=True)
+        contador = ContadorConsultas(db.engine)
+        suite = Suite(aplicacion, args.semilla)
+        casos = suite.casos_rutas() + suite.casos_controladores()
+        if args.filtro:
+            casos = [caso for caso in casos if args.filtro in caso.nombre]
+
+        resultados = {}
+        print(f"{'caso':<62} | {'p50 ms':>8} | {'p99 ms':>8} | {'consultas':>9} | {'memoria KB':>10} | {'errores':>7}")
+        print('-' * 117)
+        for caso in casos:
+            resultado = medir_caso(caso, caso.repeticiones or args.repeticiones, contador)
+            resultados[caso.nombre] = resultado
+            print(f"{caso.nombre[:62]:<62} | {resultado['p50_ms']:>8.2f} | {resultado['p99_ms']:>8.2f} | "
+                  f"{resultado['consultas']:>9} | {resultado['memoria_pico_kb']:>10.1f} | {resultado['errores']:>7}")
+
+        sin_cubrir = suite.rutas_sin_cubrir()
+        for regla, metodo in sin_cubrir:
+            print(f'Ruta sin caso en la suite: {metodo} {regla}', file=sys.stderr)
+
+        informe = {
+            'etiqueta': args.etiqueta,
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'entorno': {
+                'python': platform.python_version(),
+                'plataforma': platform.platform(),
+                'base_datos': db.engine.url.get_backend_name(),
+                'commit': _commit(),
+                'cache': aplicacion.config.CACHE_BACKEND,
+                'lectura_async': aplicacion.config.LECTURA_ASYNC,
+            },
+            'datos': conteos,
+            'casos': resultados,
+            'rutas_sin_cubrir': [f'{metodo} {regla}' for regla, metodo in sin_cubrir],
+        }
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, ensure_ascii=False, indent=2)
+    print(f'Resultados en {args.salida}')
+    return 1 if any(resultado['errores'] for resultado in resultados.values()) else 0
+
+
+def _variacion(base, nuevo):
+    return (nuevo - base) / base if base else (0.0 if nuevo == base else float('inf'))
+
+
+def comparar_informes(base, nuevo, tolerancia=0.25, minimo_ms=0.5, minimo_kb=64):
+    """[(caso, estado, detalle)] con estado 'regresion', 'mejora', 'igual', 'nuevo' o 'eliminado'"""
+    filas = []
+    for nombre in sorted(set(base['casos']) | set(nuevo['casos'])):
+        if nombre not in base['casos']:
+            filas.append((nombre, 'nuevo', ''))
+            continue
+        if nombre not in nuevo['casos']:
+            filas.append((nombre, 'eliminado', ''))
+            continue
+        a, b = base['casos'][nombre], nuevo['casos'][nombre]
+        problemas, mejoras = [], []
+        # Las consultas son deterministas: cualquier aumento es una regresión (p. ej. un N+1)
+        if b['consultas'] > a['consultas']:
+            problemas.append(f"consultas {a['consultas']} -> {b['consultas']}")
+        elif b['consultas'] < a['consultas']:
+            mejoras.append(f"consultas {a['consultas']} -> {b['consultas']}")
+        # La latencia se juzga por la mediana; el p99 con pocas repeticiones es casi el máximo y muy ruidoso
+        cambio = _variacion(a['p50_ms'], b['p50_ms'])
+        texto = (f"p50 {a['p50_ms']:.2f} -> {b['p50_ms']:.2f} ms ({cambio:+.0%}), "
+                 f"p99 {a['p99_ms']:.2f} -> {b['p99_ms']:.2f} ms")
+        if cambio > tolerancia and b['p50_ms'] - a['p50_ms'] > minimo_ms:
+            problemas.append(texto)
+        elif cambio < -tolerancia and a['p50_ms'] - b['p50_ms'] > minimo_ms:
+            mejoras.append(texto)
+        cambio = _variacion(a['memoria_pico_kb'], b['memoria_pico_kb'])
+        texto = f"memoria {a['memoria_pico_kb']:.0f} -> {b['memoria_pico_kb']:.0f} KB ({cambio:+.0%})"
+        if cambio > tolerancia and b['memoria_pico_kb'] - a['memoria_pico_kb'] > minimo_kb:
+            problemas.append(texto)
+        elif cambio < -tolerancia and a['memoria_pico_kb'] - b['memoria_pico_kb'] > minimo_kb:
+            mejoras.append(texto)
+        if b['errores'] > a['errores']:
+            problemas.append(f"errores {a['errores']} -> {b['errores']}")
+
+        if problemas:
+            filas.append((nombre, 'regresion', '; '.join(problemas)))
+        elif mejoras:
+            filas.append((nombre, 'mejora', '; '.join(mejoras)))
+        else:
+            filas.append((nombre, 'igual', ''))
+    return filas
+
+
+def comparar(args):
+    informes = []
+    for ruta in (args.base, args.nuevo):
+        with open(ruta, encoding='utf-8') as archivo:
+            informes.append(json.load(archivo))
+    base, nuevo = informes
+    if base['datos'] != nuevo['datos']:
+        print(f"Aviso: los datasets difieren ({base['datos']} frente a {nuevo['datos']})")
+
+    filas = comparar_informes(base, nuevo, args.tolerancia, args.minimo_ms, args.minimo_kb)
+    for nombre, estado, detalle in filas:
+        if estado != 'igual' or args.todos:
+            print(f'{estado.upper():<10} {nombre}' + (f': {detalle}' if detalle else ''))
+    regresiones = sum(estado == 'regresion' for _, estado, _ in filas)
+    print(f'{regresiones} regresiones en {len(filas)} casos '
+          f"({base.get('etiqueta') or args.base} -> {nuevo.get('etiqueta') or args.nuevo})")
+    return 1 if regresiones else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    parser_ejecutar = subparsers.add_parser('ejecutar', help='Genera los datos, mide todos los casos y guarda un JSON')
+    parser_ejecutar.add_argument('--ninjas', type=int, default=10000)
+    parser_ejecutar.add_argument('--misiones', type=int, default=2000)
+    parser_ejecutar.add_argument('--asignaciones', type=int, default=50000)
+    parser_ejecutar.add_argument('--semilla', type=int, default=7)
+    parser_ejecutar.add_argument('--sin-generar', action='store_true',
+                                 help='Usa los datos que ya hay en DATABASE_URL (las escrituras los modifican)')
+    parser_ejecutar.add_argument('--repeticiones', type=int, default=20)
+    parser_ejecutar.add_argument('--filtro', help='Solo los casos cuyo nombre contiene este texto')
+    parser_ejecutar.add_argument('--con-cache', action='store_true', help='Mantiene la caché de lectura configurada')
+    parser_ejecutar.add_argument('--etiqueta', help='Nombre de la ejecución (p. ej. rama o commit)')
+    parser_ejecutar.add_argument('--salida', default='resultados_rendimiento.json')
+
+    parser_comparar = subparsers.add_parser('comparar', help='Compara dos JSON y sale con 1 si hay regresiones')
+    parser_comparar.add_argument('base')
+    parser_comparar.add_argument('nuevo')
+    parser_comparar.add_argument('--tolerancia', type=float, default=0.25,
+                                 help='Aumento relativo de latencia (p50) o memoria tolerado (0.25 = 25%%)')
+    parser_comparar.add_argument('--minimo-ms', type=float, default=0.5,
+                                 help='Diferencia absoluta mínima de latencia para marcar un cambio')
+    parser_comparar.add_argument('--minimo-kb', type=float, default=64,
+                                 help='Diferencia absoluta mínima de memoria para marcar un cambio')
+    parser_comparar.add_argument('--todos', action='store_true', help='Muestra también los casos sin cambios')
+
+    args = parser.parse_args()
+    sys.exit(ejecutar(args) if args.comando == 'ejecutar' else comparar(args))
+
+
+if __name__ == '__main__':
+    main()
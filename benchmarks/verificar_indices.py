@@ -0,0 +1,74 @@
+"""
+Verifica con EXPLAIN que los filtros de /api/asignaciones usan los índices de
+asignaciones_misiones en lugar de recorrer la tabla completa. Termina con
+código 1 si alguna consulta cae en un seq scan.
+
+En PostgreSQL se desactiva enable_seqscan para comprobar que el índice es
+utilizable aunque la tabla de prueba sea pequeña.
+
+Uso:
+    python benchmarks/verificar_indices.py
+    DATABASE_URL=postgresql://... python benchmarks/verificar_indices.py
+"""
+import sys
+
+import comun  # noqa: F401  (ajusta sys.path)
+
+from sqlalchemy import text
+
+from app import AplicacionNaruto
+from models import db
+
+FILTROS = [
+    {'ninja_id': 1},
+    {'ninja_id': 1, 'completada': 'false'},
+    {'mision_id': 1},
+    {'completada': 'true'},
+    {'completada': 'false', 'desde': '2024-01-01', 'hasta': '2024-12-31'},
+    {'desde': '2024-01-01'},
+]
+
+TABLA = 'asignaciones_misiones'
+
+
+def plan(sql):
+    """Líneas del plan de ejecución de la consulta"""
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+        return [fila[0] for fila in db.session.execute(text('EXPLAIN ' + sql))]
+    return [fila[-1] for fila in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+def usa_indice(lineas):
+    """True si la tabla de asignaciones se lee con uno de sus índices secundarios"""
+    if db.engine.dialect.name == 'postgresql':
+        return (
+            not any(f'Seq Scan on {TABLA}' in linea for linea in lineas)
+            and any('ix_asignaciones_' in linea for linea in lineas)
+        )
+    return any(linea.startswith(f'SEARCH {TABLA}') and 'ix_asignaciones_' in linea for linea in lineas)
+
+
+def main():
+    aplicacion = AplicacionNaruto()
+    aplicacion.inicializar_esquema()
+    controller = aplicacion.asignacion_controller
+    fallos = 0
+
+    with aplicacion.app.app_context():
+        for filtros in FILTROS:
+            consulta, _ = controller.listado.consulta(filtros=controller._filtros(**filtros))
+            sql = str(consulta.compile(db.engine, compile_kwargs={'literal_binds': True}))
+            lineas = plan(sql)
+            correcto = usa_indice(lineas)
+            fallos += not correcto
+            print(f"{'OK   ' if correcto else 'FALLO'} {filtros}")
+            if not correcto:
+                print('\n'.join('      ' + linea for linea in lineas))
+            db.session.rollback()
+
+    sys.exit(1 if fallos else 0)
+
+
+if __name__ == '__main__':
+    main()
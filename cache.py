@@ -0,0 +1,128 @@
+"""
+Caché de lectura para consultas y reportes.
+
+CacheLectura envuelve un backend intercambiable:
+- CacheMemoria: LRU con TTL dentro del proceso
+- CacheRedis: cualquier cliente compatible con Redis (get/set)
+- SinCache: no guarda nada (caché desactivada)
+
+No hay invalidación: las claves incluyen la versión de las tablas de las que
+dependen, así que tras una escritura las entradas anteriores dejan de pedirse
+y salen por TTL (o por LRU en memoria).
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class BackendCache:
+    """Interfaz de los backends de caché"""
+
+    def obtener(self, clave):
+        """Devuelve el valor guardado o None"""
+        raise NotImplementedError
+
+    def guardar(self, clave, valor, ttl):
+        """Guarda un valor durante ttl segundos"""
+        raise NotImplementedError
+
+
+class SinCache(BackendCache):
+    """Backend que no guarda nada"""
+
+    def obtener(self, clave):
+        return None
+
+    def guardar(self, clave, valor, ttl):
+        pass
+
+
+class CacheMemoria(BackendCache):
+    """LRU con expiración por TTL, local al proceso"""
+
+    def __init__(self, maximo=1024):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+
+class CacheRedis(BackendCache):
+    """Backend sobre un cliente compatible con Redis; los valores se guardan como JSON"""
+
+    def __init__(self, cliente, prefijo='naruto:'):
+        self.cliente = cliente
+        self.prefijo = prefijo
+
+    @classmethod
+    def desde_url(cls, url, prefijo='naruto:'):
+        """Crea el backend con redis-py, que solo se necesita si se usa este backend"""
+        import redis
+        return cls(redis.Redis.from_url(url), prefijo)
+
+    def obtener(self, clave):
+        valor = self.cliente.get(self.prefijo + clave)
+        return json.loads(valor) if valor is not None else None
+
+    def guardar(self, clave, valor, ttl):
+        self.cliente.set(self.prefijo + clave, json.dumps(valor), ex=max(1, int(ttl)))
+
+
+class CacheLectura:
+    """Caché read-through con contadores de aciertos y fallos"""
+
+    def __init__(self, backend=None, ttl=60):
+        self.backend = backend if backend is not None else SinCache()
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, cargar):
+        """Devuelve el valor en caché o lo carga con cargar() y lo guarda si tuvo éxito"""
+        valor = self.backend.obtener(clave)
+        if valor is not None:
+            self._contar(acierto=True)
+            return valor
+
+        self._contar(acierto=False)
+        valor = cargar()
+        if valor.get('success'):
+            self.backend.guardar(clave, valor, self.ttl)
+        return valor
+
+    def _contar(self, acierto):
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def estadisticas(self):
+        """Contadores de uso de la caché"""
+        total = self.aciertos + self.fallos
+        return {
+            'backend': type(self.backend).__name__,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': round(self.aciertos / total * 100, 2) if total else 0
+        }
@@ -0,0 +1,255 @@
+"""
+Despacho automático de misiones: asignación de recompensa máxima respetando
+rangos, límites de carga por ninja y las parejas que ya existen.
+
+El puntaje de una pareja es aditivo:
+
+    puntaje(ninja, mision) = PESO_RECOMPENSA * recompensa + PESO_PODER * (ataque + defensa + chakra)
+
+y un ninja de nivel L puede tomar cualquier misión de nivel <= L, salvo las
+que ya tiene asignadas (excluidas). Con pesos aditivos el problema es una
+intersección de dos matroides transversales: el conjunto de misiones
+cubribles y el de cupos de ninja cubribles. Por el teorema de
+Mendelsohn-Dulmage, si un conjunto de misiones S y un conjunto de cupos T son
+cubribles por separado existe un emparejamiento que cubre ambos, así que el
+óptimo se obtiene eligiendo S y T de forma voraz (cada uno es una base de
+peso máximo de su matroide) y uniendo después los dos emparejamientos. El
+voraz solo es óptimo con pesos no negativos.
+
+Cada elemento del voraz se acepta si hay un camino de aumento desde él
+(_BaseVoraz). Los vecinos se recorren por nivel en lugar de por arista, y los
+vértices de una búsqueda fallida quedan descartados para siempre: su región
+está saturada y ningún camino posterior puede salir de ella. Sin exclusiones
+casi todos los aumentos son directos y el costo es cercano a
+O((N + M) log(N + M)); las exclusiones solo alargan algunos caminos.
+
+Cada misión recibe como mucho un ninja por despacho.
+"""
+from collections import deque, namedtuple
+
+
+NinjaDisponible = namedtuple('NinjaDisponible', ['id', 'nivel', 'poder', 'cupos'])
+MisionAbierta = namedtuple('MisionAbierta', ['id', 'nivel', 'recompensa'])
+
+
+class _BaseVoraz:
+    """Base de peso máximo de un matroide transversal con vecindades por nivel
+
+    izquierda y derecha son listas de (nivel, grupo); los vértices de la izquierda se
+    agregan en orden de peso decreciente. Un vértice de la izquierda de nivel L puede
+    tomar cualquiera de la derecha cuyo nivel esté en compatibles(L) (en orden de
+    preferencia), salvo que (grupo izquierdo, grupo derecho) esté en excluidas.
+    """
+
+    def __init__(self, izquierda, derecha, compatibles, excluidas):
+        self.izquierda = izquierda
+        self.derecha = derecha
+        self.excluidas = excluidas
+        self.compatibles = {}
+        for nivel, _ in izquierda:
+            if nivel not in self.compatibles:
+                self.compatibles[nivel] = compatibles(nivel)
+        self.pareja_izquierda = {}
+        self.pareja_derecha = {}
+        # Libres por nivel (pila) y ocupados por (nivel, nivel de su pareja), sin los descartados
+        self.libres = {}
+        for indice in reversed(range(len(derecha))):
+            self.libres.setdefault(derecha[indice][0], []).append(indice)
+        self.ocupados = {}
+        self._posiciones = {}
+
+    def _permitida(self, izquierdo, derecho):
+        return (self.izquierda[izquierdo][1], self.derecha[derecho][1]) not in self.excluidas
+
+    def _libre(self, izquierdo):
+        """(nivel, posición) del primer libre permitido para izquierdo, o None"""
+        for nivel in self.compatibles[self.izquierda[izquierdo][0]]:
+            pila = self.libres.get(nivel)
+            for posicion in range(len(pila or ()) - 1, -1, -1):
+                if self._permitida(izquierdo, pila[posicion]):
+                    return nivel, posicion
+        return None
+
+    def _quitar_ocupado(self, derecho):
+        # Listas densas con borrado por intercambio: recorrer un set con muchos borrados es lento
+        lista = self.ocupados[(self.derecha[derecho][0], self.izquierda[self.pareja_derecha[derecho]][0])]
+        posicion = self._posiciones.pop(derecho)
+        ultimo = lista.pop()
+        if ultimo != derecho:
+            lista[posicion] = ultimo
+            self._posiciones[ultimo] = posicion
+
+    def _ocupar(self, izquierdo, derecho):
+        if derecho in self._posiciones:
+            self._quitar_ocupado(derecho)
+        lista = self.ocupados.setdefault((self.derecha[derecho][0], self.izquierda[izquierdo][0]), [])
+        self._posiciones[derecho] = len(lista)
+        lista.append(derecho)
+        self.pareja_derecha[derecho] = izquierdo
+        self.pareja_izquierda[izquierdo] = derecho
+
+    def _aumentar(self, izquierdo, libre, padres):
+        """Aplica el camino que termina en izquierdo -> libre, subiendo por padres"""
+        nivel, posicion = libre
+        pila = self.libres[nivel]
+        derecho = pila[posicion]
+        pila[posicion] = pila[-1]
+        pila.pop()
+        while izquierdo is not None:
+            siguiente = self.pareja_izquierda.get(izquierdo)
+            self._ocupar(izquierdo, derecho)
+            derecho = siguiente
+            izquierdo = padres[izquierdo]
+
+    def agregar(self, izquierdo):
+        """Agrega izquierdo si mantiene la independencia; devuelve si se agregó"""
+        libre = self._libre(izquierdo)
+        if libre is not None:
+            self._aumentar(izquierdo, libre, {izquierdo: None})
+            return True
+
+        # Búsqueda en anchura por caminos alternantes; cada nivel de la derecha se recorre
+        # una sola vez por búsqueda y después solo sus sobrantes (los excluidos del que lo recorrió)
+        padres = {izquierdo: None}
+        sobrantes = {}
+        visitados = []
+        cola = deque([izquierdo])
+        while cola:
+            actual = cola.popleft()
+            for nivel in self.compatibles[self.izquierda[actual][0]]:
+                if nivel in sobrantes:
+                    candidatos, sobrantes[nivel] = sobrantes[nivel], []
+                else:
+                    sobrantes[nivel] = []
+                    # Perezoso: casi siempre aparece un aumento antes de terminar el nivel
+                    candidatos = (
+                        derecho
+                        for nivel_pareja in sorted(k for n, k in self.ocupados if n == nivel)
+                        for derecho in self.ocupados[(nivel, nivel_pareja)]
+                    )
+                for derecho in candidatos:
+                    if not self._permitida(actual, derecho):
+                        sobrantes[nivel].append(derecho)
+                        continue
+                    visitados.append(derecho)
+                    pareja = self.pareja_derecha[derecho]
+                    if pareja in padres:
+                        continue
+                    padres[pareja] = actual
+                    libre = self._libre(pareja)
+                    if libre is not None:
+                        self._aumentar(pareja, libre, padres)
+                        return True
+                    cola.append(pareja)
+
+        # Región saturada: sus vértices de la derecha no vuelven a servir para aumentar
+        for derecho in visitados:
+            if derecho in self._posiciones:
+                self._quitar_ocupado(derecho)
+        return False
+
+
+class DespachadorMisiones:
+    """Calcula el emparejamiento ninja-misión de puntaje máximo"""
+
+    PESO_PODER = 1.0
+    PESO_RECOMPENSA = 1.0
+
+    def __init__(self, niveles, peso_poder=None, peso_recompensa=None):
+        # niveles: valores de jerarquía posibles, p. ej. [1, 2, 3]
+        self.niveles = sorted(set(niveles))
+        self.peso_poder = self.PESO_PODER if peso_poder is None else peso_poder
+        self.peso_recompensa = self.PESO_RECOMPENSA if peso_recompensa is None else peso_recompensa
+        for nombre, peso in (('peso_poder', self.peso_poder), ('peso_recompensa', self.peso_recompensa)):
+            if isinstance(peso, bool) or not isinstance(peso, (int, float)) or not peso >= 0:
+                raise ValueError(f'{nombre} debe ser un número mayor o igual que 0')
+
+    def despachar(self, ninjas, misiones, excluidas=()):
+        """Devuelve la lista de parejas (ninja, mision) de puntaje total máximo
+
+        excluidas: pares (ninja.id, mision.id) que no pueden formarse, p. ej. los ya asignados.
+        """
+        ninjas = sorted((n for n in ninjas if n.cupos > 0 and n.nivel in self.niveles), key=lambda n: (-n.poder, n.id))
+        misiones = sorted((m for m in misiones if m.nivel in self.niveles), key=lambda m: (-m.recompensa, m.id))
+        excluidas = set(excluidas)
+        # Un cupo por cada misión que el ninja puede tomar en este despacho
+        cupos = [ninja for ninja in ninjas for _ in range(ninja.cupos)]
+
+        # Base de misiones: cada misión prefiere el cupo del nivel más bajo que le sirve
+        base_misiones = _BaseVoraz(
+            [(m.nivel, m.id) for m in misiones], [(c.nivel, c.id) for c in cupos],
+            lambda nivel: [k for k in self.niveles if k >= nivel],
+            {(mision_id, ninja_id) for ninja_id, mision_id in excluidas}
+        )
+        for indice in range(len(misiones)):
+            base_misiones.agregar(indice)
+        # Base de cupos: cada cupo prefiere la misión del nivel más alto que puede tomar
+        base_cupos = _BaseVoraz(
+            [(c.nivel, c.id) for c in cupos], [(m.nivel, m.id) for m in misiones],
+            lambda nivel: [k for k in reversed(self.niveles) if k <= nivel],
+            excluidas
+        )
+        for indice in range(len(cupos)):
+            base_cupos.agregar(indice)
+
+        parejas = self._unir(base_misiones.pareja_izquierda, base_cupos.pareja_izquierda)
+        return sorted(
+            ((cupos[cupo], misiones[mision]) for mision, cupo in parejas.items()),
+            key=lambda pareja: (-pareja[1].recompensa, pareja[1].id)
+        )
+
+    @staticmethod
+    def _unir(por_mision, por_cupo):
+        """Emparejamiento {misión: cupo} que cubre las misiones de por_mision y los cupos de por_cupo
+
+        Construcción de Mendelsohn-Dulmage: la unión de ambos emparejamientos se parte en
+        caminos y ciclos alternantes; en cada componente se conservan las aristas de uno
+        de los dos de modo que no quede sin cubrir ningún vértice elegido.
+        """
+        # Vecino de cada vértice por la arista del primer (1) o del segundo (2) emparejamiento
+        vecinos = {}
+        for mision, cupo in por_mision.items():
+            vecinos[('mision', mision, 1)] = ('cupo', cupo)
+            vecinos[('cupo', cupo, 1)] = ('mision', mision)
+        for cupo, mision in por_cupo.items():
+            vecinos[('cupo', cupo, 2)] = ('mision', mision)
+            vecinos[('mision', mision, 2)] = ('cupo', cupo)
+        vertices = list(dict.fromkeys((lado, indice) for lado, indice, _ in vecinos))
+        # Extremos de camino: vértices con arista en un solo emparejamiento
+        extremos = {
+            vertice: 1 if (*vertice, 1) in vecinos else 2
+            for vertice in vertices if ((*vertice, 1) in vecinos) != ((*vertice, 2) in vecinos)
+        }
+
+        resultado = {}
+        vistos = set()
+        # Primero los caminos desde uno de sus extremos, después los ciclos (el orden no cambia el resultado)
+        for inicio in [*extremos, *vertices]:
+            if inicio in vistos:
+                continue
+            origen = extremos.get(inicio, 1)
+            aristas = []
+            actual = inicio
+            while True:
+                vistos.add(actual)
+                vecino = vecinos.get((*actual, origen))
+                if vecino is None:
+                    break
+                mision, cupo = (actual[1], vecino[1]) if actual[0] == 'mision' else (vecino[1], actual[1])
+                aristas.append((origen, mision, cupo))
+                actual, origen = vecino, 3 - origen
+                if actual == inicio:
+                    break
+            if inicio not in extremos:
+                conservar = 1
+            elif aristas[0][0] == aristas[-1][0]:
+                conservar = aristas[0][0]
+            else:
+                # Extremos del mismo lado: el que solo tiene la arista del otro emparejamiento no fue elegido
+                conservar = 1 if inicio[0] == 'mision' else 2
+            resultado.update((mision, cupo) for origen, mision, cupo in aristas if origen == conservar)
+        return resultado
+
+    def puntaje(self, ninja, mision):
+        """Puntaje de una pareja"""
+        return self.peso_recompensa * mision.recompensa + self.peso_poder * ninja.poder
@@ -0,0 +1,302 @@
+"""
+Eventos de cambio para clientes conectados por Server-Sent Events.
+
+Los controladores publican, después de cada commit, eventos compactos:
+
+    {"entidad": "ninja", "operacion": "actualizado", "id": 7, "campos": {"defensa": 80}}
+
+entidad es ninja, mision o asignacion; operacion es creado, actualizado,
+eliminado o recargar (demasiados cambios a la vez o eventos perdidos: el
+cliente vuelve a pedir el listado). En creado, campos trae el registro
+completo; en actualizado, solo lo que cambió.
+
+Backends:
+- BusEventos: pub/sub dentro del proceso. Con varios workers, cada cliente
+  solo recibe los cambios hechos en el worker al que está conectado.
+- BusPostgres: los eventos viajan por LISTEN/NOTIFY, así todos los workers
+  (y todas las instancias) reciben los de todos.
+
+Cada evento lleva un id "<instancia>-<n>" que el navegador reenvía en
+Last-Event-ID al reconectar; si ese id es de este proceso y sigue en el
+historial se reenvía lo que falta, y si no se envía un recargar.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+import uuid
+from collections import deque
+
+logger = logging.getLogger('naruto.eventos')
+
+MIMETYPE_SSE = 'text/event-stream'
+
+CREADO = 'creado'
+ACTUALIZADO = 'actualizado'
+ELIMINADO = 'eliminado'
+RECARGAR = 'recargar'
+
+
+def evento(entidad, operacion, id=None, campos=None):
+    """Diccionario de un evento de cambio"""
+    datos = {'entidad': entidad, 'operacion': operacion, 'id': id}
+    if campos:
+        datos['campos'] = campos
+    return datos
+
+
+class Suscripcion:
+    """Cola de eventos de un cliente conectado"""
+
+    def __init__(self, bus, maximo):
+        self.bus = bus
+        self.cola = queue.Queue(maximo)
+        self.desbordada = False
+
+    def entregar(self, evento_id, datos):
+        try:
+            self.cola.put_nowait((evento_id, datos))
+        except queue.Full:
+            # Cliente demasiado lento: se descarta lo pendiente y se le pide recargar
+            self.desbordada = True
+
+    def sse(self, latido=15, duracion_maxima=None, reintento_ms=3000):
+        """Genera el flujo text/event-stream; termina al pasar duracion_maxima o al cerrarse el cliente"""
+        fin = time.monotonic() + duracion_maxima if duracion_maxima else None
+        try:
+            yield f'retry: {reintento_ms}\n\n'
+            while fin is None or time.monotonic() < fin:
+                if self.desbordada:
+                    self.desbordada = False
+                    while not self.cola.empty():
+                        self.cola.get_nowait()
+                    yield self.bus.formatear(None, evento(None, RECARGAR))
+                    continue
+                espera = latido if fin is None else max(0.0, min(latido, fin - time.monotonic()))
+                try:
+                    evento_id, datos = self.cola.get(timeout=espera)
+                except queue.Empty:
+                    # El comentario mantiene viva la conexión y detecta clientes que ya se fueron
+                    yield ': latido\n\n'
+                    continue
+                yield self.bus.formatear(evento_id, datos)
+        finally:
+            self.bus.desuscribir(self)
+
+
+class BusEventos:
+    """Pub/sub en el proceso con historial corto para reenviar eventos al reconectar"""
+
+    # Con más filas que esto en una operación masiva se publica un único recargar
+    LIMITE_DETALLE = 500
+
+    def __init__(self, historial=1000, maximo_cola=1000, maximo_suscriptores=None):
+        self.instancia = uuid.uuid4().hex[:8]
+        self.maximo_cola = maximo_cola
+        self.maximo_suscriptores = maximo_suscriptores
+        self._historial = deque(maxlen=historial)
+        self._suscriptores = set()
+        self._siguiente = 1
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self):
+        """Si vale la pena construir eventos: hay alguien que pueda recibirlos"""
+        return bool(self._suscriptores)
+
+    def publicar(self, *eventos):
+        self._entregar(eventos)
+
+    def _entregar(self, eventos):
+        with self._lock:
+            for datos in eventos:
+                evento_id = f'{self.instancia}-{self._siguiente}'
+                self._siguiente += 1
+                self._historial.append((evento_id, datos))
+                for suscripcion in self._suscriptores:
+                    suscripcion.entregar(evento_id, datos)
+
+    def suscribir(self, ultimo_id=None):
+        """Nueva suscripción, o None si se alcanzó el máximo de conexiones
+
+        Con ultimo_id (Last-Event-ID) se encolan primero los eventos posteriores del
+        historial, o un recargar si ya no están.
+        """
+        suscripcion = Suscripcion(self, self.maximo_cola)
+        with self._lock:
+            if self.maximo_suscriptores is not None and len(self._suscriptores) >= self.maximo_suscriptores:
+                return None
+            if ultimo_id:
+                pendientes = self._posteriores(ultimo_id)
+                if pendientes is None:
+                    suscripcion.entregar(None, evento(None, RECARGAR))
+                else:
+                    for evento_id, datos in pendientes:
+                        suscripcion.entregar(evento_id, datos)
+            self._suscriptores.add(suscripcion)
+        return suscripcion
+
+    def _posteriores(self, ultimo_id):
+        instancia, _, numero = ultimo_id.partition('-')
+        if instancia != self.instancia or not numero.isdigit():
+            return None
+        numero = int(numero)
+        if numero >= self._siguiente:
+            return None
+        if self._historial and int(self._historial[0][0].partition('-')[2]) > numero + 1:
+            return None
+        return [(evento_id, datos) for evento_id, datos in self._historial
+                if int(evento_id.partition('-')[2]) > numero]
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            self._suscriptores.discard(suscripcion)
+
+    def recargar_todos(self):
+        """Pide a todos los clientes conectados que vuelvan a cargar (se pudieron perder eventos)"""
+        self._entregar([evento(None, RECARGAR)])
+
+    def formatear(self, evento_id, datos):
+        """Un mensaje SSE; los eventos sin id (recargar) no cambian el Last-Event-ID del cliente"""
+        lineas = f'id: {evento_id}\n' if evento_id else ''
+        return f'{lineas}data: {json.dumps(datos, separators=(",", ":"), ensure_ascii=False)}\n\n'
+
+    @property
+    def conexiones(self):
+        return len(self._suscriptores)
+
+
+class SinEventos(BusEventos):
+    """No publica nada (eventos desactivados)"""
+
+    @property
+    def activo(self):
+        return False
+
+    def publicar(self, *eventos):
+        pass
+
+
+class BusPostgres(BusEventos):
+    """Fan-out entre procesos con LISTEN/NOTIFY de PostgreSQL
+
+    publicar envía NOTIFY por una conexión en autocommit (después del commit del
+    cambio, igual que el bus en memoria) y un hilo por proceso escucha el canal y
+    entrega a los suscriptores locales, también los eventos de este mismo proceso.
+    """
+
+    CANAL = 'naruto_eventos'
+    # NOTIFY admite hasta 8000 bytes por mensaje
+    MAXIMO_BYTES = 7500
+
+    def __init__(self, url, **opciones):
+        super().__init__(**opciones)
+        self.url = url
+        self._engine = None
+        self._escuchando = False
+        # Una sola conexión en autocommit para todos los NOTIFY del proceso
+        self._conexion_publicar = None
+        self._lock_publicar = threading.Lock()
+
+    @property
+    def activo(self):
+        # Puede haber suscriptores en otros procesos
+        return True
+
+    def _obtener_engine(self):
+        with self._lock:
+            if self._engine is None:
+                from sqlalchemy import create_engine
+                from sqlalchemy.pool import NullPool
+                self._engine = create_engine(self.url, poolclass=NullPool, isolation_level='AUTOCOMMIT')
+            return self._engine
+
+    def publicar(self, *eventos):
+        """NOTIFY por la conexión compartida; si se cortó, se reabre y se reintenta una vez
+
+        Reenviar un lote ya enviado en parte es inofensivo: el cliente aplica los eventos por id.
+        """
+        from sqlalchemy import func, select
+        mensajes = list(self._mensajes(eventos))
+        with self._lock_publicar:
+            for intento in range(2):
+                try:
+                    if self._conexion_publicar is None:
+                        self._conexion_publicar = self._obtener_engine().connect()
+                    for mensaje in mensajes:
+                        self._conexion_publicar.execute(select(func.pg_notify(self.CANAL, mensaje)))
+                    return
+                except Exception:
+                    self._cerrar_publicacion()
+                    if intento:
+                        logger.exception('No se pudieron publicar %d eventos', len(eventos))
+
+    def _cerrar_publicacion(self):
+        conexion, self._conexion_publicar = self._conexion_publicar, None
+        if conexion is not None:
+            try:
+                conexion.close()
+            except Exception:
+                pass
+
+    def _mensajes(self, eventos):
+        """Agrupa los eventos en arreglos JSON que quepan en un NOTIFY"""
+        actual, tamano = [], 2
+        for datos in eventos:
+            codificado = json.dumps(datos, separators=(',', ':'), ensure_ascii=False)
+            largo = len(codificado.encode('utf-8')) + 1
+            if actual and tamano + largo > self.MAXIMO_BYTES:
+                yield '[' + ','.join(actual) + ']'
+                actual, tamano = [], 2
+            if largo + 2 > self.MAXIMO_BYTES:
+                # Un evento demasiado grande viaja como recargar de su entidad
+                codificado = json.dumps(evento(datos.get('entidad'), RECARGAR), separators=(',', ':'))
+                largo = len(codificado) + 1
+            actual.append(codificado)
+            tamano += largo
+        if actual:
+            yield '[' + ','.join(actual) + ']'
+
+    def suscribir(self, ultimo_id=None):
+        self._iniciar_escucha()
+        return super().suscribir(ultimo_id)
+
+    def _iniciar_escucha(self):
+        with self._lock:
+            if self._escuchando:
+                return
+            self._escuchando = True
+        threading.Thread(target=self._escuchar, name='eventos-postgres', daemon=True).start()
+
+    def _escuchar(self):
+        espera = 1
+        reconexion = False
+        while True:
+            try:
+                conexion = self._obtener_engine().raw_connection()
+                try:
+                    cursor = conexion.cursor()
+                    cursor.execute(f'LISTEN {self.CANAL}')
+                    espera = 1
+                    if reconexion:
+                        # Lo publicado mientras no se escuchaba se perdió
+                        self.recargar_todos()
+                    reconexion = True
+                    self._recibir(conexion.driver_connection)
+                finally:
+                    conexion.close()
+            except Exception:
+                logger.exception('Escucha de eventos interrumpida; reintento en %d s', espera)
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
+
+    def _recibir(self, conexion):
+        while True:
+            if select.select([conexion], [], [], 30) == ([], [], []):
+                continue
+            conexion.poll()
+            while conexion.notifies:
+                notificacion = conexion.notifies.pop(0)
+                self._entregar(json.loads(notificacion.payload))
@@ -0,0 +1,188 @@
+"""
+Exportación columnar de ninjas, misiones y asignaciones para análisis fuera de línea.
+
+Cada tabla se lee con un cursor del servidor (yield_per) en bloques de filas;
+cada bloque se pasa a columnas y se escribe antes de leer el siguiente, así la
+memoria no depende del tamaño de la tabla. Formatos:
+
+- parquet: un grupo de filas por bloque (requiere pyarrow)
+- arrow: formato de flujo IPC de Arrow, un lote por bloque (requiere pyarrow)
+- csv: CSV comprimido con gzip, sin dependencias; analitica.py lo carga con NumPy
+
+La misma secuencia de fragmentos sirve para la ruta GET /api/exportar/<tabla>
+(se envía a medida que se genera) y para python mantenimiento.py exportar
+(se escribe en un archivo).
+"""
+import csv
+import io
+import os
+import zlib
+from datetime import datetime
+
+from sqlalchemy import select
+
+from models import db, Ninja, Mision, AsignacionMision
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow es opcional: sin él solo se exporta a csv
+    pyarrow = None
+
+TABLAS = {
+    'ninjas': Ninja.__table__,
+    'misiones': Mision.__table__,
+    'asignaciones_misiones': AsignacionMision.__table__,
+}
+
+EXTENSIONES = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv.gz'}
+MIMETYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'csv': 'application/gzip',
+}
+
+TAMANO_BLOQUE = 50000
+
+
+def formatos_disponibles():
+    return list(EXTENSIONES) if pyarrow is not None else ['csv']
+
+
+def formato_por_defecto():
+    return 'parquet' if pyarrow is not None else 'csv'
+
+
+class _Salida(io.RawIOBase):
+    """Archivo de solo escritura que acumula lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+class ExportacionColumnar:
+    """Exportación de una tabla completa en bloques de columnas"""
+
+    def __init__(self, tabla, formato=None, columnas=None, tamano_bloque=TAMANO_BLOQUE):
+        """columnas: nombres a exportar, en ese orden; por defecto todas las de la tabla"""
+        if tabla not in TABLAS:
+            raise ValueError(f'Tabla desconocida: {tabla}; disponibles: {list(TABLAS)}')
+        disponibles = TABLAS[tabla].columns
+        desconocidas = [nombre for nombre in columnas or () if nombre not in disponibles]
+        if desconocidas:
+            raise ValueError(f'Columnas desconocidas: {desconocidas}; disponibles: {list(disponibles.keys())}')
+        formato = formato or formato_por_defecto()
+        if formato not in formatos_disponibles():
+            raise ValueError(f'Formato no disponible: {formato}; disponibles: {formatos_disponibles()}')
+        if tamano_bloque < 1:
+            raise ValueError('tamano_bloque debe ser mayor que 0')
+        self.tabla = tabla
+        self.formato = formato
+        self.tamano_bloque = tamano_bloque
+        self.columnas = [disponibles[nombre] for nombre in columnas] if columnas else list(disponibles)
+        self.filas = 0
+
+    @property
+    def nombre_archivo(self):
+        return self.tabla + EXTENSIONES[self.formato]
+
+    @property
+    def mimetype(self):
+        return MIMETYPES[self.formato]
+
+    def bloques(self):
+        """{columna: [valores]} por bloque, ordenados por id, desde un cursor del servidor"""
+        tabla = TABLAS[self.tabla]
+        consulta = (
+            select(*self.columnas).order_by(*tabla.primary_key.columns)
+            .execution_options(yield_per=self.tamano_bloque)
+        )
+        resultado = db.session.execute(consulta)
+        nombres = list(resultado.keys())
+        for filas in resultado.partitions():
+            self.filas += len(filas)
+            yield dict(zip(nombres, map(list, zip(*filas))))
+
+    def fragmentos(self):
+        """Bytes del archivo exportado, un fragmento por bloque"""
+        self.filas = 0
+        if self.formato == 'csv':
+            return self._fragmentos_csv()
+        return self._fragmentos_arrow()
+
+    def guardar(self, directorio):
+        """Escribe el archivo en el directorio (reemplazándolo al terminar) y devuelve su ruta"""
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, self.nombre_archivo)
+        temporal = ruta + '.tmp'
+        with open(temporal, 'wb') as archivo:
+            for fragmento in self.fragmentos():
+                archivo.write(fragmento)
+        os.replace(temporal, ruta)
+        return ruta
+
+    def _esquema(self):
+        tipos = {int: pyarrow.int64(), bool: pyarrow.bool_(), datetime: pyarrow.timestamp('us')}
+        return pyarrow.schema([
+            (columna.name, tipos.get(columna.type.python_type, pyarrow.string()))
+            for columna in self.columnas
+        ])
+
+    def _fragmentos_arrow(self):
+        esquema = self._esquema()
+        salida = _Salida()
+        if self.formato == 'parquet':
+            escritor = pyarrow.parquet.ParquetWriter(salida, esquema, compression='zstd')
+        else:
+            escritor = pyarrow.ipc.new_stream(salida, esquema)
+        for bloque in self.bloques():
+            escritor.write_table(pyarrow.Table.from_pydict(bloque, esquema))
+            yield salida.vaciar()
+        escritor.close()
+        yield salida.vaciar()
+
+    def _fragmentos_csv(self):
+        # wbits=31: flujo deflate con cabecera y cola gzip
+        compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        texto = io.StringIO()
+        escritor = csv.writer(texto, lineterminator='\n')
+        escritor.writerow([columna.name for columna in self.columnas])
+        convertir = [self._conversor_csv(columna.type.python_type) for columna in self.columnas]
+        for bloque in self.bloques():
+            valores = [
+                list(map(conversor, bloque[columna.name])) for conversor, columna in zip(convertir, self.columnas)
+            ]
+            escritor.writerows(zip(*valores))
+            yield compresor.compress(texto.getvalue().encode('utf-8'))
+            texto.seek(0)
+            texto.truncate()
+        yield compresor.compress(texto.getvalue().encode('utf-8')) + compresor.flush()
+
+    @staticmethod
+    def _conversor_csv(tipo):
+        """Los nulos quedan vacíos, los booleanos como 0/1 y las fechas en ISO 8601"""
+        if tipo is bool:
+            return lambda valor: '' if valor is None else int(valor)
+        if tipo is datetime:
+            return lambda valor: '' if valor is None else valor.isoformat()
+        return lambda valor: valor
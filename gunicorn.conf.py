@@ -0,0 +1,20 @@
+"""
+Configuración de gunicorn para wsgi:app; cada valor se puede cambiar por entorno.
+
+Cada worker tiene su propio pool de conexiones (DB_POOL_SIZE + DB_MAX_OVERFLOW),
+así que WEB_WORKERS * (DB_POOL_SIZE + DB_MAX_OVERFLOW) debe caber en el
+max_connections de PostgreSQL.
+
+Cada conexión a /api/eventos (SSE) ocupa uno de los WEB_THREADS hilos del
+worker mientras dura; la app admite por defecto la mitad de ellos
+(EVENTOS_MAXIMO_CONEXIONES) para que el resto atienda la API.
+"""
+import os
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_WORKERS', '4'))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '4'))
+timeout = int(os.getenv('WEB_TIMEOUT', '60'))
+keepalive = int(os.getenv('WEB_KEEPALIVE', '5'))
+accesslog = os.getenv('WEB_ACCESSLOG', '-') or None
@@ -0,0 +1,284 @@
+"""
+Instrumentación de peticiones y consultas.
+
+Instrumentacion se engancha a los eventos de cursor de SQLAlchemy y al ciclo
+de vida de las peticiones de Flask. Por petición mide:
+
+- número de consultas y tiempo total en la base de datos
+- tiempo de serialización JSON (ProveedorJSON / jsonify)
+- tamaño de la respuesta y duración total (en streaming, hasta el último byte)
+
+Las mediciones se acumulan en histogramas por ruta que se exponen en formato
+de texto de Prometheus (RegistroMetricas.exportar). Las peticiones que superan
+los umbrales de tiempo o de consultas se registran en el log junto con su SQL,
+y la cabecera X-Query-Count deja ver regresiones N+1 desde los tests.
+
+La medición en curso vive en una variable de contexto: las consultas que
+BucleAsync ejecuta en su hilo también se atribuyen a la petición que las envía.
+Las métricas son por proceso; con varios workers cada uno expone las suyas.
+"""
+import contextvars
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('naruto.peticiones')
+
+# Límites de los buckets de cada histograma
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Sentencias SQL que se conservan por petición para el log de peticiones lentas
+MAXIMO_SENTENCIAS = 50
+LARGO_SENTENCIA = 500
+
+_medicion_actual = contextvars.ContextVar('medicion_actual', default=None)
+
+
+class MedicionPeticion:
+    """Acumuladores de una petición"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.segundos_db = 0.0
+        self.segundos_serializacion = 0.0
+        self.bytes = 0
+        self.sentencias = []
+        self.ruta = None
+        self.metodo = None
+        self.estado = None
+        self.continua = False  # flujos de eventos: abiertos a propósito, no cuentan como lentos
+        self._serializando = False
+
+    def registrar_consulta(self, sentencia, segundos):
+        self.consultas += 1
+        self.segundos_db += segundos
+        if len(self.sentencias) < MAXIMO_SENTENCIAS:
+            self.sentencias.append((segundos, ' '.join(sentencia.split())[:LARGO_SENTENCIA]))
+
+
+class Histograma:
+    """Histograma acumulativo al estilo Prometheus"""
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                break
+        else:
+            i = len(self.limites)
+        self.conteos[i] += 1
+        self.suma += valor
+        self.total += 1
+
+
+def _etiquetas(etiquetas):
+    partes = (
+        '{}="{}"'.format(nombre, str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for nombre, valor in etiquetas
+    )
+    return '{' + ','.join(partes) + '}'
+
+
+class RegistroMetricas:
+    """Contadores e histogramas etiquetados, exportables en formato de texto de Prometheus"""
+
+    def __init__(self):
+        self._metricas = {}  # nombre -> (tipo, ayuda, limites, {etiquetas: valor})
+        self._lock = threading.Lock()
+
+    def histograma(self, nombre, ayuda, limites):
+        self._metricas[nombre] = ('histogram', ayuda, limites, {})
+
+    def contador(self, nombre, ayuda):
+        self._metricas[nombre] = ('counter', ayuda, None, {})
+
+    def observar(self, nombre, etiquetas, valor):
+        _, _, limites, series = self._metricas[nombre]
+        with self._lock:
+            serie = series.get(etiquetas)
+            if serie is None:
+                serie = series[etiquetas] = Histograma(limites)
+            serie.observar(valor)
+
+    def incrementar(self, nombre, etiquetas, cantidad=1):
+        series = self._metricas[nombre][3]
+        with self._lock:
+            series[etiquetas] = series.get(etiquetas, 0) + cantidad
+
+    def exportar(self):
+        """Texto en formato de exposición de Prometheus 0.0.4"""
+        lineas = []
+        with self._lock:
+            for nombre, (tipo, ayuda, limites, series) in self._metricas.items():
+                lineas.append(f'# HELP {nombre} {ayuda}')
+                lineas.append(f'# TYPE {nombre} {tipo}')
+                for etiquetas, serie in sorted(series.items()):
+                    if tipo == 'counter':
+                        lineas.append(f'{nombre}{_etiquetas(etiquetas)} {serie}')
+                        continue
+                    acumulado = 0
+                    for limite, conteo in zip(limites + ('+Inf',), serie.conteos):
+                        acumulado += conteo
+                        lineas.append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", limite),))} {acumulado}')
+                    lineas.append(f'{nombre}_sum{_etiquetas(etiquetas)} {serie.suma!r}')
+                    lineas.append(f'{nombre}_count{_etiquetas(etiquetas)} {serie.total}')
+        return '\n'.join(lineas) + '\n'
+
+
+def _antes_de_consulta(conn, cursor, sentencia, parametros, contexto, executemany):
+    # El inicio se guarda en el contexto de ejecución: muere con él aunque la consulta falle
+    if contexto is not None and _medicion_actual.get() is not None:
+        contexto.inicio_consulta = time.perf_counter()
+
+
+def _despues_de_consulta(conn, cursor, sentencia, parametros, contexto, executemany):
+    _registrar_consulta(contexto, sentencia)
+
+
+def _error_de_consulta(excepcion):
+    """Las consultas que fallan también cuentan, con el tiempo hasta el error"""
+    _registrar_consulta(excepcion.execution_context, excepcion.statement)
+
+
+def _registrar_consulta(contexto, sentencia):
+    medicion = _medicion_actual.get()
+    inicio = getattr(contexto, 'inicio_consulta', None)
+    if medicion is not None and inicio is not None:
+        del contexto.inicio_consulta
+        medicion.registrar_consulta(sentencia, time.perf_counter() - inicio)
+
+
+_eventos_registrados = False
+_lock_eventos = threading.Lock()
+
+
+def _registrar_eventos_engine():
+    """Escucha los cursores de todos los engines (también el síncrono interno de los asíncronos), una vez por proceso"""
+    global _eventos_registrados
+    with _lock_eventos:
+        if not _eventos_registrados:
+            event.listen(Engine, 'before_cursor_execute', _antes_de_consulta)
+            event.listen(Engine, 'after_cursor_execute', _despues_de_consulta)
+            event.listen(Engine, 'handle_error', _error_de_consulta)
+            _eventos_registrados = True
+
+
+class Instrumentacion:
+    """Métricas por ruta, log de peticiones lentas y cabecera de depuración con el número de consultas"""
+
+    CABECERA_CONSULTAS = 'X-Query-Count'
+    CABECERA_DB = 'X-DB-Time-Ms'
+
+    def __init__(self, umbral_lento_ms=500, umbral_consultas=50, cabecera=None):
+        """cabecera: True o False fuerza las cabeceras de depuración; None las envía solo con app.debug o app.testing"""
+        self.umbral_lento_ms = umbral_lento_ms
+        self.umbral_consultas = umbral_consultas
+        self.cabecera = cabecera
+        self.metricas = RegistroMetricas()
+        self.metricas.contador('naruto_peticiones_total', 'Peticiones atendidas')
+        self.metricas.histograma('naruto_peticion_segundos', 'Duración de la petición', BUCKETS_SEGUNDOS)
+        self.metricas.histograma('naruto_peticion_consultas', 'Consultas SQL por petición', BUCKETS_CONSULTAS)
+        self.metricas.histograma('naruto_peticion_db_segundos', 'Tiempo en la base de datos por petición',
+                                 BUCKETS_SEGUNDOS)
+        self.metricas.histograma('naruto_peticion_serializacion_segundos', 'Tiempo de codificación JSON por petición',
+                                 BUCKETS_SEGUNDOS)
+        self.metricas.histograma('naruto_respuesta_bytes', 'Tamaño del cuerpo de la respuesta', BUCKETS_BYTES)
+
+    def init_app(self, app):
+        _registrar_eventos_engine()
+        app.json.dumps = self._medir_serializacion(app.json.dumps)
+        app.json.response = self._medir_serializacion(app.json.response)
+        app.before_request(self._iniciar)
+        app.after_request(self._responder)
+        app.teardown_request(self._finalizar)
+
+    @staticmethod
+    def _medir_serializacion(funcion):
+        """Suma al tiempo de serialización de la petición, sin contar dos veces las llamadas anidadas"""
+        @wraps(funcion)
+        def medida(*args, **kwargs):
+            medicion = _medicion_actual.get()
+            if medicion is None or medicion._serializando:
+                return funcion(*args, **kwargs)
+            medicion._serializando = True
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                medicion.segundos_serializacion += time.perf_counter() - inicio
+                medicion._serializando = False
+        return medida
+
+    def _iniciar(self):
+        _medicion_actual.set(MedicionPeticion())
+
+    def _responder(self, respuesta):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return respuesta
+        medicion.ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'
+        medicion.metodo = request.method
+        medicion.estado = respuesta.status_code
+        medicion.continua = respuesta.mimetype == 'text/event-stream'
+        if respuesta.is_streamed:
+            # El cuerpo se genera después: se cuenta a medida que sale
+            respuesta.response = self._contar_bytes(respuesta.response, medicion)
+        else:
+            medicion.bytes = respuesta.calculate_content_length() or 0
+        if self.cabecera or (self.cabecera is None and (current_app.debug or current_app.testing)):
+            # En streaming solo incluye las consultas hechas antes de empezar a enviar
+            respuesta.headers[self.CABECERA_CONSULTAS] = str(medicion.consultas)
+            respuesta.headers[self.CABECERA_DB] = f'{medicion.segundos_db * 1000:.1f}'
+        return respuesta
+
+    @staticmethod
+    def _contar_bytes(cuerpo, medicion):
+        try:
+            for fragmento in cuerpo:
+                medicion.bytes += len(fragmento)
+                yield fragmento
+        finally:
+            # Cerrar el generador original libera el contexto de la petición (stream_with_context)
+            if hasattr(cuerpo, 'close'):
+                cuerpo.close()
+
+    def _finalizar(self, excepcion=None):
+        """Se ejecuta al cerrar el contexto de la petición (en streaming, al terminar el generador)"""
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return
+        _medicion_actual.set(None)
+        segundos = time.perf_counter() - medicion.inicio
+        ruta = medicion.ruta or (request.url_rule.rule if request.url_rule else 'sin_ruta')
+        metodo = medicion.metodo or request.method
+        estado = medicion.estado or 500
+        etiquetas = (('metodo', metodo), ('ruta', ruta))
+
+        self.metricas.incrementar('naruto_peticiones_total', etiquetas + (('estado', estado),))
+        self.metricas.observar('naruto_peticion_segundos', etiquetas, segundos)
+        self.metricas.observar('naruto_peticion_consultas', etiquetas, medicion.consultas)
+        self.metricas.observar('naruto_peticion_db_segundos', etiquetas, medicion.segundos_db)
+        self.metricas.observar('naruto_peticion_serializacion_segundos', etiquetas, medicion.segundos_serializacion)
+        self.metricas.observar('naruto_respuesta_bytes', etiquetas, medicion.bytes)
+
+        lenta = segundos * 1000 >= self.umbral_lento_ms and not medicion.continua
+        if lenta or medicion.consultas >= self.umbral_consultas:
+            logger.warning(
+                'Petición lenta %s %s -> %s: %.1f ms, %d consultas (%.1f ms en BD), %.1f ms serializando, %d bytes\n%s',
+                metodo, request.full_path.rstrip('?'), estado, segundos * 1000, medicion.consultas,
+                medicion.segundos_db * 1000, medicion.segundos_serializacion * 1000, medicion.bytes,
+                '\n'.join(f'  [{s * 1000:.1f} ms] {sql}' for s, sql in medicion.sentencias)
+            )
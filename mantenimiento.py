@@ -0,0 +1,123 @@
+"""
+Tareas de mantenimiento sobre la base de datos.
+
+Uso:
+    python mantenimiento.py verificar-estadisticas    # compara el resumen por ninja y los cupos de misiones con las asignaciones
+    python mantenimiento.py reconstruir-estadisticas  # recalcula el resumen por ninja y los cupos desde cero
+    python mantenimiento.py limpiar-tareas            # elimina resultados de tareas vencidos y tareas abandonadas
+    python mantenimiento.py exportar --directorio exportacion [--formato parquet|arrow|csv]
+                                                      # ninjas, misiones y asignaciones en formato columnar
+    python mantenimiento.py estadisticas [--directorio exportacion] [--salida estadisticas.json]
+                                                      # estadísticas por aldea y rango (de la exportación o de la base)
+"""
+import argparse
+import json
+import sys
+import time
+
+
+def verificar_estadisticas():
+    """Lista los ninjas y misiones cuyos contadores no coinciden con las asignaciones; sale con 1 si hay alguno"""
+    from app import CuposAsignacion, EstadisticasNinjas
+
+    diferencias = EstadisticasNinjas.verificar()
+    for diferencia in diferencias:
+        print(f"Ninja {diferencia['ninja_id']}: {diferencia['diferencias']}")
+    print(f'{len(diferencias)} ninjas con diferencias')
+
+    cupos = CuposAsignacion.verificar()
+    for cupo in cupos:
+        print(f"Misión {cupo['mision_id']}: contador {cupo['contador']}, "
+              f"asignaciones {cupo['real']}, capacidad {cupo['capacidad']}")
+    print(f'{len(cupos)} misiones con diferencias de cupo')
+    return 1 if diferencias or cupos else 0
+
+
+def reconstruir_estadisticas():
+    """Recalcula el resumen por ninja y los contadores de cupo en una sola transacción"""
+    from app import CuposAsignacion, EstadisticasNinjas
+    from models import db
+
+    EstadisticasNinjas.reconstruir()
+    CuposAsignacion.reconstruir()
+    db.session.commit()
+    print('Resumen por ninja y cupos de misiones reconstruidos')
+    return 0
+
+
+def limpiar_tareas():
+    """Elimina las tareas vencidas y marca como error las que quedaron a medias"""
+    from flask import current_app
+
+    resumen = current_app.extensions['tareas'].limpiar()
+    print(f"{resumen['eliminadas']} tareas vencidas eliminadas, {resumen['abandonadas']} marcadas como abandonadas")
+    return 0
+
+
+def exportar(directorio, formato=None, tablas=None, tamano_bloque=None):
+    """Exporta las tablas en formato columnar, una por archivo, leyendo por bloques"""
+    from exportacion import TABLAS, ExportacionColumnar
+
+    opciones = {'tamano_bloque': tamano_bloque} if tamano_bloque else {}
+    for tabla in tablas or TABLAS:
+        inicio = time.perf_counter()
+        exportacion = ExportacionColumnar(tabla, formato, **opciones)
+        ruta = exportacion.guardar(directorio)
+        print(f'{ruta}: {exportacion.filas} filas en {time.perf_counter() - inicio:.1f} s')
+    return 0
+
+
+def estadisticas(directorio=None, salida=None):
+    """Estadísticas por aldea, rango de ninja y rango de misión, calculadas con NumPy"""
+    import analitica
+
+    inicio = time.perf_counter()
+    columnas = analitica.cargar_archivos(directorio) if directorio else analitica.cargar_base()
+    resultado = analitica.calcular(columnas)
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if salida:
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+        print(f'Estadísticas en {salida} ({time.perf_counter() - inicio:.2f} s)')
+    else:
+        print(texto)
+    return 0
+
+
+COMANDOS = {
+    'verificar-estadisticas': verificar_estadisticas,
+    'reconstruir-estadisticas': reconstruir_estadisticas,
+    'limpiar-tareas': limpiar_tareas,
+    'exportar': exportar,
+    'estadisticas': estadisticas,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('comando', choices=list(COMANDOS))
+    parser.add_argument('--directorio', help='exportar: destino; estadisticas: exportación a leer (por defecto la base)')
+    parser.add_argument('--formato', help='exportar: parquet, arrow o csv (por defecto parquet si pyarrow está instalado)')
+    parser.add_argument('--tablas', nargs='+', help='exportar: solo estas tablas')
+    parser.add_argument('--tamano-bloque', type=int, help='exportar: filas por bloque leído de la base')
+    parser.add_argument('--salida', help='estadisticas: archivo JSON de salida (por defecto la salida estándar)')
+    args = parser.parse_args()
+    if args.comando == 'exportar' and not args.directorio:
+        parser.error('exportar necesita --directorio')
+
+    # Cada comando recibe solo las opciones que declara
+    opciones = {
+        'exportar': {'directorio': args.directorio, 'formato': args.formato,
+                     'tablas': args.tablas, 'tamano_bloque': args.tamano_bloque},
+        'estadisticas': {'directorio': args.directorio, 'salida': args.salida},
+    }.get(args.comando, {})
+
+    from app import AplicacionNaruto
+
+    aplicacion = AplicacionNaruto()
+    with aplicacion.app.app_context():
+        sys.exit(COMANDOS[args.comando](**opciones))
+
+
+if __name__ == '__main__':
+    main()
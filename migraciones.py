@@ -0,0 +1,137 @@
+"""
+Migraciones de datos e índices sobre una base de datos existente.
+
+Antes de aplicarlas se crean las tablas que falten (db.create_all), que no
+modifica las existentes ni rellena datos; los procesos del servidor no lo
+hacen al arrancar. Cada migración se aplica una sola vez y queda registrada
+en la tabla migraciones.
+
+Uso:
+    python migraciones.py           # aplica las migraciones pendientes
+    python migraciones.py --listar  # muestra el estado de cada migración
+"""
+import argparse
+
+from sqlalchemy import and_, delete, exists, func, inspect, or_, select, text
+from sqlalchemy.orm import aliased
+
+from models import db, Ninja, AsignacionMision, Migracion
+
+
+def migrar_jutsus_normalizados():
+    """Rellena ninjas_jutsus a partir de la columna de texto jutsus"""
+    from app import IndiceJutsus, OperacionLote
+
+    pendientes = {}
+    filas = db.session.execute(
+        select(Ninja.id, Ninja.jutsus).execution_options(yield_per=OperacionLote.TAMANO_LOTE)
+    )
+    for ninja_id, jutsus in filas:
+        pendientes[ninja_id] = jutsus
+        if len(pendientes) >= OperacionLote.TAMANO_LOTE:
+            IndiceJutsus.sincronizar(pendientes)
+            pendientes = {}
+    IndiceJutsus.sincronizar(pendientes)
+
+
+def crear_indices_asignaciones():
+    """Crea los índices compuestos de asignaciones_misiones si no existen"""
+    for indice in AsignacionMision.__table__.indexes:
+        # El índice único necesita los datos sin duplicados: lo crea 0004
+        if not indice.unique:
+            indice.create(db.session.connection(), checkfirst=True)
+
+
+def construir_estadisticas_ninjas():
+    """Calcula el resumen por ninja a partir de las asignaciones existentes"""
+    from app import EstadisticasNinjas
+
+    EstadisticasNinjas.reconstruir()
+
+
+def cupos_asignaciones():
+    """Columnas de cupo de misiones, asignaciones duplicadas fuera e índice único (ninja, misión)"""
+    from app import CuposAsignacion, EstadisticasNinjas
+
+    conexion = db.session.connection()
+    columnas = {columna['name'] for columna in inspect(conexion).get_columns('misiones')}
+    if 'capacidad' not in columnas:
+        conexion.execute(text('ALTER TABLE misiones ADD COLUMN capacidad INTEGER'))
+    if 'ninjas_asignados' not in columnas:
+        conexion.execute(text('ALTER TABLE misiones ADD COLUMN ninjas_asignados INTEGER NOT NULL DEFAULT 0'))
+
+    # De cada pareja repetida se conserva la completada o, si no hay, la de menor id. El orden es
+    # total también con completada NULL (NULL = NULL no es verdadero): sin eso quedarían
+    # duplicados y el índice único de abajo fallaría
+    otra = aliased(AsignacionMision)
+    db.session.execute(
+        delete(AsignacionMision).where(exists().where(
+            otra.ninja_id == AsignacionMision.ninja_id,
+            otra.mision_id == AsignacionMision.mision_id,
+            otra.id != AsignacionMision.id,
+            or_(
+                and_(otra.completada.is_(True), AsignacionMision.completada.is_not(True)),
+                and_(
+                    func.coalesce(otra.completada, False) == func.coalesce(AsignacionMision.completada, False),
+                    otra.id < AsignacionMision.id
+                )
+            )
+        ))
+    )
+    EstadisticasNinjas.reconstruir()
+
+    for indice in AsignacionMision.__table__.indexes:
+        if indice.unique:
+            indice.create(conexion, checkfirst=True)
+    CuposAsignacion.reconstruir()
+
+
+MIGRACIONES = [
+    ('0001_jutsus_normalizados', migrar_jutsus_normalizados),
+    ('0002_indices_asignaciones', crear_indices_asignaciones),
+    ('0003_estadisticas_ninjas', construir_estadisticas_ninjas),
+    ('0004_cupos_asignaciones', cupos_asignaciones),
+]
+
+
+def aplicadas():
+    """Nombres de las migraciones ya registradas"""
+    return set(db.session.execute(select(Migracion.nombre)).scalars())
+
+
+def aplicar_pendientes(salida=print):
+    """Aplica en orden las migraciones pendientes, cada una en su propia transacción"""
+    ya_aplicadas = aplicadas()
+    for nombre, migracion in MIGRACIONES:
+        if nombre in ya_aplicadas:
+            continue
+        salida(f'Aplicando {nombre}...')
+        try:
+            migracion()
+            db.session.add(Migracion(nombre=nombre))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--listar', action='store_true', help='Solo muestra el estado de las migraciones')
+    args = parser.parse_args()
+
+    from app import AplicacionNaruto
+
+    aplicacion = AplicacionNaruto()
+    aplicacion.inicializar_esquema()
+    with aplicacion.app.app_context():
+        if args.listar:
+            ya_aplicadas = aplicadas()
+            for nombre, _ in MIGRACIONES:
+                print(f"{'[x]' if nombre in ya_aplicadas else '[ ]'} {nombre}")
+        else:
+            aplicar_pendientes()
+
+
+if __name__ == '__main__':
+    main()
@@ -19,6 +19,12 @@ class Ninja(db.Model):
     # Relación con asignaciones
     asignaciones = db.relationship('AsignacionMision', back_populates='ninja', cascade='all, delete-orphan')
     
+    # Índice normalizado de jutsus (se mantiene a partir de la columna jutsus)
+    jutsus_indice = db.relationship('NinjaJutsu', cascade='all, delete-orphan')
+    
+    # Resumen de misiones mantenido incrementalmente
+    estadistica = db.relationship('EstadisticaNinja', uselist=False, cascade='all, delete-orphan')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -45,6 +51,9 @@ class Mision(db.Model):
     recompensa = db.Column(db.Integer, default=0)
     descripcion = db.Column(db.Text, default='')
     fecha_creacion = db.Column(db.DateTime, default=datetime.now)
+    capacidad = db.Column(db.Integer, nullable=True)  # máximo de ninjas asignados; None = sin límite
+    # Ninjas asignados, mantenido al asignar para comprobar el cupo con un UPDATE condicional
+    ninjas_asignados = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relación con asignaciones
     asignaciones = db.relationship('AsignacionMision', back_populates='mision', cascade='all, delete-orphan')
@@ -56,7 +65,8 @@ class Mision(db.Model):
             'rango': self.rango,
             'recompensa': self.recompensa,
             'descripcion': self.descripcion,
-            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            'capacidad': self.capacidad
         }
     
     def __repr__(self):
@@ -77,6 +87,14 @@ class AsignacionMision(db.Model):
     ninja = db.relationship('Ninja', back_populates='asignaciones')
     mision = db.relationship('Mision', back_populates='asignaciones')
     
+    __table_args__ = (
+        db.Index('ix_asignaciones_ninja_completada', 'ninja_id', 'completada'),
+        db.Index('ix_asignaciones_mision', 'mision_id'),
+        db.Index('ix_asignaciones_completada_fecha', 'completada', 'fecha_asignacion'),
+        # Un ninja no puede tener dos veces la misma misión (destino de INSERT ... ON CONFLICT)
+        db.Index('ix_asignaciones_ninja_mision', 'ninja_id', 'mision_id', unique=True),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -90,4 +108,111 @@ class AsignacionMision(db.Model):
         }
     
     def __repr__(self):
-        return f'<AsignacionMision {self.ninja.nombre} -> {self.mision.nombre}>'
\ No newline at end of file
+        return f'<AsignacionMision {self.ninja.nombre} -> {self.mision.nombre}>'
+
+class Jutsu(db.Model):
+    __tablename__ = 'jutsus'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    clave = db.Column(db.String(100), nullable=False, unique=True, index=True)  # nombre en minúsculas
+    
+    def __repr__(self):
+        return f'<Jutsu {self.nombre}>'
+
+
+class NinjaJutsu(db.Model):
+    __tablename__ = 'ninjas_jutsus'
+    
+    ninja_id = db.Column(db.Integer, db.ForeignKey('ninjas.id', ondelete='CASCADE'), primary_key=True)
+    jutsu_id = db.Column(db.Integer, db.ForeignKey('jutsus.id'), primary_key=True)
+    
+    # Búsqueda por jutsu: jutsu_id -> ninja_id sin tocar la tabla de ninjas
+    __table_args__ = (db.Index('ix_ninjas_jutsus_jutsu_ninja', 'jutsu_id', 'ninja_id'),)
+    
+    def __repr__(self):
+        return f'<NinjaJutsu {self.ninja_id} -> {self.jutsu_id}>'
+
+
+class EstadisticaNinja(db.Model):
+    __tablename__ = 'estadisticas_ninjas'
+    
+    ninja_id = db.Column(db.Integer, db.ForeignKey('ninjas.id', ondelete='CASCADE'), primary_key=True)
+    misiones_asignadas = db.Column(db.Integer, nullable=False, default=0)
+    misiones_completadas = db.Column(db.Integer, nullable=False, default=0)
+    recompensa_total = db.Column(db.BigInteger, nullable=False, default=0)
+    ultima_completada = db.Column(db.DateTime, nullable=True)
+    
+    # Ranking por ORDER BY ... LIMIT sin ordenar toda la tabla
+    __table_args__ = (
+        db.Index('ix_estadisticas_completadas', 'misiones_completadas'),
+        db.Index('ix_estadisticas_recompensa', 'recompensa_total'),
+        db.Index('ix_estadisticas_asignadas', 'misiones_asignadas'),
+    )
+    
+    def to_dict(self):
+        return {
+            'ninja_id': self.ninja_id,
+            'misiones_asignadas': self.misiones_asignadas,
+            'misiones_completadas': self.misiones_completadas,
+            'recompensa_total': self.recompensa_total,
+            'ultima_completada': self.ultima_completada.isoformat() if self.ultima_completada else None
+        }
+    
+    def __repr__(self):
+        return f'<EstadisticaNinja {self.ninja_id}: {self.misiones_completadas}/{self.misiones_asignadas}>'
+
+
+class Migracion(db.Model):
+    __tablename__ = 'migraciones'
+    
+    nombre = db.Column(db.String(100), primary_key=True)
+    fecha_aplicacion = db.Column(db.DateTime, default=datetime.now)
+    
+    def __repr__(self):
+        return f'<Migracion {self.nombre}>'
+
+
+class VersionTabla(db.Model):
+    __tablename__ = 'versiones_tablas'
+    
+    tabla = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    actualizado = db.Column(db.DateTime, nullable=False)  # UTC, usado para Last-Modified
+    
+    def __repr__(self):
+        return f'<VersionTabla {self.tabla} v{self.version}>'
+
+
+class Tarea(db.Model):
+    __tablename__ = 'tareas'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex: no se puede adivinar el de otra tarea
+    tipo = db.Column(db.String(50), nullable=False)
+    estado = db.Column(db.String(20), nullable=False)  # pendiente, ejecutando, completada, error
+    error = db.Column(db.Text, nullable=True)
+    resultado = db.Column(db.Text, nullable=True)  # JSON ya codificado
+    fecha_creacion = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    fecha_inicio = db.Column(db.DateTime, nullable=True)
+    fecha_fin = db.Column(db.DateTime, nullable=True)
+    expira = db.Column(db.DateTime, nullable=True)  # a partir de aquí la limpieza la elimina
+    
+    __table_args__ = (
+        db.Index('ix_tareas_expira', 'expira'),
+        db.Index('ix_tareas_tipo_estado', 'tipo', 'estado'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'error': self.error,
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            'fecha_inicio': self.fecha_inicio.isoformat() if self.fecha_inicio else None,
+            'fecha_fin': self.fecha_fin.isoformat() if self.fecha_fin else None,
+            'expira': self.expira.isoformat() if self.expira else None
+        }
+    
+    def __repr__(self):
+        return f'<Tarea {self.tipo} {self.id} - {self.estado}>'
@@ -3,6 +3,124 @@
 // ===================================
 const API_URL = '/api';
 
+// ===================================
+// PETICIONES CONDICIONALES (ETag)
+// ===================================
+
+// Última respuesta por URL para reenviar su ETag y reutilizarla ante un 304
+const cacheRespuestas = new Map();
+
+async function obtenerJSON(url) {
+    const guardada = cacheRespuestas.get(url);
+    const headers = guardada ? { 'If-None-Match': guardada.etag } : {};
+    const response = await fetch(url, { headers });
+
+    if (response.status === 304 && guardada) {
+        return guardada.datos;
+    }
+
+    const datos = await response.json();
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        cacheRespuestas.set(url, { etag, datos });
+    }
+    return datos;
+}
+
+// ===================================
+// ESTADO LOCAL Y EVENTOS (SSE)
+// ===================================
+
+// Listados ya descargados; los eventos del servidor los mantienen al día sin volver a pedirlos
+const estado = { ninjas: null, misiones: null, asignaciones: null };
+const LISTAS = { ninja: 'ninjas', mision: 'misiones', asignacion: 'asignaciones' };
+let eventosConectados = false;
+let aperturasEventos = 0;
+let ultimoEventoId = null;
+
+async function obtenerLista(clave) {
+    if (!estado[clave] || !eventosConectados) {
+        estado[clave] = await obtenerJSON(`${API_URL}/${clave}`);
+    }
+    return estado[clave];
+}
+
+function conectarEventos() {
+    if (!window.EventSource) return;
+    const fuente = new EventSource(`${API_URL}/eventos`);
+
+    fuente.onopen = () => {
+        // Sin ningún id recibido el navegador no puede pedir lo que faltó: se recarga
+        if (aperturasEventos > 0 && !ultimoEventoId) invalidarListas();
+        aperturasEventos++;
+        eventosConectados = true;
+    };
+    fuente.onmessage = (e) => {
+        if (e.lastEventId) ultimoEventoId = e.lastEventId;
+        aplicarEvento(JSON.parse(e.data));
+    };
+    fuente.onerror = () => {
+        // Mientras no hay conexión cada escritura vuelve a pedir su listado
+        eventosConectados = false;
+        if (fuente.readyState === EventSource.CLOSED) {
+            setTimeout(conectarEventos, 30000);
+        }
+    };
+}
+
+function invalidarListas(clave) {
+    (clave ? [clave] : Object.keys(estado)).forEach(c => estado[c] = null);
+    refrescarVista();
+}
+
+function aplicarEvento(ev) {
+    const clave = LISTAS[ev.entidad];
+    if (ev.operacion === 'recargar') {
+        invalidarListas(clave);
+        return;
+    }
+    const lista = estado[clave];
+
+    if (ev.operacion === 'eliminado') {
+        if (lista) estado[clave] = lista.filter(item => item.id !== ev.id);
+        // Las asignaciones del ninja o de la misión se borran en cascada
+        if (estado.asignaciones && ev.entidad !== 'asignacion') {
+            const campo = `${ev.entidad}_id`;
+            estado.asignaciones = estado.asignaciones.filter(a => a[campo] !== ev.id);
+        }
+    } else if (lista) {
+        const existente = lista.find(item => item.id === ev.id);
+        if (existente) {
+            Object.assign(existente, ev.campos);
+        } else if (ev.operacion === 'creado') {
+            lista.push(ev.campos);
+            lista.sort((a, b) => a.id - b.id);
+        }
+        if (ev.entidad === 'ninja' && ev.campos.nombre && estado.asignaciones) {
+            estado.asignaciones
+                .filter(a => a.ninja_id === ev.id)
+                .forEach(a => a.ninja_nombre = ev.campos.nombre);
+        }
+    }
+    refrescarVista();
+}
+
+// Las escrituras propias se aplican con la respuesta del servidor: su evento puede
+// publicarse en otro worker y no llegar a esta conexión. Si llega, aplicarlo de nuevo no cambia nada.
+function aplicarRespuesta(entidad, operacion, datos) {
+    aplicarEvento({ entidad, operacion, id: datos.id, campos: datos });
+}
+
+function refrescarVista() {
+    const activa = (id) => document.getElementById(id)?.classList.contains('active');
+    if (activa('ninjas')) cargarNinjas();
+    if (activa('misiones')) cargarMisiones();
+    if (activa('asignaciones')) {
+        cargarAsignaciones();
+        cargarSelectores();
+    }
+}
+
 // ===================================
 // PATRÓN VISITOR PARA EXPORTACIÓN
 // ===================================
@@ -186,14 +304,11 @@ class XMLExportVisitor extends ExportVisitor {
 async function exportarDatos(formato) {
     try {
         // Obtener datos de ninjas y misiones
-        const [ninjasRes, misionesRes] = await Promise.all([
-            fetch(`${API_URL}/ninjas`),
-            fetch(`${API_URL}/misiones`)
+        const [ninjas, misiones] = await Promise.all([
+            obtenerJSON(`${API_URL}/ninjas`),
+            obtenerJSON(`${API_URL}/misiones`)
         ]);
         
-        const ninjas = await ninjasRes.json();
-        const misiones = await misionesRes.json();
-        
         // Crear visitor según el formato
         let visitor;
         let filename;
@@ -298,8 +413,7 @@ function mostrarAlerta(containerId, mensaje, tipo) {
 
 async function cargarNinjas() {
     try {
-        const response = await fetch(`${API_URL}/ninjas`);
-        const ninjas = await response.json();
+        const ninjas = await obtenerLista('ninjas');
         
         const container = document.getElementById('lista-ninjas');
         container.innerHTML = ninjas.map(ninja => `
@@ -344,7 +458,7 @@ document.getElementById('form-ninja').addEventListener('submit', async (e) => {
         if (response.ok) {
             mostrarAlerta('alert-ninjas', '¡Ninja registrado correctamente!', 'success');
             e.target.reset();
-            cargarNinjas();
+            aplicarRespuesta('ninja', 'creado', await response.json());
         } else {
             const error = await response.json();
             mostrarAlerta('alert-ninjas', error.error || 'Error al registrar', 'error');
@@ -361,7 +475,7 @@ async function eliminarNinja(id) {
         const response = await fetch(`${API_URL}/ninjas/${id}`, { method: 'DELETE' });
         if (response.ok) {
             mostrarAlerta('alert-ninjas', 'Ninja eliminado', 'success');
-            cargarNinjas();
+            aplicarRespuesta('ninja', 'eliminado', { id });
         }
     } catch (error) {
         mostrarAlerta('alert-ninjas', 'Error al eliminar', 'error');
@@ -374,8 +488,7 @@ async function eliminarNinja(id) {
 
 async function cargarMisiones() {
     try {
-        const response = await fetch(`${API_URL}/misiones`);
-        const misiones = await response.json();
+        const misiones = await obtenerLista('misiones');
         
         const container = document.getElementById('lista-misiones');
         container.innerHTML = misiones.map(mision => `
@@ -412,7 +525,7 @@ document.getElementById('form-mision').addEventListener('submit', async (e) => {
         if (response.ok) {
             mostrarAlerta('alert-misiones', '¡Misión registrada correctamente!', 'success');
             e.target.reset();
-            cargarMisiones();
+            aplicarRespuesta('mision', 'creado', await response.json());
         } else {
             const error = await response.json();
             mostrarAlerta('alert-misiones', error.error || 'Error al registrar', 'error');
@@ -429,7 +542,7 @@ async function eliminarMision(id) {
         const response = await fetch(`${API_URL}/misiones/${id}`, { method: 'DELETE' });
         if (response.ok) {
             mostrarAlerta('alert-misiones', 'Misión eliminada', 'success');
-            cargarMisiones();
+            aplicarRespuesta('mision', 'eliminado', { id });
         }
     } catch (error) {
         mostrarAlerta('alert-misiones', 'Error al eliminar', 'error');
@@ -442,14 +555,11 @@ async function eliminarMision(id) {
 
 async function cargarSelectores() {
     try {
-        const [ninjasRes, misionesRes] = await Promise.all([
-            fetch(`${API_URL}/ninjas`),
-            fetch(`${API_URL}/misiones`)
+        const [ninjas, misiones] = await Promise.all([
+            obtenerLista('ninjas'),
+            obtenerLista('misiones')
         ]);
 
-        const ninjas = await ninjasRes.json();
-        const misiones = await misionesRes.json();
-
         document.getElementById('asig-ninja').innerHTML = ninjas.map(n => 
             `<option value="${n.id}">${n.nombre} (${n.rango})</option>`
         ).join('');
@@ -479,7 +589,7 @@ document.getElementById('form-asignacion').addEventListener('submit', async (e)
 
         if (response.ok) {
             mostrarAlerta('alert-asignaciones', '¡Misión asignada correctamente!', 'success');
-            cargarAsignaciones();
+            aplicarRespuesta('asignacion', 'creado', await response.json());
         } else {
             const error = await response.json();
             mostrarAlerta('alert-asignaciones', error.error || 'Error al asignar', 'error');
@@ -491,8 +601,7 @@ document.getElementById('form-asignacion').addEventListener('submit', async (e)
 
 async function cargarAsignaciones() {
     try {
-        const response = await fetch(`${API_URL}/asignaciones`);
-        const asignaciones = await response.json();
+        const asignaciones = await obtenerLista('asignaciones');
         
         const container = document.getElementById('lista-asignaciones');
         container.innerHTML = asignaciones.map(asig => `
@@ -516,7 +625,7 @@ async function completarMision(id) {
 
         if (response.ok) {
             mostrarAlerta('alert-asignaciones', '¡Misión completada!', 'success');
-            cargarAsignaciones();
+            aplicarRespuesta('asignacion', 'actualizado', await response.json());
         }
     } catch (error) {
         mostrarAlerta('alert-asignaciones', 'Error al completar', 'error');
@@ -529,8 +638,7 @@ async function completarMision(id) {
 
 async function cargarReporteNinjas() {
     try {
-        const response = await fetch(`${API_URL}/reportes/ninjas`);
-        const reporte = await response.json();
+        const reporte = await obtenerJSON(`${API_URL}/reportes/ninjas`);
         
         const container = document.getElementById('reporte-container');
         container.innerHTML = '<h3>Reporte de Ninjas</h3>' + reporte.map(item => `
@@ -554,8 +662,7 @@ async function cargarReporteNinjas() {
 
 async function cargarReporteMisiones() {
     try {
-        const response = await fetch(`${API_URL}/reportes/misiones`);
-        const reporte = await response.json();
+        const reporte = await obtenerJSON(`${API_URL}/reportes/misiones`);
         
         const container = document.getElementById('reporte-container');
         container.innerHTML = '<h3>Reporte de Misiones</h3>' + reporte.map(item => `
@@ -578,5 +685,6 @@ async function cargarReporteMisiones() {
 
 // Cargar datos iniciales al cargar la página
 document.addEventListener('DOMContentLoaded', () => {
+    conectarEventos();
     cargarNinjas();
 });
\ No newline at end of file
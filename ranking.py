@@ -0,0 +1,124 @@
+"""
+Consultas top-K de ninjas por un puntaje ponderado de sus estadísticas:
+
+    puntaje = peso_ataque * ataque + peso_defensa * defensa + peso_chakra * chakra
+
+Para todos los ninjas y para cada grupo (rango, aldea) se guardan sus
+posiciones ordenadas por cada estadística y por el poder total (ataque +
+defensa + chakra). Con m el menor de los pesos, el puntaje se reescribe como
+
+    puntaje = m * poder + suma((peso - m) * estadistica)
+
+que es una suma con pesos no negativos de atributos ya ordenados, y se usa
+el algoritmo de umbral de Fagin: se recorren en paralelo las listas con
+peso, se calcula el puntaje completo de cada ninja que aparece y se para en
+cuanto el K-ésimo mejor alcanza la cota formada por los valores de la
+profundidad actual, que acota a todos los ninjas aún no vistos. Con pesos
+iguales solo se recorre la lista de poder y bastan K pasos; cuanto más
+parecidos son los pesos, menos se profundiza.
+
+Los pesos se redondean a ESCALA_PESOS para operar con enteros: los empates
+son exactos y se resuelven por id. Los filtros que abarcan varios grupos
+combinan el top-K de cada uno. El índice es de solo lectura: NinjaController lo
+reconstruye completo en segundo plano cuando cambian las columnas del ranking
+y, mientras tanto, sigue respondiendo con el anterior.
+"""
+import heapq
+from array import array
+from itertools import islice
+
+
+ESTADISTICAS = ('ataque', 'defensa', 'chakra')
+ESCALA_PESOS = 10 ** 6
+
+
+class RankingPoder:
+    """Índice en memoria para el top-K por puntaje ponderado"""
+
+    def __init__(self, filas):
+        # filas: iterable de (id, rango, aldea, ataque, defensa, chakra)
+        self.ids = array('q')
+        self.valores = tuple(array('q') for _ in ESTADISTICAS)
+        indice_grupo = {}
+        grupo_de = array('l')
+        for ninja_id, rango, aldea, *valores in filas:
+            self.ids.append(ninja_id)
+            grupo_de.append(indice_grupo.setdefault((rango, aldea), len(indice_grupo)))
+            for columna, valor in zip(self.valores, valores):
+                columna.append(valor or 0)
+        self.poder = array('q', map(sum, zip(*self.valores)))
+
+        # Por grupo: listas de posiciones ordenadas por valor descendente y luego id,
+        # obtenidas repartiendo un único orden global
+        total = len(self.ids)
+        base = max(self.ids, default=0) + 1
+        listas = [tuple(array('q') for _ in range(len(ESTADISTICAS) + 1)) for _ in indice_grupo]
+        globales = []
+        for indice, columna in enumerate(self.valores + (self.poder,)):
+            claves = [-columna[p] * base + self.ids[p] for p in range(total)]
+            orden = array('q', sorted(range(total), key=claves.__getitem__))
+            globales.append(orden)
+            for p in orden:
+                listas[grupo_de[p]][indice].append(p)
+        self.grupos = dict(zip(indice_grupo, listas))
+        self.todos = tuple(globales)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def top(self, k, pesos, rango=None, aldea=None):
+        """Devuelve [(puntaje, id)] de los k mejores, por puntaje descendente y luego id"""
+        pesos = tuple(round(peso * ESCALA_PESOS) for peso in pesos)
+        if any(peso < 0 for peso in pesos) or not any(peso > 0 for peso in pesos):
+            raise ValueError('Los pesos deben ser no negativos y al menos uno mayor que cero')
+        if k <= 0:
+            return []
+
+        if rango is None and aldea is None:
+            grupos = [self.todos] if len(self) else []
+        else:
+            grupos = [
+                listas for (rango_grupo, aldea_grupo), listas in self.grupos.items()
+                if (rango is None or rango_grupo == rango) and (aldea is None or aldea_grupo == aldea)
+            ]
+        parciales = [self._top_grupo(listas, k, pesos) for listas in grupos]
+        mejores = islice(heapq.merge(*parciales, key=lambda par: (-par[0], par[1])), k)
+        return [(puntaje / ESCALA_PESOS, ninja_id) for puntaje, ninja_id in mejores]
+
+    def _top_grupo(self, listas, k, pesos):
+        """Top-K de un grupo con pesos enteros, ordenado como top()"""
+        minimo = min(pesos)
+        columnas = self.valores + (self.poder,)
+        pesos_listas = [peso - minimo for peso in pesos] + [minimo]
+        activas = [(lista, columnas[i], peso) for i, (lista, peso) in enumerate(zip(listas, pesos_listas)) if peso > 0]
+
+        def puntaje(p):
+            return sum(peso * columna[p] for _, columna, peso in activas)
+
+        # Montículo de mínimos con los k mejores: (puntaje, -id), el peor arriba
+        mejores = []
+        vistos = set()
+        for profundidad in range(len(listas[0])):
+            umbral = 0
+            id_maximo = None
+            for lista, columna, peso in activas:
+                p = lista[profundidad]
+                umbral += peso * columna[p]
+                id_maximo = self.ids[p] if id_maximo is None else max(id_maximo, self.ids[p])
+                if p in vistos:
+                    continue
+                vistos.add(p)
+                entrada = (puntaje(p), -self.ids[p])
+                if len(mejores) < k:
+                    heapq.heappush(mejores, entrada)
+                elif entrada > mejores[0]:
+                    heapq.heapreplace(mejores, entrada)
+
+            if len(mejores) == k:
+                peor_puntaje, peor_id = mejores[0][0], -mejores[0][1]
+                # Un ninja no visto tiene puntaje <= umbral; si lo iguala, tiene en cada
+                # lista el valor de esta profundidad y por tanto un id mayor que id_maximo
+                if peor_puntaje > umbral or (peor_puntaje == umbral and id_maximo >= peor_id):
+                    break
+
+        return [(valor, -id_negativo) for valor, id_negativo in sorted(mejores, reverse=True)]
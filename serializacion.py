@@ -0,0 +1,53 @@
+"""
+Codificación JSON de las respuestas.
+
+ProveedorJSON sustituye al proveedor por defecto de Flask (jsonify, app.json)
+y usa orjson si está instalado: codifica en C directamente a bytes, sin la
+cadena intermedia de json.dumps. Sin orjson se comporta igual que el
+proveedor por defecto. Se conservan las claves ordenadas, la sangría en modo
+debug y la conversión de fechas de Flask; la única diferencia es que orjson
+escribe UTF-8 en lugar de escapar los caracteres no ASCII.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """Proveedor JSON de Flask respaldado por orjson cuando está disponible"""
+
+    def _opciones(self, sangria=False):
+        opciones = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        if sangria:
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def dumps_bytes(self, obj, sangria=False):
+        """Codifica a bytes UTF-8"""
+        if orjson is None:
+            return self.dumps(obj, indent=2 if sangria else None).encode('utf-8')
+        return orjson.dumps(obj, default=self.default, option=self._opciones(sangria))
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._opciones()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        sangria = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self.dumps_bytes(obj, sangria) + b'\n', mimetype=self.mimetype
+        )
@@ -0,0 +1,160 @@
+"""
+Cola de tareas en segundo plano para reportes y operaciones masivas.
+
+ColaTareas guarda cada tarea en la tabla tareas y la ejecuta en un pool de
+hilos del proceso que la recibe, así la petición que la envía responde en
+seguida con el id. Como el estado y el resultado viven en la base de datos,
+cualquier worker puede responder al consultar una tarea o descargar su
+resultado. El resultado se guarda ya codificado en JSON y se elimina al
+vencer su TTL.
+
+Las tareas con argumentos (p. ej. la lista de un bulk) los reciben en
+memoria del proceso que las encola; no se guardan en la tabla.
+
+El pool se crea en el primer envío (después del fork de los workers). Si un
+proceso termina con tareas a medias, la limpieza las marca como error cuando
+superan el tiempo máximo de ejecución.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import defer
+
+from models import db, Tarea
+
+PENDIENTE = 'pendiente'
+EJECUTANDO = 'ejecutando'
+COMPLETADA = 'completada'
+ERROR = 'error'
+EN_CURSO = (PENDIENTE, EJECUTANDO)
+
+
+class ColaTareas:
+    """Tareas registradas por tipo, ejecutadas en un pool de hilos con estado y resultado en la base de datos"""
+
+    def __init__(self, app=None, trabajadores=2, ttl=3600, tiempo_maximo=600, intervalo_limpieza=60):
+        self.app = app
+        self.trabajadores = trabajadores
+        self.ttl = ttl
+        self.tiempo_maximo = tiempo_maximo
+        self.intervalo_limpieza = intervalo_limpieza
+        self._funciones = {}
+        self._pool = None
+        self._futuros = set()
+        self._lock = threading.Lock()
+        self._ultima_limpieza = 0.0
+
+    def registrar(self, tipo, funcion):
+        """funcion(*argumentos) se ejecuta dentro de un contexto de aplicación y devuelve {'success', 'data' | 'error'}"""
+        self._funciones[tipo] = funcion
+
+    @property
+    def tipos(self):
+        return list(self._funciones)
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.trabajadores, thread_name_prefix='tareas')
+            return self._pool
+
+    def enviar(self, tipo, *argumentos):
+        """Crea la tarea y la encola; sin argumentos, si ya hay una del mismo tipo en curso devuelve esa"""
+        if tipo not in self._funciones:
+            raise ValueError(f'Tipo de tarea desconocido: {tipo}; disponibles: {self.tipos}')
+        self._limpiar_si_toca()
+
+        ahora = datetime.now()
+        if not argumentos:
+            en_curso = db.session.scalar(
+                select(Tarea).options(defer(Tarea.resultado))
+                .where(
+                    Tarea.tipo == tipo, Tarea.estado.in_(EN_CURSO),
+                    Tarea.fecha_creacion > ahora - timedelta(seconds=self.tiempo_maximo)
+                )
+                .order_by(Tarea.fecha_creacion.desc())
+                .limit(1)
+            )
+            if en_curso is not None:
+                return en_curso.to_dict()
+
+        tarea = Tarea(id=uuid.uuid4().hex, tipo=tipo, estado=PENDIENTE, fecha_creacion=ahora)
+        db.session.add(tarea)
+        db.session.commit()
+        futuro = self._obtener_pool().submit(self._ejecutar, tarea.id, tipo, argumentos)
+        with self._lock:
+            self._futuros.add(futuro)
+        futuro.add_done_callback(self._futuros.discard)
+        return tarea.to_dict()
+
+    def esperar(self, timeout=None):
+        """Espera a que terminen las tareas enviadas desde este proceso; devuelve True si no queda ninguna"""
+        with self._lock:
+            futuros = list(self._futuros)
+        return not wait(futuros, timeout).not_done
+
+    def _ejecutar(self, tarea_id, tipo, argumentos=()):
+        """Corre en un hilo del pool, con su propio contexto de aplicación y su propia sesión"""
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    update(Tarea).where(Tarea.id == tarea_id).values(estado=EJECUTANDO, fecha_inicio=datetime.now())
+                )
+                db.session.commit()
+                resultado = self._funciones[tipo](*argumentos)
+                if resultado['success']:
+                    valores = {'estado': COMPLETADA, 'resultado': self.app.json.dumps(resultado['data'])}
+                else:
+                    valores = {'estado': ERROR, 'error': resultado['error']}
+            except Exception as e:
+                db.session.rollback()
+                valores = {'estado': ERROR, 'error': str(e)}
+            fin = datetime.now()
+            db.session.execute(
+                update(Tarea).where(Tarea.id == tarea_id)
+                .values(**valores, fecha_fin=fin, expira=fin + timedelta(seconds=self.ttl))
+            )
+            db.session.commit()
+
+    def obtener(self, tarea_id):
+        """Estado de la tarea sin cargar su resultado, o None si no existe o ya venció"""
+        tarea = db.session.get(Tarea, tarea_id, options=[defer(Tarea.resultado)])
+        if tarea is None or (tarea.expira is not None and tarea.expira <= datetime.now()):
+            return None
+        return tarea.to_dict()
+
+    def resultado(self, tarea_id):
+        """(estado, contenido): el JSON del resultado si se completó, el mensaje si falló; (None, None) si no existe"""
+        fila = db.session.execute(
+            select(Tarea.estado, Tarea.resultado, Tarea.error, Tarea.expira).where(Tarea.id == tarea_id)
+        ).first()
+        if fila is None or (fila.expira is not None and fila.expira <= datetime.now()):
+            return None, None
+        return fila.estado, fila.resultado if fila.estado == COMPLETADA else fila.error
+
+    def _limpiar_si_toca(self):
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._ultima_limpieza < self.intervalo_limpieza:
+                return
+            self._ultima_limpieza = ahora
+        self.limpiar()
+
+    def limpiar(self):
+        """Elimina las tareas vencidas y da por fallidas las que llevan en curso más del tiempo máximo"""
+        ahora = datetime.now()
+        abandonadas = db.session.execute(
+            update(Tarea)
+            .where(Tarea.estado.in_(EN_CURSO), Tarea.fecha_creacion <= ahora - timedelta(seconds=self.tiempo_maximo))
+            .values(
+                estado=ERROR, error=f'La tarea no terminó en {self.tiempo_maximo} s',
+                fecha_fin=ahora, expira=ahora + timedelta(seconds=self.ttl)
+            )
+        ).rowcount
+        eliminadas = db.session.execute(delete(Tarea).where(Tarea.expira <= ahora)).rowcount
+        db.session.commit()
+        return {'eliminadas': eliminadas, 'abandonadas': abandonadas}
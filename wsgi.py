@@ -0,0 +1,11 @@
+"""
+Punto de entrada WSGI para producción:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Los procesos no crean tablas al arrancar: el esquema y las migraciones se
+aplican una vez por despliegue con python migraciones.py.
+"""
+from app import crear_app
+
+app = crear_app()